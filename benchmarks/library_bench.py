@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""Library benchmark on a synthetic library.
+
+Builds a deterministic library of configurable size (audio_files, tags,
+transcriptions and a folder of tiny WAV files), times the hot library paths
+and compares the medians against a stored baseline. Usage:
+
+    python -m benchmarks.library_bench --scale small --save-baseline base.json
+    python -m benchmarks.library_bench --scale small --baseline base.json
+
+Exit status is 1 when a benchmark regressed beyond its threshold.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import wave
+from array import array
+from datetime import datetime, timedelta
+
+from src.core.database import Database
+
+SCALES = {
+    # files, tags, transcripts, segments per transcript, files written to disk
+    "tiny": (2_000, 20, 200, 20, 50),
+    "small": (20_000, 50, 2_000, 30, 200),
+    "medium": (100_000, 100, 10_000, 30, 500),
+    "full": (300_000, 200, 40_000, 30, 1_000),
+}
+
+WORDS = ("riunione progetto budget cliente consegna revisione intervista "
+         "lezione capitolo audio registrazione nota idea prova microfono "
+         "marketing vendite roma milano torino settimana mese anno").split()
+FORMATS = ("mp3", "wav", "m4a", "flac", "ogg")
+
+DEFAULT_THRESHOLD = 0.25   # 25% slower than baseline
+DEFAULT_MIN_DELTA_MS = 2.0  # ignore differences below timer noise
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def write_wav(path: str, seconds: float, rate: int = 8000, freq: float = 440.0):
+    samples = array("h", (
+        int(6000 * math.sin(2 * math.pi * freq * i / rate))
+        for i in range(int(seconds * rate))
+    ))
+    if sys.byteorder == "big":
+        samples.byteswap()
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(samples.tobytes())
+
+
+# --- Generator ---
+
+def generate_library(workdir: str, files: int, tags: int, transcripts: int,
+                     segments: int, disk_files: int, seed: int = 1) -> dict:
+    """Create ``workdir/library.db`` and ``workdir/audio`` and return the
+    parameters. An existing library built with the same parameters is reused."""
+    params = {"files": files, "tags": tags, "transcripts": transcripts,
+              "segments": segments, "disk_files": disk_files, "seed": seed}
+    db_path = os.path.join(workdir, "library.db")
+    audio_dir = os.path.join(workdir, "audio")
+    stamp = os.path.join(workdir, "params.json")
+    if os.path.exists(stamp) and os.path.exists(db_path):
+        with open(stamp, encoding="utf-8") as f:
+            if json.load(f) == params:
+                return params
+    for path in (db_path, db_path + "-wal", db_path + "-shm", stamp):
+        if os.path.exists(path):
+            os.remove(path)
+    shutil.rmtree(audio_dir, ignore_errors=True)
+    os.makedirs(audio_dir)
+
+    rng = random.Random(seed)
+    Database(db_path)  # schema
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    base = datetime(2020, 1, 1)
+
+    def _rows():
+        for i in range(files):
+            title = f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i:06d}"
+            fmt = FORMATS[i % len(FORMATS)]
+            date = (base + timedelta(minutes=i)).isoformat()
+            yield (f"/synthetic/{i // 1000:03d}/{title}.{fmt}", f"{title}.{fmt}",
+                   title, fmt, round(rng.uniform(5, 7200), 2),
+                   rng.randint(50_000, 200_000_000), 44100, 2, 192000, date, date)
+
+    with conn:
+        conn.executemany(
+            """INSERT INTO audio_files
+               (file_path, file_name, title, format, duration, file_size,
+                sample_rate, channels, bitrate, date_added, date_modified)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            _rows(),
+        )
+        conn.executemany(
+            "INSERT INTO tags (name) VALUES (?)",
+            ((f"tag{t:03d}",) for t in range(tags)),
+        )
+        # Skewed tag popularity, 0-3 tags per file.
+        conn.executemany(
+            "INSERT OR IGNORE INTO audio_tags (audio_id, tag_id) VALUES (?, ?)",
+            ((a, 1 + min(tags - 1, int(rng.paretovariate(1.2)) - 1))
+             for a in range(1, files + 1) for _ in range(rng.randint(0, 3))),
+        )
+        now = datetime.now().isoformat()
+        for t in range(transcripts):
+            audio_id = 1 + (t * files) // max(1, transcripts)
+            seg_rows, texts = [], []
+            for s in range(segments):
+                text = " ".join(rng.choice(WORDS) for _ in range(12))
+                texts.append(text)
+                seg_rows.append((s * 4.0, s * 4.0 + 4.0, text))
+            cur = conn.execute(
+                """INSERT INTO transcriptions
+                   (audio_id, full_text, language, model_used, date_transcribed)
+                   VALUES (?, ?, 'it', 'synthetic', ?)""",
+                (audio_id, " ".join(texts), now),
+            )
+            conn.executemany(
+                """INSERT INTO transcription_segments
+                   (transcription_id, start_time, end_time, text)
+                   VALUES (?, ?, ?, ?)""",
+                ((cur.lastrowid, *row) for row in seg_rows),
+            )
+            conn.execute("UPDATE audio_files SET is_transcribed = 1 WHERE id = ?",
+                         (audio_id,))
+    conn.execute("ANALYZE")
+    conn.close()
+
+    for i in range(disk_files):
+        write_wav(os.path.join(audio_dir, f"clip_{i:05d}.wav"), 0.25,
+                  freq=220 + (i % 40) * 10)
+    write_wav(os.path.join(workdir, "long.wav"), 120.0, rate=16000)
+
+    with open(stamp, "w", encoding="utf-8") as f:
+        json.dump(params, f)
+    return params
+
+
+# --- Benchmarks ---
+
+def _time(fn, repeats: int, setup=None) -> dict:
+    times = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return {
+        "median_ms": round(statistics.median(times), 3),
+        "p95_ms": round(_percentile(times, 95), 3),
+        "min_ms": round(min(times), 3),
+        "runs": repeats,
+    }
+
+
+def bench_queries(db: Database, params: dict, repeats: int) -> dict:
+    deep = max(0, params["files"] // 2)
+    return {
+        "search_audio.first_page": _time(
+            lambda: db.search_audio(limit=500), repeats),
+        "search_audio.deep_page": _time(
+            lambda: db.search_audio(limit=500, offset=deep), repeats),
+        "search_audio.text": _time(
+            lambda: db.search_audio("progetto", limit=500), repeats),
+        "search_audio.sort_title": _time(
+            lambda: db.search_audio(sort="title", descending=False, limit=500), repeats),
+        "count_audio.all": _time(lambda: db.count_audio(), repeats),
+        "count_audio.text": _time(lambda: db.count_audio("progetto"), repeats),
+        "tags.filter_popular": _time(
+            lambda: db.search_audio(tags=["tag000"], limit=500), repeats),
+        "tags.filter_rare": _time(
+            lambda: db.search_audio(tags=[f"tag{params['tags'] - 1:03d}"], limit=500),
+            repeats),
+        "tags.count_popular": _time(lambda: db.count_audio(tags=["tag000"]), repeats),
+        "tags.get_all": _time(db.get_all_tags, repeats),
+        "segments.search_common": _time(
+            lambda: db.search_segments("riunione"), repeats),
+        "segments.search_prefix": _time(
+            lambda: db.search_segments("registraz"), repeats),
+        "transcription.load": _time(
+            lambda: db.get_transcription(1), repeats),
+    }
+
+
+def bench_exports(db: Database, tmp: str, repeats: int) -> dict:
+    from src.core.transcriber import export_transcription_srt
+
+    trans = db.get_transcription(1)
+    results = {
+        "export.library_json": _time(
+            lambda: db.export_library_json(os.path.join(tmp, "lib.json")), repeats),
+        "export.library_csv": _time(
+            lambda: db.export_library_csv(os.path.join(tmp, "lib.csv")), repeats),
+    }
+    if trans:
+        results["export.transcription_srt"] = _time(
+            lambda: export_transcription_srt(trans, os.path.join(tmp, "t.srt")), repeats)
+    return results
+
+
+def bench_import(workdir: str, tmp: str, repeats: int) -> dict:
+    try:
+        import mutagen  # noqa: F401
+    except ImportError:
+        return {"import_folder": {"skipped": "mutagen is not installed"}}
+    from src.core.audio_manager import AudioManager
+
+    audio_dir = os.path.join(workdir, "audio")
+    managers: list[AudioManager] = []
+
+    def _fresh():
+        managers.append(AudioManager(
+            Database(os.path.join(tmp, f"import_{len(managers)}.db"))
+        ))
+
+    return {"import_folder": _time(
+        lambda: managers[-1].import_folder(audio_dir), repeats, setup=_fresh)}
+
+
+def bench_editor(workdir: str, tmp: str, repeats: int) -> dict:
+    try:
+        import numpy  # noqa: F401
+        import pydub  # noqa: F401
+    except ImportError as e:
+        return {"editor": {"skipped": f"{e.name} is not installed"}}
+    from src.core.editor import AudioEditor
+
+    path = os.path.join(workdir, "long.wav")
+    editor = AudioEditor()
+    results = {"editor.load": _time(lambda: editor.load(path), repeats)}
+    if not editor.is_loaded:
+        return {"editor": {"skipped": "could not decode test audio"}}
+    results["editor.waveform"] = _time(lambda: editor.get_waveform_data(800), repeats)
+    results["editor.trim"] = _time(
+        lambda: editor.trim(10_000, 110_000), repeats, setup=lambda: editor.load(path))
+    results["editor.cut"] = _time(
+        lambda: editor.cut_section(30_000, 60_000), repeats,
+        setup=lambda: editor.load(path))
+    results["editor.normalize"] = _time(
+        lambda: editor.normalize(), repeats, setup=lambda: editor.load(path))
+    results["editor.export_wav"] = _time(
+        lambda: editor.export(os.path.join(tmp, "out.wav"), "wav"), repeats,
+        setup=lambda: editor.load(path))
+    return results
+
+
+# --- Baseline comparison ---
+
+def compare(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD,
+            min_delta_ms: float = DEFAULT_MIN_DELTA_MS,
+            overrides: dict | None = None) -> dict:
+    """Median-based comparison; a benchmark regresses when it is both
+    ``threshold`` (relative) and ``min_delta_ms`` (absolute) slower."""
+    overrides = overrides or {}
+    report = {"regressions": [], "improvements": [], "missing": [], "new": []}
+    base_results = baseline.get("results", {})
+    for name, cur in current["results"].items():
+        base = base_results.get(name)
+        if base is None or "median_ms" not in base:
+            report["new"].append(name)
+            continue
+        if "median_ms" not in cur:
+            continue
+        limit = overrides.get(name, threshold)
+        delta = cur["median_ms"] - base["median_ms"]
+        ratio = cur["median_ms"] / base["median_ms"] if base["median_ms"] else math.inf
+        entry = {"name": name, "baseline_ms": base["median_ms"],
+                 "current_ms": cur["median_ms"], "ratio": round(ratio, 3),
+                 "threshold": limit}
+        if delta > min_delta_ms and ratio > 1 + limit:
+            report["regressions"].append(entry)
+        elif -delta > min_delta_ms and ratio < 1 / (1 + limit):
+            report["improvements"].append(entry)
+    report["missing"] = [n for n in base_results if n not in current["results"]]
+    if baseline.get("library") != current.get("library"):
+        report["warning"] = "baseline was recorded on a different library size"
+    return report
+
+
+def run(args) -> dict:
+    files, tags, transcripts, segments, disk_files = SCALES[args.scale]
+    files = args.files or files
+    transcripts = min(files, args.transcripts or transcripts)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="audiolib_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    t0 = time.perf_counter()
+    params = generate_library(workdir, files, tags, transcripts, segments,
+                              disk_files, seed=args.seed)
+    generate_s = time.perf_counter() - t0
+
+    db = Database(os.path.join(workdir, "library.db"))
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        results.update(bench_queries(db, params, args.repeats))
+        results.update(bench_exports(db, tmp, max(1, args.repeats // 3)))
+        results.update(bench_import(workdir, tmp, max(1, args.repeats // 3)))
+        results.update(bench_editor(workdir, tmp, max(1, args.repeats // 3)))
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "library": params,
+        "environment": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "generate_seconds": round(generate_s, 2),
+        "results": results,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=list(SCALES), default="small")
+    parser.add_argument("--files", type=int, default=0, help="override library size")
+    parser.add_argument("--transcripts", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeats", type=int, default=9)
+    parser.add_argument("--workdir", default="",
+                        help="keep the generated library here and reuse it")
+    parser.add_argument("--output", default="", help="write JSON results here")
+    parser.add_argument("--baseline", default="", help="compare against this result file")
+    parser.add_argument("--save-baseline", default="",
+                        help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed relative slowdown (0.25 = 25%%)")
+    parser.add_argument("--threshold-for", action="append", default=[],
+                        metavar="NAME=RATIO", help="per-benchmark threshold")
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS)
+    args = parser.parse_args(argv)
+
+    overrides = {}
+    for item in args.threshold_for:
+        name, _, ratio = item.partition("=")
+        overrides[name] = float(ratio)
+
+    report = run(args)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["comparison"] = compare(report, baseline, args.threshold,
+                                       args.min_delta_ms, overrides)
+
+    text = json.dumps(report, indent=2)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+    print(text)
+    return 1 if report.get("comparison", {}).get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""Transcription pipeline benchmark.
+
+Runs TranscriptionWorker and the Database persistence path against a
+deterministic fake WhisperModel (and optionally a real local model), headless
+and offline. Usage:
+
+    python -m benchmarks.transcription_bench --duration 3600 --seg-rate 200
+    python -m benchmarks.transcription_bench --real tiny --audio sample.wav
+"""
+
+import argparse
+import json
+import math
+import os
+import statistics
+import struct
+import sys
+import tempfile
+import time
+import wave
+from types import SimpleNamespace
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from src.core.database import Database
+from src.core.transcription import TranscriptionWorker
+
+
+class FakeWhisperModel:
+    """Mimics WhisperModel.transcribe: yields fixed-length segments covering
+    ``duration`` seconds at ``seg_rate`` segments per wall-clock second
+    (0 = as fast as possible)."""
+
+    def __init__(self, duration: float, seg_len: float = 4.0, seg_rate: float = 0):
+        self.duration = duration
+        self.seg_len = seg_len
+        self.seg_rate = seg_rate
+
+    def transcribe(self, audio, **kwargs):
+        info = SimpleNamespace(language="it", duration=self.duration)
+        return self._segments(), info
+
+    def _segments(self):
+        n = int(math.ceil(self.duration / self.seg_len))
+        delay = 1.0 / self.seg_rate if self.seg_rate > 0 else 0
+        for i in range(n):
+            if delay:
+                time.sleep(delay)
+            start = i * self.seg_len
+            yield SimpleNamespace(
+                start=start,
+                end=min(self.duration, start + self.seg_len),
+                text=f" segmento {i} lorem ipsum dolor sit amet",
+            )
+
+
+class FakeModelWorker(TranscriptionWorker):
+    def __init__(self, model: FakeWhisperModel, **kwargs):
+        super().__init__("fake.wav", model_name="fake", **kwargs)
+        self._fake_model = model
+
+    def _load_model(self):
+        return self._fake_model
+
+
+class SignalCounter:
+    def __init__(self, worker: TranscriptionWorker):
+        self.counts = {"progress": 0, "segments_ready": 0}
+        self.result: dict | None = None
+        self.error: str | None = None
+        worker.progress.connect(lambda *_: self._hit("progress"))
+        worker.segments_ready.connect(lambda *_: self._hit("segments_ready"))
+        worker.finished_transcription.connect(self._done)
+        worker.error.connect(self._fail)
+
+    def _hit(self, name: str):
+        self.counts[name] += 1
+
+    def _done(self, result: dict):
+        self.result = result
+
+    def _fail(self, msg: str):
+        self.error = msg
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _write_tone(path: str, seconds: float, rate: int = 16000):
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        frames = bytearray()
+        for i in range(int(seconds * rate)):
+            frames += struct.pack("<h", int(8000 * math.sin(2 * math.pi * 440 * i / rate)))
+        w.writeframes(bytes(frames))
+
+
+def run_worker(worker: TranscriptionWorker, audio_duration: float) -> dict:
+    counter = SignalCounter(worker)
+    started = time.perf_counter()
+    worker.run()  # synchronous: slots are invoked directly, no event loop needed
+    wall = time.perf_counter() - started
+    if counter.error:
+        raise RuntimeError(counter.error)
+    segments = counter.result["segments"] if counter.result else []
+    emitted = sum(counter.counts.values())
+    return {
+        "audio_seconds": audio_duration,
+        "wall_seconds": round(wall, 4),
+        "rtf": round(wall / audio_duration, 5) if audio_duration else 0.0,
+        "segments": len(segments),
+        "segments_per_second": round(len(segments) / wall, 1) if wall else 0.0,
+        "signals": counter.counts,
+        "signals_per_second": round(emitted / wall, 1) if wall else 0.0,
+        "signals_saved": worker.signals_saved(),
+        "_result": counter.result,
+    }
+
+
+def bench_persistence(result: dict, repeats: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        audio_id = db.add_audio({
+            "file_path": os.path.join(tmp, "fake.wav"),
+            "file_name": "fake.wav",
+            "title": "fake",
+            "format": "wav",
+        })
+        latencies = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            db.save_transcription(
+                audio_id, result["full_text"], result["language"],
+                result["model"], result["segments"],
+            )
+            latencies.append((time.perf_counter() - t0) * 1000)
+        t0 = time.perf_counter()
+        db.get_transcription(audio_id)
+        load_ms = (time.perf_counter() - t0) * 1000
+    return {
+        "save_ms_mean": round(statistics.fmean(latencies), 3),
+        "save_ms_p50": round(_percentile(latencies, 50), 3),
+        "save_ms_p95": round(_percentile(latencies, 95), 3),
+        "load_ms": round(load_ms, 3),
+        "repeats": repeats,
+    }
+
+
+def bench_fake(args) -> dict:
+    model = FakeWhisperModel(args.duration, args.seg_len, args.seg_rate)
+    worker = FakeModelWorker(model, signal_interval_ms=args.signal_interval)
+    stats = run_worker(worker, args.duration)
+    result = stats.pop("_result")
+    stats["db"] = bench_persistence(result, args.db_repeats)
+    return stats
+
+
+def bench_real(args) -> dict | None:
+    try:
+        from faster_whisper.utils import download_model
+    except ImportError:
+        return None
+    try:
+        # Only a model already in the local cache is benchmarked; never
+        # download one (the run must stay offline).
+        download_model(args.real, local_files_only=True)
+    except Exception as e:
+        return {"skipped": f"model '{args.real}' not installed locally: {e}"}
+    tmp = None
+    audio = args.audio
+    if not audio:
+        tmp = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
+        tmp.close()
+        _write_tone(tmp.name, 30.0)
+        audio = tmp.name
+    try:
+        worker = TranscriptionWorker(
+            audio, model_name=args.real, batched=args.batched,
+            batch_size=args.batch_size, cpu_threads=args.cpu_threads,
+            signal_interval_ms=args.signal_interval, local_files_only=True,
+        )
+        from src.utils.file_utils import get_audio_metadata
+        duration = get_audio_metadata(audio)["duration"] or 30.0
+        try:
+            stats = run_worker(worker, duration)
+        except RuntimeError as e:
+            # Model failed to load: report, don't fail the run.
+            return {"skipped": str(e)}
+        result = stats.pop("_result")
+        stats["db"] = bench_persistence(result, args.db_repeats)
+        return stats
+    finally:
+        if tmp:
+            os.unlink(tmp.name)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=3600,
+                        help="simulated audio length in seconds")
+    parser.add_argument("--seg-len", type=float, default=4.0)
+    parser.add_argument("--seg-rate", type=float, default=0,
+                        help="fake segments per second (0 = unthrottled)")
+    parser.add_argument("--db-repeats", type=int, default=5)
+    parser.add_argument("--signal-interval", type=int, default=100,
+                        help="worker signal coalescing interval in ms (0 = per segment)")
+    parser.add_argument("--real", metavar="MODEL", default="",
+                        help="also run a locally installed model, e.g. tiny")
+    parser.add_argument("--audio", default="", help="audio file for --real")
+    parser.add_argument("--batched", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--cpu-threads", type=int, default=0)
+    parser.add_argument("--output", default="", help="write JSON report here")
+    args = parser.parse_args(argv)
+
+    from PyQt6.QtCore import QCoreApplication
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])  # noqa: F841
+
+    report = {"fake": bench_fake(args)}
+    if args.real:
+        report["real"] = bench_real(args)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
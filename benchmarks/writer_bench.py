@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Concurrent write throughput: per-call transactions vs DatabaseWriter.
+
+Each writer thread issues a mix of tag_audio / update_audio calls against a
+fresh library, either directly (one transaction per call, contending on the
+SQLite write lock) or through a shared DatabaseWriter (group commits). Usage:
+
+    python -m benchmarks.writer_bench --threads 8 --ops 500
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from src.core.database import Database
+from src.core.db_writer import DatabaseWriter
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _setup(path: str, files: int, tags: int) -> tuple[Database, list[int], list[int]]:
+    db = Database(path)
+    ids = db.add_audio_many([
+        {"file_path": f"/bench/{i}.mp3", "file_name": f"{i}.mp3",
+         "title": f"file {i}", "format": "mp3"}
+        for i in range(files)
+    ])
+    tag_ids = [db.add_tag(f"tag{t}") for t in range(tags)]
+    return db, ids, tag_ids
+
+
+def _run(mode: str, threads: int, ops: int, files: int, wait_each: bool) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        db, ids, tag_ids = _setup(os.path.join(tmp, "bench.db"), files, 20)
+        writer = DatabaseWriter(db) if mode == "writer" else None
+        latencies: list[float] = []
+        errors: list[str] = []
+        lock = threading.Lock()
+        start = threading.Barrier(threads + 1)
+
+        def _worker(n: int):
+            local, futures = [], []
+            start.wait()
+            for i in range(ops):
+                audio_id = ids[(n * ops + i) % len(ids)]
+                if i % 4 == 3:
+                    call = (db.update_audio, audio_id)
+                    kwargs = {"notes": f"w{n}-{i}"}
+                else:
+                    call = (db.tag_audio, audio_id, tag_ids[i % len(tag_ids)])
+                    kwargs = {}
+                t0 = time.perf_counter()
+                try:
+                    if writer is None:
+                        call[0](*call[1:], **kwargs)
+                    elif wait_each:
+                        writer.submit(*call, **kwargs).result()
+                    else:
+                        futures.append((t0, writer.submit(*call, **kwargs)))
+                        continue
+                except sqlite3.OperationalError as e:
+                    with lock:
+                        errors.append(str(e))
+                    continue
+                local.append((time.perf_counter() - t0) * 1000)
+            for t0, future in futures:
+                try:
+                    future.result()
+                except sqlite3.OperationalError as e:
+                    with lock:
+                        errors.append(str(e))
+                    continue
+                local.append((time.perf_counter() - t0) * 1000)
+            with lock:
+                latencies.extend(local)
+
+        workers = [threading.Thread(target=_worker, args=(n,)) for n in range(threads)]
+        for w in workers:
+            w.start()
+        start.wait()
+        t0 = time.perf_counter()
+        for w in workers:
+            w.join()
+        wall = time.perf_counter() - t0
+        stats = dict(writer.stats) if writer else {}
+        if writer:
+            writer.close()
+
+    done = len(latencies)
+    return {
+        "mode": mode if not (mode == "writer" and not wait_each) else "writer_pipelined",
+        "threads": threads,
+        "ops": threads * ops,
+        "completed": done,
+        "errors": len(errors),
+        "wall_seconds": round(wall, 3),
+        "ops_per_second": round(done / wall, 1) if wall else 0.0,
+        "latency_ms_p50": round(_percentile(latencies, 50), 3),
+        "latency_ms_p95": round(_percentile(latencies, 95), 3),
+        "latency_ms_max": round(max(latencies, default=0.0), 3),
+        **({"writer": stats} if stats else {}),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--ops", type=int, default=300, help="calls per thread")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--output", default="", help="write JSON report here")
+    args = parser.parse_args(argv)
+
+    report = []
+    for threads in args.threads:
+        report.append(_run("direct", threads, args.ops, args.files, True))
+        report.append(_run("writer", threads, args.ops, args.files, True))
+        report.append(_run("writer", threads, args.ops, args.files, False))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
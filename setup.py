@@ -17,6 +17,7 @@ setup(
     entry_points={
         "console_scripts": [
             "audio-library-manager=src.main:main",
+            "audio-library-cli=src.cli:main",
         ],
     },
 )
@@ -0,0 +1,608 @@
+#!/usr/bin/env python3
+"""Audio Library Manager - headless command-line interface.
+
+Drives the same library database as the GUI without importing PyQt, for
+batch jobs on machines without a display. Every command prints one JSON
+object on stdout (``watch`` prints one per batch of changes).
+
+Exit codes: 0 success, 1 error, 2 usage error, 3 some items failed.
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_PARTIAL = 3
+
+
+def _setup_path():
+    base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if base not in sys.path:
+        sys.path.insert(0, base)
+
+
+def _emit(payload: dict):
+    json.dump(payload, sys.stdout, ensure_ascii=False)
+    sys.stdout.write("\n")
+    sys.stdout.flush()
+
+
+def _default_workers() -> int:
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+# --- Commands ---
+
+def cmd_scan(db, args) -> int:
+    from src.core.audio_manager import AudioManager
+    from src.utils.file_utils import scan_folder
+
+    files, missing = [], []
+    for path in args.paths:
+        if os.path.isdir(path):
+            files.extend(scan_folder(path))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            missing.append(path)
+    skipped = []
+    ids = AudioManager(db).import_files(files, workers=args.workers,
+                                        skip_duplicates=args.skip_duplicates,
+                                        skipped=skipped)
+    _emit({"command": "scan", "found": len(files), "imported": len(ids),
+           "ids": ids, "missing": missing,
+           "skipped": [{"path": p, "duplicate_of": i} for p, i in skipped]})
+    return EXIT_PARTIAL if missing else EXIT_OK
+
+
+def _rescan_one(row: dict) -> tuple[int, str, dict | None]:
+    from src.utils.file_utils import get_audio_metadata
+
+    try:
+        st = os.stat(row["file_path"])
+    except OSError:
+        return row["id"], "missing", None
+    mtime = datetime.fromtimestamp(st.st_mtime).isoformat()
+    if st.st_size == row["file_size"] and mtime == row["date_modified"]:
+        return row["id"], "ok", None
+    meta = get_audio_metadata(row["file_path"])
+    return row["id"], "changed", meta
+
+
+def cmd_rescan(db, args) -> int:
+    rows = db.get_all_audio()
+    updated, missing = [], []
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for audio_id, state, meta in pool.map(_rescan_one, rows):
+            if state == "missing":
+                missing.append(audio_id)
+            elif state == "changed":
+                db.update_audio(
+                    audio_id,
+                    duration=meta["duration"],
+                    file_size=meta["file_size"],
+                    date_modified=meta["date_modified"],
+                    sample_rate=meta["sample_rate"],
+                    channels=meta["channels"],
+                    bitrate=meta["bitrate"],
+                    partial_hash=None,
+                    content_hash=None,
+                )
+                updated.append(audio_id)
+    _emit({"command": "rescan", "checked": len(rows), "updated": updated,
+           "missing": missing})
+    return EXIT_PARTIAL if missing else EXIT_OK
+
+
+_model = None
+_options: dict = {}
+
+
+def _init_transcriber(model_opts: dict, options: dict):
+    global _model, _options
+    from src.core.transcriber import load_model
+    _model = load_model(**model_opts)
+    _options = options
+
+
+def _transcribe_one(job: tuple[int, str]) -> tuple[int, dict | None, str]:
+    from src.core.transcriber import transcribe_file
+
+    audio_id, path = job
+    try:
+        return audio_id, transcribe_file(_model, path, **_options), ""
+    except Exception as e:
+        return audio_id, None, str(e)
+
+
+def cmd_transcribe(db, args) -> int:
+    try:
+        import faster_whisper  # noqa: F401
+    except ImportError:
+        _emit({"command": "transcribe",
+               "error": "faster-whisper is not installed"})
+        return EXIT_ERROR
+
+    if args.ids:
+        rows = [r for r in (db.get_audio(i) for i in args.ids) if r]
+    else:
+        rows = db.get_all_audio()
+    if not args.force:
+        rows = [r for r in rows if not r.get("is_transcribed")]
+    jobs = [(r["id"], r["file_path"]) for r in rows]
+
+    workers = max(1, min(args.workers, len(jobs) or 1))
+    model_opts = {
+        "model_name": args.model,
+        "cpu_threads": args.cpu_threads or max(1, (os.cpu_count() or 1) // workers),
+        "num_workers": 1,
+    }
+    options = {
+        "language": None if args.language == "auto" else args.language,
+        "batched": args.batched,
+        "batch_size": args.batch_size,
+        "word_timestamps": args.word_timestamps,
+    }
+
+    done, failed = [], []
+
+    def _store(audio_id, result, err):
+        if result is None:
+            failed.append({"id": audio_id, "error": err})
+            return
+        db.save_transcription(
+            audio_id, result["full_text"], result["language"], args.model,
+            result["segments"], result.get("words"),
+        )
+        done.append({"id": audio_id, "segments": len(result["segments"]),
+                     "rtf": result["rtf"]})
+
+    if workers == 1:
+        _init_transcriber(model_opts, options)
+        for job in jobs:
+            _store(*_transcribe_one(job))
+    else:
+        # One model per process; the parent is the only database writer.
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_transcriber,
+                                 initargs=(model_opts, options)) as pool:
+            for outcome in pool.map(_transcribe_one, jobs):
+                _store(*outcome)
+
+    _emit({"command": "transcribe", "transcribed": done, "failed": failed})
+    return EXIT_PARTIAL if failed else EXIT_OK
+
+
+def cmd_search(db, args) -> int:
+    if args.segments:
+        results = db.search_segments(args.query, limit=args.limit, offset=args.offset)
+    else:
+        results = db.search_audio(
+            query=args.query, tags=args.tag or None, fmt=args.format,
+            limit=args.limit, offset=args.offset,
+        )
+    _emit({"command": "search", "query": args.query, "count": len(results),
+           "results": results})
+    return EXIT_OK
+
+
+def _export_one(job: tuple[dict, str, str]) -> tuple[int, str, str]:
+    from src.core.transcriber import (
+        export_transcription_txt, export_transcription_srt,
+        export_transcription_json,
+    )
+    exporters = {"txt": export_transcription_txt, "srt": export_transcription_srt,
+                 "json": export_transcription_json}
+    trans, fmt, path = job
+    try:
+        exporters[fmt](trans, path)
+        return trans["audio_id"], path, ""
+    except OSError as e:
+        return trans["audio_id"], path, str(e)
+
+
+def cmd_export_transcriptions(db, args) -> int:
+    os.makedirs(args.output_dir, exist_ok=True)
+    ids = args.ids or [r["id"] for r in db.get_all_audio() if r.get("is_transcribed")]
+
+    def _load(audio_id):
+        info = db.get_audio(audio_id)
+        trans = db.get_transcription(audio_id)
+        if not info or not trans:
+            return None
+        name = f"{info['title']}_{audio_id}.{args.format}"
+        return trans, args.format, os.path.join(args.output_dir, name)
+
+    written, failed = [], []
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        jobs = [j for j in pool.map(_load, ids) if j]
+        for audio_id, path, err in pool.map(_export_one, jobs):
+            if err:
+                failed.append({"id": audio_id, "error": err})
+            else:
+                written.append({"id": audio_id, "path": path})
+    _emit({"command": "export-transcriptions", "written": written, "failed": failed})
+    return EXIT_PARTIAL if failed else EXIT_OK
+
+
+def cmd_export_library(db, args) -> int:
+    from src.core.library_io import detect_format, export_library
+
+    fmt = args.format or detect_format(args.path)
+    count = export_library(db, args.path, fmt)
+    _emit({"command": "export-library", "path": args.path, "format": fmt,
+           "exported": count})
+    return EXIT_OK
+
+
+def cmd_import_library(db, args) -> int:
+    from src.core.library_io import import_library
+
+    try:
+        stats = import_library(db, args.path, args.format, batch_size=args.batch_size)
+    except (OSError, ValueError) as e:
+        _emit({"command": "import-library", "path": args.path, "error": str(e)})
+        return EXIT_ERROR
+    _emit({"command": "import-library", "path": args.path, **stats})
+    return EXIT_OK
+
+
+def cmd_duplicates(db, args) -> int:
+    from src.core.audio_manager import AudioManager
+
+    stats = {} if args.no_hash else AudioManager(db).hash_library(workers=args.workers)
+    groups = db.get_duplicate_groups()
+    _emit({"command": "duplicates", **stats, "groups": len(groups),
+           "wasted_bytes": sum(g["file_size"] * (len(g["files"]) - 1) for g in groups),
+           "duplicates": groups})
+    return EXIT_OK
+
+
+def cmd_similar(db, args) -> int:
+    try:
+        from src.core import fingerprint
+    except ImportError as e:
+        _emit({"command": "similar", "error": f"numpy is not installed ({e})"})
+        return EXIT_ERROR
+
+    stats = {}
+    if not args.no_compute:
+        from src.core.jobs import default_handlers
+        stats = default_handlers(db)["fingerprint"]({"workers": args.workers,
+                                                      "threshold": args.threshold})
+    if args.id:
+        hits = fingerprint.find_similar(db, args.id, args.threshold)
+        _emit({"command": "similar", "audio_id": args.id, "similar": hits})
+        return EXIT_OK
+    groups = stats.get("groups")
+    if groups is None:
+        groups = fingerprint.near_duplicate_groups(db, args.threshold)
+    _emit({"command": "similar", "computed": stats.get("computed", 0),
+           "failed": stats.get("failed", []), "groups": [
+               [{"id": r["id"], "file_path": r["file_path"]}
+                for r in (db.get_audio(i) for i in group) if r]
+               for group in groups]})
+    return EXIT_PARTIAL if stats.get("failed") else EXIT_OK
+
+
+def cmd_check(db, args) -> int:
+    from src.core.integrity import check_library, relink_missing
+
+    def progress(checked):
+        print(f"checked {checked} files", file=sys.stderr)
+
+    report = check_library(db, args.workers, update_changed=not args.no_update,
+                           progress=progress)
+    relinked = {}
+    if args.relink_root and report["missing"]:
+        relinked = relink_missing(db, args.relink_root, report["missing"],
+                                  args.workers, dry_run=args.dry_run)
+    _emit({"command": "check", **report, **relinked, "dry_run": args.dry_run})
+    if relinked:
+        lost = relinked["unmatched"] or relinked["ambiguous"]
+    else:
+        lost = report["missing"]
+    return EXIT_PARTIAL if lost or report["unreadable"] else EXIT_OK
+
+
+def cmd_watch(db, args) -> int:
+    import time
+    from src.core.watcher import apply_changes, create_watcher, empty_changes
+
+    def on_changes(changes: dict):
+        stats = apply_changes(db, changes, args.workers, args.skip_duplicates)
+        _emit({"command": "watch", **changes, **stats})
+
+    roots = [r for r in args.roots if os.path.isdir(r)]
+    if len(roots) != len(args.roots):
+        _emit({"command": "watch", "error": "not a directory",
+               "paths": [r for r in args.roots if r not in roots]})
+        return EXIT_USAGE
+    if args.sync:
+        on_changes({**empty_changes(), "rescan": roots})
+    watcher = create_watcher(roots, on_changes, args.debounce_ms / 1000.0,
+                             args.interval, force_poll=args.poll)
+    print(f"watching {len(roots)} folders ({type(watcher).__name__}), "
+          "Ctrl+C to stop", file=sys.stderr)
+    watcher.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+    return EXIT_OK
+
+
+def cmd_backup(db, args) -> int:
+    import sqlite3
+    from src.core.backup import backup_database, backup_rotating
+
+    last = [-1]
+
+    def progress(done, total):
+        pct = done * 100 // total if total else 100
+        if pct // 10 != last[0]:
+            last[0] = pct // 10
+            print(f"backup {pct}% ({done}/{total} pages)", file=sys.stderr)
+
+    verify = None if args.no_verify else ("full" if args.full_check else "quick")
+    options = {"pages": args.pages, "sleep_ms": args.sleep_ms, "verify": verify,
+               "progress": progress}
+    try:
+        if args.keep:
+            result = backup_rotating(db.db_path, args.dest, args.keep, **options)
+        else:
+            result = backup_database(db.db_path, args.dest, **options)
+    except (OSError, sqlite3.Error) as e:
+        _emit({"command": "backup", "dest": args.dest, "error": str(e)})
+        return EXIT_ERROR
+    _emit({"command": "backup", **result})
+    return EXIT_OK
+
+
+def cmd_jobs(db, args) -> int:
+    from src.core.jobs import JobScheduler
+
+    if args.jobs_command == "add":
+        try:
+            payload = json.loads(args.payload)
+        except json.JSONDecodeError as e:
+            _emit({"command": "jobs add", "error": f"invalid payload: {e}"})
+            return EXIT_USAGE
+        scheduler = JobScheduler(db)
+        try:
+            job_id = scheduler.submit(args.type, payload, args.max_attempts)
+        except ValueError as e:
+            _emit({"command": "jobs add", "error": str(e)})
+            return EXIT_USAGE
+        _emit({"command": "jobs add", "id": job_id, "type": args.type})
+        return EXIT_OK
+
+    if args.jobs_command == "list":
+        jobs = db.get_jobs(args.state or None, limit=args.limit)
+        _emit({"command": "jobs list", "count": len(jobs), "jobs": jobs})
+        return EXIT_OK
+
+    if args.jobs_command == "cancel":
+        cancelled = [i for i in args.ids if db.cancel_job(i)]
+        _emit({"command": "jobs cancel", "cancelled": cancelled})
+        return EXIT_PARTIAL if len(cancelled) < len(args.ids) else EXIT_OK
+
+    if args.jobs_command == "purge":
+        _emit({"command": "jobs purge", "deleted": db.purge_jobs()})
+        return EXIT_OK
+
+    limits = {}
+    for item in args.limit or []:
+        job_type, _, n = item.partition("=")
+        if not n.isdigit():
+            _emit({"command": "jobs run", "error": f"invalid limit: {item}"})
+            return EXIT_USAGE
+        limits[job_type] = int(n)
+    scheduler = JobScheduler(db, max_workers=args.workers, limits=limits)
+    outcome = scheduler.run_until_idle(resume=not args.no_resume)
+    _emit({"command": "jobs run", **outcome})
+    return EXIT_PARTIAL if outcome.get("failed") else EXIT_OK
+
+
+def cmd_serve(db, args) -> int:
+    import asyncio
+    from src.core.http_api import HttpApi
+
+    api = HttpApi(db.db_path, args.host, args.port, args.pool_size)
+
+    async def _run():
+        await api.start()
+        _emit({"command": "serve", "url": api.url})
+        await api.serve_forever()
+
+    try:
+        asyncio.run(_run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.close()
+    return EXIT_OK
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="audio-library-cli",
+        description="Headless batch operations on the audio library.",
+    )
+    parser.add_argument("--db", default=None,
+                        help="library database (default: ~/.audio_library_manager/library.db)")
+    parser.add_argument("--metrics", metavar="PATH", default=None,
+                        help="write timing metrics here on exit (.prom for Prometheus text)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("scan", help="import files and folders")
+    p.add_argument("paths", nargs="+")
+    p.add_argument("--workers", type=int, default=_default_workers())
+    p.add_argument("--skip-duplicates", action="store_true",
+                   help="do not import exact copies of files already in the library")
+    p.set_defaults(func=cmd_scan)
+
+    p = sub.add_parser("duplicates", help="report files with identical content")
+    p.add_argument("--workers", type=int, default=_default_workers())
+    p.add_argument("--no-hash", action="store_true",
+                   help="report only, without fingerprinting unhashed files")
+    p.set_defaults(func=cmd_duplicates)
+
+    p = sub.add_parser("rescan", help="refresh metadata, report missing files")
+    p.add_argument("--workers", type=int, default=_default_workers())
+    p.set_defaults(func=cmd_rescan)
+
+    p = sub.add_parser("check", help="find missing or changed files, "
+                                     "relink moved ones")
+    p.add_argument("--relink-root", action="append", metavar="DIR",
+                   help="search here for missing files (repeatable)")
+    p.add_argument("--workers", type=int, default=32,
+                   help="concurrent stat calls (raise for network shares)")
+    p.add_argument("--dry-run", action="store_true",
+                   help="report relinks without updating the library")
+    p.add_argument("--no-update", action="store_true",
+                   help="do not store the new size and date of changed files")
+    p.set_defaults(func=cmd_check)
+
+    p = sub.add_parser("watch", help="import, update and remove files as folders "
+                                     "change (one JSON line per batch)")
+    p.add_argument("roots", nargs="+")
+    p.add_argument("--sync", action="store_true",
+                   help="first catch up with changes made while not watching")
+    p.add_argument("--debounce-ms", type=int, default=2000,
+                   help="quiet time after the last write before a file is imported")
+    p.add_argument("--poll", action="store_true",
+                   help="walk the folders instead of using inotify "
+                        "(needed for changes made on other machines)")
+    p.add_argument("--interval", type=float, default=30,
+                   help="seconds between walks with --poll")
+    p.add_argument("--workers", type=int, default=8)
+    p.add_argument("--skip-duplicates", action="store_true")
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser("transcribe", help="batch transcription")
+    p.add_argument("--ids", type=int, nargs="*")
+    p.add_argument("--force", action="store_true",
+                   help="also re-transcribe files that already have a transcript")
+    p.add_argument("--model", default="base")
+    p.add_argument("--language", default="auto")
+    p.add_argument("--workers", type=int, default=1,
+                   help="parallel model processes")
+    p.add_argument("--cpu-threads", type=int, default=0)
+    p.add_argument("--batched", action="store_true")
+    p.add_argument("--batch-size", type=int, default=16)
+    p.add_argument("--word-timestamps", action="store_true")
+    p.set_defaults(func=cmd_transcribe)
+
+    p = sub.add_parser("search", help="search the library")
+    p.add_argument("query", nargs="?", default="")
+    p.add_argument("--segments", action="store_true",
+                   help="return timestamped transcript hits")
+    p.add_argument("--format", default="")
+    p.add_argument("--tag", action="append")
+    p.add_argument("--limit", type=int, default=50)
+    p.add_argument("--offset", type=int, default=0)
+    p.set_defaults(func=cmd_search)
+
+    p = sub.add_parser("export-transcriptions", help="write transcripts to files")
+    p.add_argument("output_dir")
+    p.add_argument("--ids", type=int, nargs="*")
+    p.add_argument("--format", choices=["txt", "srt", "json"], default="txt")
+    p.add_argument("--workers", type=int, default=_default_workers())
+    p.set_defaults(func=cmd_export_transcriptions)
+
+    p = sub.add_parser("export-library",
+                       help="export the library as NDJSON, CSV or JSON "
+                            "(.gz/.bz2/.xz compress)")
+    p.add_argument("path")
+    p.add_argument("--format", choices=["ndjson", "csv", "json"])
+    p.set_defaults(func=cmd_export_library)
+
+    p = sub.add_parser("import-library", help="load an NDJSON or CSV library export")
+    p.add_argument("path")
+    p.add_argument("--format", choices=["ndjson", "csv"])
+    p.add_argument("--batch-size", type=int, default=2000)
+    p.set_defaults(func=cmd_import_library)
+
+    p = sub.add_parser("similar", help="find re-encoded or trimmed copies "
+                                       "by acoustic fingerprint")
+    p.add_argument("--id", type=int, default=0, help="only files similar to this one")
+    p.add_argument("--threshold", type=float, default=0.35)
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--no-compute", action="store_true",
+                   help="use stored fingerprints only")
+    p.set_defaults(func=cmd_similar)
+
+    p = sub.add_parser("backup", help="online backup of the library database")
+    p.add_argument("dest", help="backup file, or directory with --keep")
+    p.add_argument("--keep", type=int, default=0,
+                   help="write timestamped backups into DEST and keep the newest N")
+    p.add_argument("--pages", type=int, default=1024, help="pages copied per step")
+    p.add_argument("--sleep-ms", type=float, default=0)
+    p.add_argument("--full-check", action="store_true",
+                   help="run integrity_check instead of quick_check on the copy")
+    p.add_argument("--no-verify", action="store_true")
+    p.set_defaults(func=cmd_backup)
+
+    p = sub.add_parser("jobs", help="persistent job queue")
+    jobs = p.add_subparsers(dest="jobs_command", required=True)
+    j = jobs.add_parser("add", help="queue a job")
+    j.add_argument("type", help="import, hash_library, transcribe, export_library, "
+                                "import_library, backup, export_transcription, waveform, "
+                                "fingerprint, integrity, sync_folders")
+    j.add_argument("--payload", default="{}", help="job arguments as JSON")
+    j.add_argument("--max-attempts", type=int, default=3)
+    j = jobs.add_parser("list", help="show jobs")
+    j.add_argument("--state", action="append",
+                   choices=["queued", "running", "done", "failed", "cancelled"])
+    j.add_argument("--limit", type=int, default=0)
+    j = jobs.add_parser("cancel", help="cancel queued jobs")
+    j.add_argument("ids", type=int, nargs="+")
+    jobs.add_parser("purge", help="delete done and cancelled jobs")
+    j = jobs.add_parser("run", help="run queued jobs until the queue is empty")
+    j.add_argument("--workers", type=int, default=4)
+    j.add_argument("--limit", action="append", metavar="TYPE=N",
+                   help="per-type concurrency, e.g. transcribe=1")
+    j.add_argument("--no-resume", action="store_true",
+                   help="leave jobs marked running by another process alone")
+    p.set_defaults(func=cmd_jobs)
+
+    p = sub.add_parser("serve", help="read-only HTTP API with audio streaming")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--pool-size", type=int, default=8,
+                   help="read-only database connections")
+    p.set_defaults(func=cmd_serve)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    _setup_path()
+    args = build_parser().parse_args(argv)
+
+    from src.core.database import Database
+    from src.utils import metrics
+    if args.metrics:
+        metrics.enable()
+    try:
+        db = Database(args.db)
+        return args.func(db, args)
+    except Exception as e:
+        _emit({"command": args.command, "error": str(e)})
+        return EXIT_ERROR
+    finally:
+        if args.metrics:
+            metrics.write(args.metrics)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,17 @@
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from pydub import AudioSegment
-
-from src.utils.file_utils import get_audio_metadata, is_audio_file, scan_folder
+from src.utils.file_utils import (
+    full_hash, get_audio_metadata, is_audio_file, partial_hash, scan_folder,
+)
 from src.core.database import Database
+from src.utils import metrics
+
+if TYPE_CHECKING:
+    from pydub import AudioSegment
 
 
 class AudioManager:
@@ -13,40 +19,192 @@ class AudioManager:
         self.db = db
 
     def import_file(self, file_path: str) -> int | None:
-        if not os.path.isfile(file_path) or not is_audio_file(file_path):
+        ids = self.import_files([file_path], workers=1)
+        return ids[0] if ids else None
+
+    @metrics.timed("audio.import_files")
+    def import_files(self, file_paths: list[str], workers: int = 8,
+                     skip_duplicates: bool = False,
+                     skipped: list | None = None) -> list[int]:
+        """Probe metadata and partial hashes in parallel (I/O bound), then
+        insert all rows in a single transaction.
+
+        Files whose partial hash collides with another file (already in the
+        library or in this batch) get a full content hash. With
+        ``skip_duplicates`` exact copies are not imported; each is appended
+        to ``skipped`` as ``(path, id of the copy already in the library)``,
+        the id being None when the copy is earlier in the same batch.
+        """
+        paths = [p for p in file_paths if os.path.isfile(p) and is_audio_file(p)]
+        if not paths:
+            return []
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            metas = [m for m in pool.map(self._probe, paths) if m]
+            duplicates = self._resolve_duplicates(metas, pool)
+        if skip_duplicates:
+            if skipped is not None:
+                skipped.extend((m["file_path"], duplicates[m["file_path"]])
+                               for m in metas if m["file_path"] in duplicates)
+            metas = [m for m in metas if m["file_path"] not in duplicates]
+        return [aid for aid in self.db.add_audio_many(metas) if aid]
+
+    @staticmethod
+    def _probe(file_path: str) -> dict | None:
+        try:
+            with metrics.timer("audio.probe"):
+                meta = get_audio_metadata(file_path)
+                meta["partial_hash"] = partial_hash(file_path, meta["file_size"])
+                return meta
+        except OSError:
+            metrics.count("audio.probe.errors")
             return None
-        meta = get_audio_metadata(file_path)
-        return self.db.add_audio(meta)
-
-    def import_folder(self, folder_path: str) -> list[int]:
-        files = scan_folder(folder_path)
-        ids = []
-        for f in files:
-            aid = self.import_file(f)
-            if aid:
-                ids.append(aid)
-        return ids
-
-    def remove_from_library(self, audio_id: int, delete_file: bool = False):
-        if delete_file:
-            info = self.db.get_audio(audio_id)
-            if info and os.path.isfile(info["file_path"]):
-                os.remove(info["file_path"])
+
+    @staticmethod
+    def _full_hash(file_path: str) -> str | None:
+        try:
+            with metrics.timer("audio.full_hash"):
+                return full_hash(file_path)
+        except OSError:
+            return None
+
+    def _resolve_duplicates(self, metas: list[dict], pool) -> dict[str, int | None]:
+        """Set ``content_hash`` on metas whose partial hash collides and
+        return {path: id of existing copy, or None} for exact duplicates.
+        Library rows involved in a collision get their full hash stored.
+        Files already in the library are never reported: their rows own
+        their content even when they are imported again."""
+        in_library = self.db.existing_paths([m["file_path"] for m in metas])
+        metas = [m for m in metas if m["file_path"] not in in_library]
+        by_partial: dict[str, list[dict]] = {}
+        for meta in metas:
+            by_partial.setdefault(meta["partial_hash"], []).append(meta)
+        known: dict[str, list[dict]] = {}
+        for row in self.db.find_audio_by_partial_hash(list(by_partial)):
+            known.setdefault(row["partial_hash"], []).append(row)
+
+        candidates = [m for p, group in by_partial.items()
+                      if len(group) > 1 or p in known for m in group]
+        if not candidates:
+            return {}
+        unhashed = [r for p in {m["partial_hash"] for m in candidates}
+                    for r in known.get(p, []) if not r["content_hash"]]
+        for meta, digest in zip(candidates, pool.map(
+                self._full_hash, [m["file_path"] for m in candidates])):
+            meta["content_hash"] = digest
+        stored = []
+        for row, digest in zip(unhashed, pool.map(
+                self._full_hash, [r["file_path"] for r in unhashed])):
+            row["content_hash"] = digest
+            if digest:
+                stored.append((row["id"], None, digest))
+        if stored:
+            self.db.set_hashes(stored)
+
+        owners: dict[str, int | None] = {
+            r["content_hash"]: r["id"] for rows in known.values() for r in rows
+            if r["content_hash"]
+        }
+        duplicates = {}
+        for meta in metas:
+            digest = meta.get("content_hash")
+            if not digest:
+                continue
+            if digest in owners:
+                duplicates[meta["file_path"]] = owners[digest]
+            else:
+                owners[digest] = None
+        return duplicates
+
+    @metrics.timed("audio.hash_library")
+    def hash_library(self, workers: int = 8) -> dict:
+        """Fingerprint files imported before hashing existed, then confirm
+        partial-hash collisions with full hashes."""
+        rows = self.db.audio_without_hash()
+
+        def _partial(row: dict) -> str | None:
+            try:
+                return partial_hash(row["file_path"])
+            except OSError:
+                return None
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            digests = list(pool.map(_partial, rows))
+            items = [(r["id"], d, None) for r, d in zip(rows, digests) if d]
+            self.db.set_hashes(items)
+
+            colliding: dict[str, list[dict]] = {}
+            for row in self.db.find_audio_by_partial_hash([d for _, d, _ in items]):
+                colliding.setdefault(row["partial_hash"], []).append(row)
+            todo = [r for group in colliding.values() if len(group) > 1
+                    for r in group if not r["content_hash"]]
+            full = list(pool.map(self._full_hash, [r["file_path"] for r in todo]))
+        self.db.set_hashes([(r["id"], None, d) for r, d in zip(todo, full) if d])
+        return {"hashed": len(items), "missing": len(rows) - len(items),
+                "full_hashed": sum(1 for d in full if d)}
+
+    def import_folder(self, folder_path: str, workers: int = 8) -> list[int]:
+        return self.import_files(scan_folder(folder_path), workers=workers)
+
+    def refresh_files(self, audio_ids: list[int], workers: int = 8) -> list[int]:
+        """Re-read metadata of files rewritten on disk; titles and tags are
+        kept. Returns the ids that were updated."""
+        rows = [r for r in (self.db.get_audio(i) for i in audio_ids) if r]
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            metas = list(pool.map(self._probe, [r["file_path"] for r in rows]))
+        updated = []
+        for row, meta in zip(rows, metas):
+            if not meta:
+                continue
+            self.db.update_audio(
+                row["id"],
+                duration=meta["duration"],
+                file_size=meta["file_size"],
+                date_modified=meta["date_modified"],
+                sample_rate=meta["sample_rate"],
+                channels=meta["channels"],
+                bitrate=meta["bitrate"],
+                partial_hash=meta["partial_hash"],
+                content_hash=None,
+            )
+            updated.append(row["id"])
+        return updated
+
+    def remove_from_library(self, audio_id: int, delete_file: bool = False) -> bool:
+        """Drop the row; with ``delete_file`` also the file, if it still
+        exists. Returns whether a file was deleted. Raises LookupError for an
+        unknown id and OSError when the file cannot be deleted (the row is
+        then kept)."""
+        info = self.db.get_audio(audio_id)
+        if not info:
+            raise LookupError(f"audio {audio_id} not in library")
+        deleted = False
+        if delete_file and os.path.isfile(info["file_path"]):
+            os.remove(info["file_path"])
+            deleted = True
         self.db.delete_audio(audio_id)
+        return deleted
+
+    def rename_file(self, audio_id: int, new_name: str) -> str:
+        """Rename the file on disk and in the library; returns the new path.
 
-    def rename_file(self, audio_id: int, new_name: str) -> str | None:
+        Raises LookupError for an unknown id, FileNotFoundError when the file
+        has moved (see core.integrity.relink_missing) and FileExistsError
+        when the target name is taken.
+        """
         info = self.db.get_audio(audio_id)
         if not info:
-            return None
+            raise LookupError(f"audio {audio_id} not in library")
         old_path = Path(info["file_path"])
         if not old_path.exists():
-            return None
+            raise FileNotFoundError(f"file not found: {old_path}")
         ext = old_path.suffix
         if not new_name.endswith(ext):
             new_name += ext
         new_path = old_path.parent / new_name
+        if new_path == old_path:
+            return str(old_path)
         if new_path.exists():
-            return None
+            raise FileExistsError(f"file already exists: {new_path}")
         old_path.rename(new_path)
         self.db.update_audio(
             audio_id,
@@ -56,7 +214,9 @@ class AudioManager:
         )
         return str(new_path)
 
-    def get_audio_segment(self, file_path: str) -> AudioSegment | None:
+    @metrics.timed("audio.get_audio_segment")
+    def get_audio_segment(self, file_path: str) -> "AudioSegment | None":
+        from pydub import AudioSegment
         try:
             return AudioSegment.from_file(file_path)
         except Exception:
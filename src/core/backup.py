@@ -0,0 +1,120 @@
+"""Online backups of the library database through SQLite's backup API.
+
+The copy is made in page steps on a connection that holds one read
+snapshot for the whole run. In WAL mode that snapshot does not block
+writers, and it keeps the copy consistent: without it every commit from
+another connection would restart the backup from the first page. The
+copy is written next to the destination, checked, then renamed into
+place, so a failed run never leaves a half-written backup under the final
+name.
+"""
+
+import os
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+
+from src.utils import metrics
+
+ROTATION_PREFIX = "library-"
+
+
+def backup_database(db_path: str, dest: str, pages: int = 1024,
+                    sleep_ms: float = 0, verify: str | None = "quick",
+                    progress=None) -> dict:
+    """Copy ``db_path`` to ``dest``.
+
+    ``pages`` are copied per step, pausing ``sleep_ms`` between steps.
+    ``verify`` is ``"quick"`` (PRAGMA quick_check), ``"full"``
+    (integrity_check) or None. ``progress(done_pages, total_pages)`` is
+    called after every step. Raises sqlite3.DatabaseError if the copy fails
+    verification.
+    """
+    started = time.perf_counter()
+    tmp = f"{dest}.partial"
+    _remove(tmp)
+    total = 0
+
+    def on_step(status, remaining, page_count):
+        nonlocal total
+        total = page_count
+        if progress is not None:
+            progress(page_count - remaining, page_count)
+
+    with metrics.timer("db.backup"):
+        src = sqlite3.connect(db_path, timeout=30)
+        try:
+            src.execute("BEGIN")
+            src.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone()
+            dst = sqlite3.connect(tmp)
+            try:
+                src.backup(dst, pages=max(1, pages), progress=on_step,
+                           sleep=max(0.0, sleep_ms) / 1000.0)
+            finally:
+                dst.close()
+            src.rollback()
+        finally:
+            src.close()
+
+    integrity = None
+    if verify:
+        integrity = check_integrity(tmp, full=verify == "full")
+        if integrity != "ok":
+            _remove(tmp)
+            raise sqlite3.DatabaseError(f"backup failed integrity check: {integrity}")
+    os.replace(tmp, dest)
+    return {
+        "path": dest,
+        "pages": total,
+        "bytes": os.path.getsize(dest),
+        "seconds": round(time.perf_counter() - started, 3),
+        "integrity": integrity,
+    }
+
+
+def check_integrity(path: str, full: bool = False) -> str:
+    """'ok' or the first problems SQLite reports for the database at ``path``."""
+    conn = sqlite3.connect(path)
+    try:
+        pragma = "integrity_check" if full else "quick_check"
+        rows = [r[0] for r in conn.execute(f"PRAGMA {pragma}(20)")]
+    finally:
+        conn.close()
+    return "ok" if rows == ["ok"] else "; ".join(rows)
+
+
+def backup_rotating(db_path: str, directory: str, keep: int = 7, **kwargs) -> dict:
+    """Back up into a timestamped file in ``directory`` and delete all but
+    the ``keep`` newest backups made this way."""
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    name = f"{ROTATION_PREFIX}{datetime.now():%Y%m%d-%H%M%S}.db"
+    result = backup_database(db_path, os.path.join(directory, name), **kwargs)
+    result["removed"] = rotate_backups(directory, keep)
+    return result
+
+
+def _rotated(directory: str) -> list[Path]:
+    # Timestamped names sort chronologically.
+    return sorted(Path(directory).glob(f"{ROTATION_PREFIX}*.db"))
+
+
+def latest_backup(directory: str) -> str | None:
+    backups = _rotated(directory)
+    return str(backups[-1]) if backups else None
+
+
+def rotate_backups(directory: str, keep: int) -> list[str]:
+    backups = _rotated(directory)
+    stale = backups[:-keep] if keep > 0 else []
+    for path in stale:
+        _remove(str(path))
+    return [str(p) for p in stale]
+
+
+def _remove(path: str):
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
@@ -1,10 +1,18 @@
 import sqlite3
 import json
 import os
+import queue
+import re
+import threading
+import time
+from array import array
 from pathlib import Path
 from datetime import datetime
 from contextlib import contextmanager
 
+from src.core.word_index import WordIndex, _pack, _unpack
+from src.utils import metrics
+
 
 class Database:
     def __init__(self, db_path: str | None = None):
@@ -13,14 +21,24 @@ class Database:
             config_dir.mkdir(parents=True, exist_ok=True)
             db_path = str(config_dir / "library.db")
         self.db_path = db_path
+        self._local = threading.local()
         self._init_db()
 
     @contextmanager
-    def _conn(self):
+    def _conn(self, cancelled=None):
+        shared = getattr(self._local, "conn", None)
+        if shared is not None:
+            # Inside a DatabaseWriter batch: the writer owns the transaction.
+            yield shared
+            return
         conn = sqlite3.connect(self.db_path)
+        metrics.count("db.connections")
         conn.row_factory = sqlite3.Row
         conn.execute("PRAGMA journal_mode=WAL")
         conn.execute("PRAGMA foreign_keys=ON")
+        if cancelled is not None:
+            # Aborts the running statement with OperationalError("interrupted").
+            conn.set_progress_handler(lambda: 1 if cancelled() else 0, 1000)
         try:
             yield conn
             conn.commit()
@@ -47,13 +65,16 @@ class Database:
                     date_added TEXT NOT NULL,
                     date_modified TEXT,
                     notes TEXT DEFAULT '',
-                    is_transcribed INTEGER DEFAULT 0
+                    is_transcribed INTEGER DEFAULT 0,
+                    partial_hash TEXT,
+                    content_hash TEXT
                 );
 
                 CREATE TABLE IF NOT EXISTS tags (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     name TEXT UNIQUE NOT NULL,
-                    color TEXT DEFAULT '#3498db'
+                    color TEXT DEFAULT '#3498db',
+                    audio_count INTEGER NOT NULL DEFAULT 0
                 );
 
                 CREATE TABLE IF NOT EXISTS audio_tags (
@@ -83,21 +104,172 @@ class Database:
                     FOREIGN KEY (transcription_id) REFERENCES transcriptions(id) ON DELETE CASCADE
                 );
 
+                CREATE TABLE IF NOT EXISTS transcription_words (
+                    transcription_id INTEGER PRIMARY KEY,
+                    word_count INTEGER NOT NULL,
+                    starts BLOB NOT NULL,
+                    ends BLOB NOT NULL,
+                    offsets BLOB NOT NULL,
+                    text TEXT NOT NULL,
+                    FOREIGN KEY (transcription_id) REFERENCES transcriptions(id) ON DELETE CASCADE
+                );
+
+                CREATE TABLE IF NOT EXISTS waveform_peaks (
+                    audio_id INTEGER PRIMARY KEY,
+                    points INTEGER NOT NULL,
+                    peaks BLOB NOT NULL,
+                    file_size INTEGER NOT NULL,
+                    date_modified TEXT,
+                    FOREIGN KEY (audio_id) REFERENCES audio_files(id) ON DELETE CASCADE
+                );
+
+                CREATE TABLE IF NOT EXISTS audio_fingerprints (
+                    audio_id INTEGER PRIMARY KEY,
+                    signature BLOB NOT NULL,
+                    file_size INTEGER NOT NULL,
+                    date_modified TEXT,
+                    FOREIGN KEY (audio_id) REFERENCES audio_files(id) ON DELETE CASCADE
+                );
+
+                -- LSH buckets of the fingerprint signatures (core.fingerprint).
+                CREATE TABLE IF NOT EXISTS fingerprint_lsh (
+                    band INTEGER NOT NULL,
+                    key INTEGER NOT NULL,
+                    audio_id INTEGER NOT NULL,
+                    PRIMARY KEY (band, key, audio_id),
+                    FOREIGN KEY (audio_id) REFERENCES audio_files(id) ON DELETE CASCADE
+                ) WITHOUT ROWID;
+
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_type TEXT NOT NULL,
+                    payload TEXT NOT NULL DEFAULT '{}',
+                    state TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL DEFAULT 3,
+                    result TEXT,
+                    error TEXT DEFAULT '',
+                    date_created TEXT NOT NULL,
+                    date_started TEXT,
+                    date_finished TEXT,
+                    owner TEXT,
+                    lease_until REAL
+                );
+
                 CREATE INDEX IF NOT EXISTS idx_audio_title ON audio_files(title);
                 CREATE INDEX IF NOT EXISTS idx_audio_format ON audio_files(format);
                 CREATE INDEX IF NOT EXISTS idx_audio_path ON audio_files(file_path);
                 CREATE INDEX IF NOT EXISTS idx_segments_trans ON transcription_segments(transcription_id);
+                CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state, id);
+                CREATE INDEX IF NOT EXISTS idx_audio_tags_tag ON audio_tags(tag_id, audio_id);
+                CREATE INDEX IF NOT EXISTS idx_fingerprint_lsh_audio ON fingerprint_lsh(audio_id);
+
+                -- One (sort key, id) index per sortable column, matching
+                -- SORT_COLUMNS, so keyset pages are index range scans.
+                CREATE INDEX IF NOT EXISTS idx_audio_sort_title ON audio_files(title COLLATE NOCASE, id);
+                CREATE INDEX IF NOT EXISTS idx_audio_sort_duration ON audio_files(IFNULL(duration, 0), id);
+                CREATE INDEX IF NOT EXISTS idx_audio_sort_format ON audio_files(format, id);
+                CREATE INDEX IF NOT EXISTS idx_audio_sort_size ON audio_files(IFNULL(file_size, 0), id);
+                CREATE INDEX IF NOT EXISTS idx_audio_sort_transcribed ON audio_files(IFNULL(is_transcribed, 0), id);
+                CREATE INDEX IF NOT EXISTS idx_audio_sort_added ON audio_files(date_added, id);
             """)
+            self._init_hashes(conn)
+            self._init_job_leases(conn)
+            self._init_tag_counts(conn)
+            self._fts = self._init_fts(conn)
+
+    def _init_hashes(self, conn):
+        """Content fingerprints (see file_utils.partial_hash); columns are
+        added to older databases and filled in by ``hash_library``."""
+        cols = {r[1] for r in conn.execute("PRAGMA table_info(audio_files)")}
+        for col in ("partial_hash", "content_hash"):
+            if col not in cols:
+                conn.execute(f"ALTER TABLE audio_files ADD COLUMN {col} TEXT")
+        conn.executescript("""
+            CREATE INDEX IF NOT EXISTS idx_audio_partial_hash ON audio_files(partial_hash);
+            CREATE INDEX IF NOT EXISTS idx_audio_content_hash ON audio_files(content_hash);
+        """)
+
+    def _init_job_leases(self, conn):
+        """Running jobs record who runs them and until when (see
+        claim_job); older databases get the columns."""
+        cols = {r[1] for r in conn.execute("PRAGMA table_info(jobs)")}
+        for col, kind in (("owner", "TEXT"), ("lease_until", "REAL")):
+            if col not in cols:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {col} {kind}")
+
+    def _init_tag_counts(self, conn):
+        """``tags.audio_count`` is kept current by triggers on audio_tags
+        (cascaded deletes fire them too); older databases get the column and
+        a one-off recount."""
+        cols = {r[1] for r in conn.execute("PRAGMA table_info(tags)")}
+        if "audio_count" not in cols:
+            conn.execute(
+                "ALTER TABLE tags ADD COLUMN audio_count INTEGER NOT NULL DEFAULT 0"
+            )
+            conn.execute(
+                """UPDATE tags SET audio_count =
+                   (SELECT COUNT(*) FROM audio_tags WHERE tag_id = tags.id)"""
+            )
+        conn.executescript("""
+            CREATE TRIGGER IF NOT EXISTS audio_tags_count_ai AFTER INSERT ON audio_tags BEGIN
+                UPDATE tags SET audio_count = audio_count + 1 WHERE id = new.tag_id;
+            END;
+            CREATE TRIGGER IF NOT EXISTS audio_tags_count_ad AFTER DELETE ON audio_tags BEGIN
+                UPDATE tags SET audio_count = audio_count - 1 WHERE id = old.tag_id;
+            END;
+        """)
+
+    def _init_fts(self, conn) -> bool:
+        """Full-text index over transcription_segments, kept in sync by
+        triggers. Returns False when SQLite lacks FTS5 (LIKE fallback)."""
+        existed = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'segments_fts'"
+        ).fetchone()
+        try:
+            conn.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(
+                    text,
+                    content='transcription_segments',
+                    content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                );
+
+                CREATE TRIGGER IF NOT EXISTS segments_fts_ai
+                AFTER INSERT ON transcription_segments BEGIN
+                    INSERT INTO segments_fts(rowid, text) VALUES (new.id, new.text);
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS segments_fts_ad
+                AFTER DELETE ON transcription_segments BEGIN
+                    INSERT INTO segments_fts(segments_fts, rowid, text)
+                    VALUES ('delete', old.id, old.text);
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS segments_fts_au
+                AFTER UPDATE OF text ON transcription_segments BEGIN
+                    INSERT INTO segments_fts(segments_fts, rowid, text)
+                    VALUES ('delete', old.id, old.text);
+                    INSERT INTO segments_fts(rowid, text) VALUES (new.id, new.text);
+                END;
+            """)
+        except sqlite3.OperationalError:
+            return False
+        if not existed:
+            conn.execute("INSERT INTO segments_fts(segments_fts) VALUES ('rebuild')")
+        return True
 
     # --- Audio files ---
 
+    @metrics.timed("db.add_audio")
     def add_audio(self, metadata: dict) -> int:
         with self._conn() as conn:
             cur = conn.execute(
                 """INSERT OR IGNORE INTO audio_files
                    (file_path, file_name, title, format, duration, file_size,
-                    sample_rate, channels, bitrate, date_added, date_modified)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    sample_rate, channels, bitrate, date_added, date_modified,
+                    partial_hash, content_hash)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
                 (
                     metadata["file_path"],
                     metadata["file_name"],
@@ -110,6 +282,8 @@ class Database:
                     metadata.get("bitrate", 0),
                     metadata.get("date_added", datetime.now().isoformat()),
                     metadata.get("date_modified", ""),
+                    metadata.get("partial_hash"),
+                    metadata.get("content_hash"),
                 ),
             )
             if cur.lastrowid:
@@ -120,13 +294,60 @@ class Database:
             ).fetchone()
             return row["id"] if row else 0
 
-    def get_all_audio(self) -> list[dict]:
+    @metrics.timed("db.add_audio_many")
+    def add_audio_many(self, metadata_list: list[dict]) -> list[int]:
+        """Insert many files in one transaction; returns their ids (existing
+        rows keep their id), in input order."""
+        ids = []
         with self._conn() as conn:
-            rows = conn.execute(
-                "SELECT * FROM audio_files ORDER BY date_added DESC"
-            ).fetchall()
-            return [dict(r) for r in rows]
+            for metadata in metadata_list:
+                conn.execute(
+                    """INSERT OR IGNORE INTO audio_files
+                       (file_path, file_name, title, format, duration, file_size,
+                        sample_rate, channels, bitrate, date_added, date_modified,
+                        partial_hash, content_hash)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (
+                        metadata["file_path"],
+                        metadata["file_name"],
+                        metadata["title"],
+                        metadata["format"],
+                        metadata.get("duration", 0),
+                        metadata.get("file_size", 0),
+                        metadata.get("sample_rate", 0),
+                        metadata.get("channels", 0),
+                        metadata.get("bitrate", 0),
+                        metadata.get("date_added", datetime.now().isoformat()),
+                        metadata.get("date_modified", ""),
+                        metadata.get("partial_hash"),
+                        metadata.get("content_hash"),
+                    ),
+                )
+                row = conn.execute(
+                    "SELECT id FROM audio_files WHERE file_path = ?",
+                    (metadata["file_path"],),
+                ).fetchone()
+                ids.append(row["id"] if row else 0)
+        return ids
+
+    @metrics.timed("db.get_all_audio")
+    def get_all_audio(self, sort: str = "date_added", descending: bool = True,
+                      limit: int = 0, after: tuple | None = None) -> list[dict]:
+        return self.search_audio(sort=sort, descending=descending,
+                                 limit=limit, after=after)
+
+    def iter_audio(self, page_size: int = 1000, **filters):
+        """Yield every matching row, fetched in keyset pages."""
+        sort = filters.pop("sort", "date_added")
+        after = None
+        while True:
+            page = self.search_audio(**filters, sort=sort, limit=page_size, after=after)
+            yield from page
+            if len(page) < page_size:
+                return
+            after = self.page_cursor(page[-1], sort)
 
+    @metrics.timed("db.get_audio")
     def get_audio(self, audio_id: int) -> dict | None:
         with self._conn() as conn:
             row = conn.execute(
@@ -134,10 +355,12 @@ class Database:
             ).fetchone()
             return dict(row) if row else None
 
+    @metrics.timed("db.delete_audio")
     def delete_audio(self, audio_id: int):
         with self._conn() as conn:
             conn.execute("DELETE FROM audio_files WHERE id = ?", (audio_id,))
 
+    @metrics.timed("db.update_audio")
     def update_audio(self, audio_id: int, **fields):
         if not fields:
             return
@@ -148,8 +371,30 @@ class Database:
                 f"UPDATE audio_files SET {set_clause} WHERE id = ?", values
             )
 
-    def search_audio(self, query: str = "", tags: list[str] | None = None,
-                     fmt: str = "", min_dur: float = 0, max_dur: float = 0) -> list[dict]:
+    # Each expression must match its idx_audio_sort_* index exactly.
+    SORT_COLUMNS = {
+        "title": "a.title COLLATE NOCASE",
+        "duration": "IFNULL(a.duration, 0)",
+        "format": "a.format",
+        "file_size": "IFNULL(a.file_size, 0)",
+        "is_transcribed": "IFNULL(a.is_transcribed, 0)",
+        "date_added": "a.date_added",
+    }
+    _NULLABLE_SORTS = {"duration", "file_size", "is_transcribed"}
+
+    @classmethod
+    def page_cursor(cls, row: dict, sort: str = "date_added") -> tuple:
+        """Keyset cursor for the page that follows ``row`` (pass as ``after``)."""
+        if sort not in cls.SORT_COLUMNS:
+            sort = "date_added"
+        value = row[sort]
+        if value is None and sort in cls._NULLABLE_SORTS:
+            value = 0
+        return value, row["id"]
+
+    def _search_where(self, query: str = "", tags: list[str] | None = None,
+                      fmt: str = "", min_dur: float = 0,
+                      max_dur: float = 0) -> tuple[str, list]:
         conditions = []
         params = []
 
@@ -173,31 +418,71 @@ class Database:
             conditions.append("a.duration <= ?")
             params.append(max_dur)
 
+        for tag in tags or []:
+            conditions.append(
+                "EXISTS (SELECT 1 FROM audio_tags at JOIN tags tg ON tg.id = at.tag_id "
+                "WHERE at.audio_id = a.id AND tg.name = ? COLLATE NOCASE)"
+            )
+            params.append(tag)
+
         where = ""
         if conditions:
             where = "WHERE " + " AND ".join(conditions)
+        return where, params
 
-        sql = f"SELECT DISTINCT a.* FROM audio_files a {where} ORDER BY a.date_added DESC"
-
-        with self._conn() as conn:
-            rows = conn.execute(sql, params).fetchall()
-            results = [dict(r) for r in rows]
+    @metrics.timed("db.search_audio")
+    def search_audio(self, query: str = "", tags: list[str] | None = None,
+                     fmt: str = "", min_dur: float = 0, max_dur: float = 0,
+                     sort: str = "date_added", descending: bool = True,
+                     limit: int = 0, offset: int = 0, after: tuple | None = None,
+                     cancelled=None) -> list[dict]:
+        """Matching rows ordered by ``sort`` with ``id`` as tiebreaker.
 
-        if tags:
-            results = [r for r in results if self._audio_has_tags(r["id"], tags)]
+        ``after`` is a cursor from ``page_cursor()`` on the last row of the
+        previous page; it seeks in the sort index instead of skipping
+        ``offset`` rows, so every page costs the same.
+        """
+        where, params = self._search_where(query, tags, fmt, min_dur, max_dur)
+        column = self.SORT_COLUMNS.get(sort, self.SORT_COLUMNS["date_added"])
+        direction = "DESC" if descending else "ASC"
+        if after is not None:
+            op = "<" if descending else ">"
+            # The single-column bound lets SQLite seek expression indexes,
+            # which it does not do for the row-value comparison alone.
+            where += (" AND " if where else "WHERE ") + (
+                f"{column} {op}= ? AND ({column}, a.id) {op} (?, ?)"
+            )
+            params.extend([after[0], after[0], after[1]])
+        sql = (f"SELECT a.* FROM audio_files a {where} "
+               f"ORDER BY {column} {direction}, a.id {direction}")
+        if limit > 0:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([limit, offset])
 
-        return results
+        with self._conn(cancelled) as conn:
+            rows = conn.execute(sql, params).fetchall()
+            return [dict(r) for r in rows]
 
-    def _audio_has_tags(self, audio_id: int, tag_names: list[str]) -> bool:
-        with self._conn() as conn:
-            rows = conn.execute(
-                """SELECT t.name FROM tags t
-                   JOIN audio_tags at ON t.id = at.tag_id
-                   WHERE at.audio_id = ?""",
-                (audio_id,),
-            ).fetchall()
-            existing = {r["name"].lower() for r in rows}
-            return all(t.lower() in existing for t in tag_names)
+    @metrics.timed("db.count_audio")
+    def count_audio(self, query: str = "", tags: list[str] | None = None,
+                    fmt: str = "", min_dur: float = 0, max_dur: float = 0,
+                    cancelled=None) -> int:
+        if tags and len(tags) == 1 and not (query or fmt or min_dur > 0 or max_dur > 0):
+            # Tag facet counts are maintained by triggers; only usable when
+            # the case-insensitive name resolves to a single tag.
+            with self._conn(cancelled) as conn:
+                rows = conn.execute(
+                    "SELECT audio_count FROM tags WHERE name = ? COLLATE NOCASE",
+                    (tags[0],),
+                ).fetchall()
+            if len(rows) <= 1:
+                return rows[0][0] if rows else 0
+        where, params = self._search_where(query, tags, fmt, min_dur, max_dur)
+        with self._conn(cancelled) as conn:
+            row = conn.execute(
+                f"SELECT COUNT(*) FROM audio_files a {where}", params
+            ).fetchone()
+            return row[0]
 
     # --- Tags ---
 
@@ -212,11 +497,13 @@ class Database:
             ).fetchone()
             return row["id"]
 
+    @metrics.timed("db.get_all_tags")
     def get_all_tags(self) -> list[dict]:
         with self._conn() as conn:
             rows = conn.execute("SELECT * FROM tags ORDER BY name").fetchall()
             return [dict(r) for r in rows]
 
+    @metrics.timed("db.tag_audio")
     def tag_audio(self, audio_id: int, tag_id: int):
         with self._conn() as conn:
             conn.execute(
@@ -224,6 +511,7 @@ class Database:
                 (audio_id, tag_id),
             )
 
+    @metrics.timed("db.untag_audio")
     def untag_audio(self, audio_id: int, tag_id: int):
         with self._conn() as conn:
             conn.execute(
@@ -231,6 +519,58 @@ class Database:
                 (audio_id, tag_id),
             )
 
+    @metrics.timed("db.tag_audio_many")
+    def tag_audio_many(self, audio_ids: list[int], tag_id: int) -> int:
+        """Tag a set of files in one statement; returns how many were newly
+        tagged (unknown ids are skipped)."""
+        with self._conn() as conn:
+            cur = conn.execute(
+                """INSERT OR IGNORE INTO audio_tags (audio_id, tag_id)
+                   SELECT a.id, ? FROM audio_files a
+                   WHERE a.id IN (SELECT value FROM json_each(?))""",
+                (tag_id, json.dumps(list(audio_ids))),
+            )
+            return cur.rowcount
+
+    @metrics.timed("db.untag_audio_many")
+    def untag_audio_many(self, audio_ids: list[int], tag_id: int) -> int:
+        with self._conn() as conn:
+            cur = conn.execute(
+                """DELETE FROM audio_tags WHERE tag_id = ?
+                   AND audio_id IN (SELECT value FROM json_each(?))""",
+                (tag_id, json.dumps(list(audio_ids))),
+            )
+            return cur.rowcount
+
+    def rename_tag(self, tag_id: int, new_name: str) -> int:
+        """Rename a tag; if ``new_name`` already exists the two are merged.
+        Returns the id of the resulting tag."""
+        with self._conn() as conn:
+            row = conn.execute(
+                "SELECT id FROM tags WHERE name = ? AND id != ?", (new_name, tag_id)
+            ).fetchone()
+            if row is None:
+                conn.execute("UPDATE tags SET name = ? WHERE id = ?", (new_name, tag_id))
+                return tag_id
+            target = row["id"]
+            conn.execute(
+                """INSERT OR IGNORE INTO audio_tags (audio_id, tag_id)
+                   SELECT audio_id, ? FROM audio_tags WHERE tag_id = ?""",
+                (target, tag_id),
+            )
+            conn.execute("DELETE FROM tags WHERE id = ?", (tag_id,))
+            return target
+
+    @metrics.timed("db.get_tag_counts")
+    def get_tag_counts(self) -> list[dict]:
+        """Tags with the number of files carrying them, most used first."""
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT * FROM tags ORDER BY audio_count DESC, name"
+            ).fetchall()
+            return [dict(r) for r in rows]
+
+    @metrics.timed("db.get_audio_tags")
     def get_audio_tags(self, audio_id: int) -> list[dict]:
         with self._conn() as conn:
             rows = conn.execute(
@@ -248,8 +588,10 @@ class Database:
 
     # --- Transcriptions ---
 
+    @metrics.timed("db.save_transcription")
     def save_transcription(self, audio_id: int, full_text: str, language: str,
-                           model_used: str, segments: list[dict]):
+                           model_used: str, segments: list[dict],
+                           words: list[dict] | None = None):
         with self._conn() as conn:
             conn.execute(
                 "DELETE FROM transcriptions WHERE audio_id = ?", (audio_id,)
@@ -269,11 +611,21 @@ class Database:
                        VALUES (?, ?, ?, ?)""",
                     (trans_id, seg["start"], seg["end"], seg["text"]),
                 )
+            if words:
+                packed = WordIndex.from_words(words).to_row()
+                conn.execute(
+                    """INSERT INTO transcription_words
+                       (transcription_id, word_count, starts, ends, offsets, text)
+                       VALUES (?, ?, ?, ?, ?, ?)""",
+                    (trans_id, packed["word_count"], packed["starts"],
+                     packed["ends"], packed["offsets"], packed["text"]),
+                )
             conn.execute(
                 "UPDATE audio_files SET is_transcribed = 1 WHERE id = ?",
                 (audio_id,),
             )
 
+    @metrics.timed("db.get_transcription")
     def get_transcription(self, audio_id: int) -> dict | None:
         with self._conn() as conn:
             row = conn.execute(
@@ -288,30 +640,497 @@ class Database:
                    ORDER BY start_time""",
                 (trans["id"],),
             ).fetchall()
-            trans["segments"] = [dict(s) for s in segs]
+            trans["segments"] = [
+                {**dict(s), "start": s["start_time"], "end": s["end_time"]}
+                for s in segs
+            ]
             return trans
 
+    @metrics.timed("db.get_word_index")
+    def get_word_index(self, audio_id: int) -> WordIndex | None:
+        with self._conn() as conn:
+            row = conn.execute(
+                """SELECT w.* FROM transcription_words w
+                   JOIN transcriptions t ON t.id = w.transcription_id
+                   WHERE t.audio_id = ?""",
+                (audio_id,),
+            ).fetchone()
+            return WordIndex.from_row(dict(row)) if row else None
+
+    @staticmethod
+    def _fts_query(text: str) -> str:
+        tokens = re.findall(r"\w+", text)
+        if not tokens:
+            return ""
+        quoted = [f'"{t}"' for t in tokens]
+        quoted[-1] += "*"
+        return " ".join(quoted)
+
+    @staticmethod
+    def _highlight(text: str, query: str, width: int = 160) -> str:
+        """Bracket query terms in a segment (last term as prefix, like the
+        FTS query) and trim long text around the first hit."""
+        tokens = re.findall(r"\w+", query)
+        if not tokens:
+            return text
+        parts = [re.escape(t) + r"\b" for t in tokens[:-1]]
+        parts.append(re.escape(tokens[-1]) + r"\w*")
+        pattern = re.compile(r"\b(" + "|".join(parts) + ")", re.IGNORECASE)
+        first = pattern.search(text)
+        if first and len(text) > width:
+            lo = max(0, first.start() - width // 3)
+            text = ("..." if lo else "") + text[lo:lo + width] + (
+                "..." if lo + width < len(text) else "")
+        return pattern.sub(r"[\1]", text)
+
+    @metrics.timed("db.search_segments")
+    def search_segments(self, query: str, limit: int = 50,
+                        offset: int = 0) -> list[dict]:
+        """Transcript segments matching ``query`` across the whole library,
+        best match first: audio_id, title, start_time, end_time, snippet."""
+        query = query.strip()
+        if not query:
+            return []
+        with self._conn() as conn:
+            if not self._fts:
+                rows = conn.execute(
+                    """SELECT a.id AS audio_id, a.title, s.start_time, s.end_time,
+                              s.text AS snippet, 0 AS score
+                       FROM transcription_segments s
+                       JOIN transcriptions t ON t.id = s.transcription_id
+                       JOIN audio_files a ON a.id = t.audio_id
+                       WHERE s.text LIKE ?
+                       ORDER BY a.date_added DESC, s.start_time
+                       LIMIT ? OFFSET ?""",
+                    (f"%{query}%", limit, offset),
+                ).fetchall()
+            else:
+                match = self._fts_query(query)
+                if not match:
+                    return []
+                # Every page is cut from the same bm25 order over all
+                # matches (ties newest first), so pages never overlap or
+                # skip; FTS5 keeps only the top offset + limit while sorting.
+                rows = conn.execute(
+                    """SELECT a.id AS audio_id, a.title, s.start_time, s.end_time,
+                              s.text AS snippet, hit.score
+                       FROM (SELECT rowid, rank AS score FROM segments_fts
+                             WHERE segments_fts MATCH ?
+                             ORDER BY rank, rowid DESC LIMIT ? OFFSET ?) hit
+                       JOIN transcription_segments s ON s.id = hit.rowid
+                       JOIN transcriptions t ON t.id = s.transcription_id
+                       JOIN audio_files a ON a.id = t.audio_id
+                       ORDER BY hit.score, s.id DESC""",
+                    (match, limit, offset),
+                ).fetchall()
+        hits = [dict(r) for r in rows]
+        for h in hits:
+            h["snippet"] = self._highlight(h["snippet"], query)
+        return hits
+
+    # --- Waveform peaks ---
+
+    @metrics.timed("db.save_waveform")
+    def save_waveform(self, audio_id: int, peaks: list[float]):
+        """Cache normalised peaks; they go stale when the file's size or
+        modification time in ``audio_files`` changes."""
+        with self._conn() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO waveform_peaks
+                   (audio_id, points, peaks, file_size, date_modified)
+                   SELECT id, ?, ?, file_size, date_modified
+                   FROM audio_files WHERE id = ?""",
+                (len(peaks), _pack(array("f", peaks)), audio_id),
+            )
+
+    @metrics.timed("db.get_waveform")
+    def get_waveform(self, audio_id: int) -> list[float] | None:
+        with self._conn() as conn:
+            row = conn.execute(
+                """SELECT w.peaks FROM waveform_peaks w
+                   JOIN audio_files a ON a.id = w.audio_id
+                   WHERE w.audio_id = ? AND w.file_size = a.file_size
+                     AND w.date_modified IS a.date_modified""",
+                (audio_id,),
+            ).fetchone()
+        return _unpack("f", row["peaks"]).tolist() if row else None
+
+    def audio_without_waveform(self) -> list[int]:
+        with self._conn() as conn:
+            rows = conn.execute(
+                """SELECT a.id FROM audio_files a
+                   LEFT JOIN waveform_peaks w ON w.audio_id = a.id
+                   WHERE w.audio_id IS NULL OR w.file_size != a.file_size
+                      OR w.date_modified IS NOT a.date_modified
+                   ORDER BY a.id"""
+            ).fetchall()
+        return [r["id"] for r in rows]
+
+    # --- File locations ---
+
+    def existing_paths(self, paths: list[str]) -> set[str]:
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT file_path FROM audio_files "
+                "WHERE file_path IN (SELECT value FROM json_each(?))",
+                (json.dumps(paths),),
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    def audio_by_paths(self, paths: list[str]) -> dict[str, dict]:
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT id, file_path, file_size, date_modified FROM audio_files "
+                "WHERE file_path IN (SELECT value FROM json_each(?))",
+                (json.dumps(paths),),
+            ).fetchall()
+        return {r["file_path"]: dict(r) for r in rows}
+
+    def audio_under(self, folder: str) -> list[dict]:
+        """Rows whose file is anywhere below ``folder``."""
+        prefix = os.path.join(folder, "")
+        # A range on the file_path index; chr(0x10FFFF) sorts after any path.
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT id, file_path, file_size, date_modified FROM audio_files "
+                "WHERE file_path >= ? AND file_path < ?",
+                (prefix, prefix + "\U0010ffff"),
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def delete_audio_many(self, audio_ids: list[int]) -> int:
+        with self._conn() as conn:
+            return conn.execute(
+                "DELETE FROM audio_files WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(audio_ids)),),
+            ).rowcount
+
+    def relink_audio(self, items: list[tuple[int, str]]):
+        """Point rows at files that moved: (audio_id, new_path)."""
+        with self._conn() as conn:
+            conn.executemany(
+                "UPDATE audio_files SET file_path = ?, file_name = ? WHERE id = ?",
+                [(path, os.path.basename(path), audio_id) for audio_id, path in items],
+            )
+
+    def update_file_stats(self, items: list[tuple[int, int, str]]):
+        """Store (audio_id, file_size, date_modified) of files that changed
+        on disk; their fingerprints no longer apply."""
+        with self._conn() as conn:
+            conn.executemany(
+                """UPDATE audio_files SET file_size = ?, date_modified = ?,
+                       partial_hash = NULL, content_hash = NULL WHERE id = ?""",
+                [(size, mtime, audio_id) for audio_id, size, mtime in items],
+            )
+
+    # --- Content hashes ---
+
+    def find_audio_by_partial_hash(self, hashes: list[str]) -> list[dict]:
+        with self._conn() as conn:
+            rows = conn.execute(
+                """SELECT id, file_path, file_size, partial_hash, content_hash
+                   FROM audio_files
+                   WHERE partial_hash IN (SELECT value FROM json_each(?))""",
+                (json.dumps(list(hashes)),),
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def set_hashes(self, items: list[tuple[int, str | None, str | None]]):
+        """Store (audio_id, partial_hash, content_hash); None keeps the
+        current value."""
+        with self._conn() as conn:
+            conn.executemany(
+                """UPDATE audio_files SET partial_hash = COALESCE(?, partial_hash),
+                       content_hash = COALESCE(?, content_hash) WHERE id = ?""",
+                [(partial, content, audio_id) for audio_id, partial, content in items],
+            )
+
+    def audio_without_hash(self) -> list[dict]:
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT id, file_path FROM audio_files WHERE partial_hash IS NULL ORDER BY id"
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    @metrics.timed("db.get_duplicate_groups")
+    def get_duplicate_groups(self) -> list[dict]:
+        """Files with identical content, grouped by full hash (largest
+        wasted space first)."""
+        with self._conn() as conn:
+            rows = conn.execute(
+                """SELECT a.id, a.file_path, a.title, a.file_size, a.content_hash,
+                          a.is_transcribed
+                   FROM audio_files a
+                   JOIN (SELECT content_hash FROM audio_files
+                         WHERE content_hash IS NOT NULL
+                         GROUP BY content_hash HAVING COUNT(*) > 1) d
+                     ON d.content_hash = a.content_hash
+                   ORDER BY a.content_hash, a.id"""
+            ).fetchall()
+        groups: dict[str, dict] = {}
+        for r in rows:
+            group = groups.setdefault(r["content_hash"], {
+                "content_hash": r["content_hash"], "file_size": r["file_size"],
+                "files": [],
+            })
+            group["files"].append(dict(r))
+        return sorted(groups.values(),
+                      key=lambda g: g["file_size"] * (len(g["files"]) - 1), reverse=True)
+
+    # --- Acoustic fingerprints ---
+
+    def save_fingerprints(self, items: list[tuple[int, bytes, list[int]]]):
+        """Store (audio_id, signature blob, LSH band keys) for many files."""
+        with self._conn() as conn:
+            ids = json.dumps([audio_id for audio_id, _, _ in items])
+            conn.execute(
+                "DELETE FROM fingerprint_lsh WHERE audio_id IN (SELECT value FROM json_each(?))",
+                (ids,),
+            )
+            conn.executemany(
+                """INSERT OR REPLACE INTO audio_fingerprints
+                       (audio_id, signature, file_size, date_modified)
+                   SELECT id, ?, file_size, date_modified FROM audio_files WHERE id = ?""",
+                [(blob, audio_id) for audio_id, blob, _ in items],
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO fingerprint_lsh (band, key, audio_id) VALUES (?, ?, ?)",
+                [(band, key, audio_id) for audio_id, _, keys in items
+                 for band, key in enumerate(keys)],
+            )
+
+    def get_fingerprints(self, audio_ids: list[int]) -> dict[int, bytes]:
+        with self._conn() as conn:
+            rows = conn.execute(
+                """SELECT audio_id, signature FROM audio_fingerprints
+                   WHERE audio_id IN (SELECT value FROM json_each(?))""",
+                (json.dumps(list(audio_ids)),),
+            ).fetchall()
+        return {r["audio_id"]: r["signature"] for r in rows}
+
+    def audio_without_fingerprint(self) -> list[int]:
+        """Files never fingerprinted or changed since (same rule as waveforms)."""
+        with self._conn() as conn:
+            rows = conn.execute(
+                """SELECT a.id FROM audio_files a
+                   LEFT JOIN audio_fingerprints f ON f.audio_id = a.id
+                   WHERE f.audio_id IS NULL OR f.file_size != a.file_size
+                      OR f.date_modified IS NOT a.date_modified
+                   ORDER BY a.id"""
+            ).fetchall()
+        return [r["id"] for r in rows]
+
+    def fingerprint_candidates(self, keys: list[int], exclude: int = 0) -> list[int]:
+        """Files sharing at least one LSH bucket with ``keys``."""
+        with self._conn() as conn:
+            rows = conn.execute(
+                """SELECT DISTINCT l.audio_id FROM json_each(?) k
+                   JOIN fingerprint_lsh l ON l.band = k.key AND l.key = k.value
+                   WHERE l.audio_id != ?""",
+                (json.dumps(keys), exclude),
+            ).fetchall()
+        return [r["audio_id"] for r in rows]
+
+    @metrics.timed("db.fingerprint_candidate_pairs")
+    def fingerprint_candidate_pairs(self, max_bucket: int = 64) -> list[tuple[int, int]]:
+        """Distinct (a, b) id pairs, a < b, sharing a bucket of at most
+        ``max_bucket`` files."""
+        with self._conn() as conn:
+            rows = conn.execute(
+                """WITH buckets AS (
+                       SELECT band, key FROM fingerprint_lsh
+                       GROUP BY band, key HAVING COUNT(*) BETWEEN 2 AND ?
+                   )
+                   SELECT DISTINCT a.audio_id, b.audio_id FROM buckets k
+                   JOIN fingerprint_lsh a ON a.band = k.band AND a.key = k.key
+                   JOIN fingerprint_lsh b ON b.band = k.band AND b.key = k.key
+                                         AND b.audio_id > a.audio_id""",
+                (max_bucket,),
+            ).fetchall()
+        return [(r[0], r[1]) for r in rows]
+
+    # --- Jobs ---
+
+    JOB_STATES = ("queued", "running", "done", "failed", "cancelled")
+
+    @staticmethod
+    def _job_row(row) -> dict:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"] or "{}")
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def add_job(self, job_type: str, payload: dict | None = None,
+                max_attempts: int = 3) -> int:
+        with self._conn() as conn:
+            cur = conn.execute(
+                """INSERT INTO jobs (job_type, payload, max_attempts, date_created)
+                   VALUES (?, ?, ?, ?)""",
+                (job_type, json.dumps(payload or {}, ensure_ascii=False),
+                 max(1, max_attempts), datetime.now().isoformat()),
+            )
+            return cur.lastrowid
+
+    def get_job(self, job_id: int) -> dict | None:
+        with self._conn() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return self._job_row(row) if row else None
+
+    def get_jobs(self, states: list[str] | None = None, limit: int = 0) -> list[dict]:
+        sql = "SELECT * FROM jobs"
+        params: list = []
+        if states:
+            sql += f" WHERE state IN ({','.join('?' * len(states))})"
+            params.extend(states)
+        sql += " ORDER BY id"
+        if limit > 0:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._conn() as conn:
+            return [self._job_row(r) for r in conn.execute(sql, params).fetchall()]
+
+    def claim_job(self, job_id: int, owner: str = "", lease_seconds: float = 60) -> bool:
+        """Move a queued job to running, leased to ``owner`` (``host:pid``)
+        for ``lease_seconds``. False if another runner got it first."""
+        with self._conn() as conn:
+            cur = conn.execute(
+                """UPDATE jobs SET state = 'running', attempts = attempts + 1,
+                          date_started = ?, error = '', owner = ?, lease_until = ?
+                   WHERE id = ? AND state = 'queued'""",
+                (datetime.now().isoformat(), owner, time.time() + lease_seconds, job_id),
+            )
+            return cur.rowcount == 1
+
+    def renew_job_leases(self, owner: str, job_ids: list[int], lease_seconds: float = 60):
+        with self._conn() as conn:
+            conn.execute(
+                """UPDATE jobs SET lease_until = ?
+                   WHERE owner = ? AND state = 'running'
+                     AND id IN (SELECT value FROM json_each(?))""",
+                (time.time() + lease_seconds, owner, json.dumps(list(job_ids))),
+            )
+
+    def finish_job(self, job_id: int, result=None):
+        with self._conn() as conn:
+            conn.execute(
+                """UPDATE jobs SET state = 'done', result = ?, date_finished = ?
+                   WHERE id = ?""",
+                (json.dumps(result, ensure_ascii=False, default=str),
+                 datetime.now().isoformat(), job_id),
+            )
+
+    def fail_job(self, job_id: int, error: str) -> str:
+        """Record a failed attempt; the job is queued again until it runs
+        out of attempts. Returns the new state."""
+        with self._conn() as conn:
+            conn.execute(
+                """UPDATE jobs SET
+                       state = CASE WHEN attempts < max_attempts THEN 'queued'
+                                    ELSE 'failed' END,
+                       error = ?, date_finished = ?
+                   WHERE id = ?""",
+                (error, datetime.now().isoformat(), job_id),
+            )
+            row = conn.execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return row["state"] if row else "failed"
+
+    def cancel_job(self, job_id: int) -> bool:
+        with self._conn() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET state = 'cancelled' WHERE id = ? AND state = 'queued'",
+                (job_id,),
+            )
+            return cur.rowcount == 1
+
+    def requeue_running_jobs(self, alive=None) -> int:
+        """Put jobs whose runner is gone back in the queue: their lease ran
+        out, or ``alive(owner)`` says the owning process has exited. Jobs a
+        live scheduler holds are left alone."""
+        now = time.time()
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT id, owner, lease_until FROM jobs WHERE state = 'running'"
+            ).fetchall()
+            stale = [r["id"] for r in rows
+                     if r["lease_until"] is None or r["lease_until"] < now
+                     or (alive is not None and not alive(r["owner"] or ""))]
+            if not stale:
+                return 0
+            cur = conn.execute(
+                """UPDATE jobs SET state = 'queued', owner = NULL, lease_until = NULL
+                   WHERE state = 'running' AND id IN (SELECT value FROM json_each(?))""",
+                (json.dumps(stale),),
+            )
+            return cur.rowcount
+
+    def purge_jobs(self, states: tuple[str, ...] = ("done", "cancelled")) -> int:
+        with self._conn() as conn:
+            cur = conn.execute(
+                f"DELETE FROM jobs WHERE state IN ({','.join('?' * len(states))})",
+                states,
+            )
+            return cur.rowcount
+
     # --- Export ---
 
     def export_library_json(self, path: str):
-        data = {
-            "audio_files": self.get_all_audio(),
-            "tags": self.get_all_tags(),
-            "exported_at": datetime.now().isoformat(),
-        }
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        from src.core.library_io import export_library
+        export_library(self, path, "json")
 
     def export_library_csv(self, path: str):
-        import csv
-        rows = self.get_all_audio()
-        if not rows:
-            return
-        with open(path, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=rows[0].keys())
-            writer.writeheader()
-            writer.writerows(rows)
-
-    def backup(self, backup_path: str):
-        import shutil
-        shutil.copy2(self.db_path, backup_path)
+        from src.core.library_io import export_library
+        export_library(self, path, "csv")
+
+    def backup(self, backup_path: str, progress=None, verify: str | None = "quick") -> dict:
+        """Consistent online copy via the SQLite backup API (see core.backup)."""
+        from src.core.backup import backup_database
+        return backup_database(self.db_path, backup_path, progress=progress, verify=verify)
+
+
+class ReadOnlyDatabase(Database):
+    """Query-only view of the library for concurrent readers (HTTP API).
+
+    Borrows connections opened with ``mode=ro`` from a fixed pool instead of
+    connecting per call; write methods fail with OperationalError.
+    """
+
+    def __init__(self, db_path: str | None = None, pool_size: int = 8):
+        if db_path is None:
+            db_path = str(Path.home() / ".audio_library_manager" / "library.db")
+        self.db_path = db_path
+        self.pool_size = max(1, pool_size)
+        self._pool: queue.LifoQueue = queue.LifoQueue()
+        for _ in range(self.pool_size):
+            self._pool.put(self._connect())
+        with self._conn() as conn:
+            self._fts = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'segments_fts'"
+            ).fetchone() is not None
+
+    def _connect(self) -> sqlite3.Connection:
+        uri = Path(self.db_path).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    @contextmanager
+    def _conn(self, cancelled=None):
+        conn = self._pool.get()
+        if cancelled is not None:
+            conn.set_progress_handler(lambda: 1 if cancelled() else 0, 1000)
+        try:
+            yield conn
+        finally:
+            if cancelled is not None:
+                conn.set_progress_handler(None, 0)
+            # Ends the read transaction so the next borrower sees new commits.
+            conn.rollback()
+            self._pool.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
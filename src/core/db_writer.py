@@ -0,0 +1,167 @@
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from src.core.database import Database
+from src.utils import metrics
+
+_STOP = object()
+
+
+class DatabaseWriter:
+    """Single writer thread that applies database mutations in group commits.
+
+    ``submit(db.tag_audio, audio_id, tag_id)`` queues any ``Database`` method
+    (or a callable using it) and returns a Future. The writer takes every call
+    queued while the previous commit ran (up to ``max_batch``, optionally
+    lingering ``max_delay_ms`` for more) and runs them in one
+    ``BEGIN IMMEDIATE`` transaction. Each call is wrapped in a
+    savepoint, so a failing call only fails its own future. A busy database
+    is retried with backoff before the batch is failed.
+    """
+
+    def __init__(self, db: Database, max_batch: int = 256, max_delay_ms: float = 0,
+                 busy_timeout_ms: int = 5000, busy_retries: int = 5):
+        self.db = db
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max(0.0, max_delay_ms) / 1000.0
+        self.busy_timeout_ms = busy_timeout_ms
+        self.busy_retries = busy_retries
+        self.stats = {"batches": 0, "calls": 0, "busy_retries": 0}
+        self._queue: queue.Queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        if self._closed:
+            raise RuntimeError("DatabaseWriter is closed")
+        future: Future = Future()
+        self._queue.put((fn, args, kwargs, future))
+        return future
+
+    def call(self, fn, *args, **kwargs):
+        """Submit and wait for the result."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def flush(self, timeout: float | None = None):
+        """Wait until everything submitted so far is committed."""
+        self.submit(lambda: None).result(timeout)
+
+    def close(self, timeout: float | None = None):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    # --- Writer thread ---
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db.db_path, isolation_level=None,
+                               timeout=self.busy_timeout_ms / 1000.0)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        return conn
+
+    def _collect(self, first) -> tuple[list, bool]:
+        batch, stop = [first], False
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 \
+                    else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _run(self):
+        conn = self._connect()
+        try:
+            while True:
+                first = self._queue.get()
+                if first is _STOP:
+                    break
+                batch, stop = self._collect(first)
+                batch = [b for b in batch if b[3].set_running_or_notify_cancel()]
+                if batch:
+                    self._commit(conn, batch)
+                if stop:
+                    break
+        finally:
+            conn.close()
+            # Anything queued after close() is failed rather than left hanging.
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP and item[3].set_running_or_notify_cancel():
+                    item[3].set_exception(RuntimeError("DatabaseWriter is closed"))
+
+    def _commit(self, conn: sqlite3.Connection, batch: list):
+        for attempt in range(self.busy_retries + 1):
+            try:
+                with metrics.timer("db.writer.commit"):
+                    results = self._apply(conn, batch)
+                break
+            except sqlite3.OperationalError as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                busy = "locked" in str(e) or "busy" in str(e)
+                if not busy or attempt == self.busy_retries:
+                    for *_, future in batch:
+                        future.set_exception(e)
+                    return
+                self.stats["busy_retries"] += 1
+                metrics.count("db.writer.busy_retries")
+                time.sleep(min(1.0, 0.01 * 2 ** attempt))
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                for *_, future in batch:
+                    future.set_exception(e)
+                return
+        self.stats["batches"] += 1
+        self.stats["calls"] += len(batch)
+        metrics.count("db.writer.batches")
+        metrics.count("db.writer.calls", len(batch))
+        for (*_, future), (ok, value) in zip(batch, results):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def _apply(self, conn: sqlite3.Connection, batch: list) -> list[tuple[bool, object]]:
+        results = []
+        conn.execute("BEGIN IMMEDIATE")
+        self.db._local.conn = conn
+        try:
+            for fn, args, kwargs, _ in batch:
+                conn.execute("SAVEPOINT call")
+                try:
+                    value = fn(*args, **kwargs)
+                except sqlite3.OperationalError as e:
+                    if "locked" in str(e) or "busy" in str(e):
+                        raise  # retry the whole batch
+                    conn.execute("ROLLBACK TO call")
+                    results.append((False, e))
+                except Exception as e:
+                    conn.execute("ROLLBACK TO call")
+                    results.append((False, e))
+                else:
+                    results.append((True, value))
+                conn.execute("RELEASE call")
+        finally:
+            self.db._local.conn = None
+        conn.execute("COMMIT")
+        return results
@@ -1,20 +1,29 @@
-from pydub import AudioSegment
 from pathlib import Path
 from copy import deepcopy
+from typing import TYPE_CHECKING
+
+from src.utils import metrics
+
+if TYPE_CHECKING:
+    from pydub import AudioSegment
 
 
 class EditOperation:
-    def __init__(self, description: str, segment_before: AudioSegment):
+    def __init__(self, description: str, segment_before: "AudioSegment",
+                 edit: tuple[str, int, int] | None = None):
         self.description = description
         self.segment_before = segment_before
+        self.edit = edit
 
 
 class AudioEditor:
     def __init__(self):
-        self._segment: AudioSegment | None = None
+        self._segment: "AudioSegment | None" = None
         self._original_path: str = ""
         self._undo_stack: list[EditOperation] = []
         self._redo_stack: list[EditOperation] = []
+        self._edits: list[tuple[str, int, int]] = []
+        self._history_valid = True
         self.max_undo = 20
 
     @property
@@ -22,47 +31,83 @@ class AudioEditor:
         return self._segment is not None
 
     @property
-    def segment(self) -> AudioSegment | None:
+    def segment(self) -> "AudioSegment | None":
         return self._segment
 
     @property
     def duration_ms(self) -> int:
         return len(self._segment) if self._segment else 0
 
+    @metrics.timed("editor.load")
     def load(self, file_path: str) -> bool:
+        from pydub import AudioSegment
         try:
             self._segment = AudioSegment.from_file(file_path)
             self._original_path = file_path
             self._undo_stack.clear()
             self._redo_stack.clear()
+            self._edits.clear()
+            self._history_valid = True
             return True
         except Exception:
             return False
 
-    def _push_undo(self, description: str):
+    def _push_undo(self, description: str, start_ms: int = 0, end_ms: int = 0):
         if self._segment is None:
             return
         if len(self._undo_stack) >= self.max_undo:
             self._undo_stack.pop(0)
-        self._undo_stack.append(EditOperation(description, self._segment))
+        edit = (description, int(start_ms), int(end_ms))
+        self._undo_stack.append(EditOperation(description, self._segment, edit))
         self._redo_stack.clear()
+        self._edits.append(edit)
 
     def undo(self) -> bool:
         if not self._undo_stack or self._segment is None:
             return False
         op = self._undo_stack.pop()
-        self._redo_stack.append(EditOperation("redo", self._segment))
+        self._redo_stack.append(EditOperation("redo", self._segment, op.edit))
         self._segment = op.segment_before
+        if self._edits:
+            self._edits.pop()
+        else:
+            self._history_valid = False
         return True
 
     def redo(self) -> bool:
         if not self._redo_stack or self._segment is None:
             return False
         op = self._redo_stack.pop()
-        self._undo_stack.append(EditOperation("undo", self._segment))
+        self._undo_stack.append(EditOperation("undo", self._segment, op.edit))
         self._segment = op.segment_before
+        if op.edit is not None:
+            self._edits.append(op.edit)
         return True
 
+    @property
+    def edit_history(self) -> list[tuple[str, int, int]] | None:
+        """Edits applied since load (or the last rebase) as
+        (kind, start_ms, end_ms); None if the history can't be replayed."""
+        if not self._history_valid:
+            return None
+        return list(self._edits)
+
+    @property
+    def has_timing_edits(self) -> bool:
+        return not self._history_valid or any(
+            kind in ("trim", "cut") for kind, _, _ in self._edits
+        )
+
+    def rebase(self, applied: int | None = None):
+        """Treat the current audio as the new baseline for edit_history; with
+        ``applied`` only the first ``applied`` edits are dropped, so later
+        edits stay relative to the audio they were applied to."""
+        if applied is None:
+            self._edits.clear()
+        else:
+            del self._edits[:applied]
+        self._history_valid = True
+
     @property
     def can_undo(self) -> bool:
         return len(self._undo_stack) > 0
@@ -71,23 +116,26 @@ class AudioEditor:
     def can_redo(self) -> bool:
         return len(self._redo_stack) > 0
 
+    @metrics.timed("editor.trim")
     def trim(self, start_ms: int, end_ms: int) -> bool:
         if self._segment is None:
             return False
-        self._push_undo("trim")
+        self._push_undo("trim", start_ms, end_ms)
         self._segment = self._segment[start_ms:end_ms]
         return True
 
+    @metrics.timed("editor.cut_section")
     def cut_section(self, start_ms: int, end_ms: int) -> bool:
         if self._segment is None:
             return False
-        self._push_undo("cut")
+        self._push_undo("cut", start_ms, end_ms)
         before = self._segment[:start_ms]
         after = self._segment[end_ms:]
         self._segment = before + after
         return True
 
-    def split(self, split_points_ms: list[int]) -> list[AudioSegment]:
+    @metrics.timed("editor.split")
+    def split(self, split_points_ms: list[int]) -> list["AudioSegment"]:
         if self._segment is None:
             return []
         points = sorted(set(split_points_ms))
@@ -100,6 +148,7 @@ class AudioEditor:
         parts.append(self._segment[prev:])
         return parts
 
+    @metrics.timed("editor.normalize")
     def normalize(self, target_dbfs: float = -20.0) -> bool:
         if self._segment is None:
             return False
@@ -108,6 +157,7 @@ class AudioEditor:
         self._segment = self._segment.apply_gain(diff)
         return True
 
+    @metrics.timed("editor.change_volume")
     def change_volume(self, db: float) -> bool:
         if self._segment is None:
             return False
@@ -115,6 +165,7 @@ class AudioEditor:
         self._segment = self._segment.apply_gain(db)
         return True
 
+    @metrics.timed("editor.export")
     def export(self, output_path: str, fmt: str = "mp3",
                bitrate: str = "192k") -> bool:
         if self._segment is None:
@@ -128,7 +179,8 @@ class AudioEditor:
         except Exception:
             return False
 
-    def export_parts(self, parts: list[AudioSegment], output_dir: str,
+    @metrics.timed("editor.export_parts")
+    def export_parts(self, parts: list["AudioSegment"], output_dir: str,
                      base_name: str, fmt: str = "mp3") -> list[str]:
         paths = []
         Path(output_dir).mkdir(parents=True, exist_ok=True)
@@ -142,6 +194,7 @@ class AudioEditor:
                 pass
         return paths
 
+    @metrics.timed("editor.get_waveform_data")
     def get_waveform_data(self, num_points: int = 800) -> list[float]:
         if self._segment is None:
             return []
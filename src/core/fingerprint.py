@@ -0,0 +1,163 @@
+"""Acoustic fingerprints for finding re-encoded or trimmed copies.
+
+The first ``MAX_SECONDS`` of a file are decoded to mono at 5512 Hz and
+reduced to log energies in 16 bands (200-2700 Hz), pooled over half-second
+blocks. Every ~4 s window of blocks, with its mean removed so gain does not
+matter, is hashed to a 14-bit code by random hyperplanes (SimHash): windows
+that sound alike get the same code despite codec noise. A file is the set
+of its codes, summarised by a 128-value MinHash signature (512 bytes).
+The fraction of equal signature values estimates the overlap of two code
+sets.
+
+Signatures are split into 32 bands of 4 values. Each band is hashed to one
+row of ``fingerprint_lsh``. Files sharing a band become candidates and are
+then checked against the full signatures. Lookups never compare against
+the whole library.
+"""
+
+import hashlib
+
+import numpy as np
+
+SAMPLE_RATE = 5512
+MAX_SECONDS = 180
+FRAME = 1024
+HOP = 256
+BANDS = 16
+FMIN, FMAX = 200.0, 2700.0
+BLOCK = 11      # frames pooled per block (~0.5 s)
+BLOCK_STEP = 5  # frames between blocks
+CONTEXT = 8     # blocks per hashed window, one block length apart
+CODE_BITS = 14
+SILENCE_DB = 40       # windows this far below the loudest one are skipped
+SILENCE_FLOOR = -9.0  # log10 band power treated as digital silence
+
+NUM_HASHES = 128
+LSH_ROWS = 4
+LSH_BANDS = NUM_HASHES // LSH_ROWS
+
+DEFAULT_THRESHOLD = 0.35
+# Band buckets shared by more files than this (silence, test tones) are
+# ignored when pairing the whole library.
+MAX_BUCKET = 64
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(0x5EED)
+_PLANES = _rng.standard_normal((BANDS * CONTEXT, CODE_BITS)).astype(np.float32)
+_HASH_A = _rng.integers(1, _PRIME, NUM_HASHES, dtype=np.int64)
+_HASH_B = _rng.integers(0, _PRIME, NUM_HASHES, dtype=np.int64)
+_EDGES = np.round(np.geomspace(FMIN, FMAX, BANDS + 1) * FRAME / SAMPLE_RATE).astype(int)
+_WINDOW = np.hanning(FRAME).astype(np.float32)
+_WEIGHTS = (1 << np.arange(CODE_BITS)).astype(np.int64)
+
+
+def load_samples(path: str, seconds: float = MAX_SECONDS) -> np.ndarray:
+    """Mono float32 samples at SAMPLE_RATE; only ``seconds`` are decoded."""
+    from pydub import AudioSegment
+
+    seg = AudioSegment.from_file(path, duration=seconds)
+    seg = seg.set_channels(1).set_frame_rate(SAMPLE_RATE).set_sample_width(2)
+    return np.array(seg.get_array_of_samples(), dtype=np.float32) / 32768.0
+
+
+def window_codes(samples: np.ndarray) -> np.ndarray:
+    """One SimHash code per window of audible blocks."""
+    n = 1 + (len(samples) - FRAME) // HOP
+    if n < BLOCK:
+        return np.zeros(0, dtype=np.int64)
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME)[::HOP][:n]
+    power = np.abs(np.fft.rfft(frames * _WINDOW, axis=1)) ** 2
+    bands = np.add.reduceat(power[:, _EDGES[0]:_EDGES[-1]], _EDGES[:-1] - _EDGES[0], axis=1)
+
+    # Block means from a running sum instead of a loop over blocks.
+    cum = np.vstack([np.zeros((1, BANDS)), np.cumsum(bands, axis=0)])
+    starts = np.arange(0, n - BLOCK + 1, BLOCK_STEP)
+    energy = (cum[starts + BLOCK] - cum[starts]) / BLOCK
+    blocks = np.log10(energy + 1e-10)
+
+    gap = BLOCK // BLOCK_STEP
+    count = len(blocks) - (CONTEXT - 1) * gap
+    if count <= 0:
+        return np.zeros(0, dtype=np.int64)
+    idx = np.arange(count)[:, None] + np.arange(CONTEXT)[None, :] * gap
+    windows = blocks[idx]
+    level = windows.mean(axis=(1, 2))
+    audible = (level > level.max() - SILENCE_DB / 10) & (level > SILENCE_FLOOR)
+    vectors = (windows - level[:, None, None]).reshape(count, -1)[audible]
+    bits = (vectors @ _PLANES) > 0
+    return bits.astype(np.int64) @ _WEIGHTS
+
+
+def signature(codes: np.ndarray) -> np.ndarray | None:
+    """MinHash of the code set; None when the file had nothing audible."""
+    unique = np.unique(codes)
+    if not len(unique):
+        return None
+    hashed = (unique[:, None] * _HASH_A + _HASH_B) % _PRIME
+    return hashed.min(axis=0).astype(np.uint32)
+
+
+def compute(path: str) -> np.ndarray | None:
+    return signature(window_codes(load_samples(path)))
+
+
+def lsh_keys(sig: np.ndarray) -> list[int]:
+    """One signed 64-bit bucket key per band."""
+    bands = sig.astype("<u4").reshape(LSH_BANDS, LSH_ROWS)
+    return [int.from_bytes(hashlib.blake2b(b.tobytes(), digest_size=8).digest(),
+                           "little", signed=True) for b in bands]
+
+
+def to_blob(sig: np.ndarray) -> bytes:
+    return sig.astype("<u4").tobytes()
+
+
+def from_blob(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype="<u4")
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(a == b))
+
+
+def find_similar(db, audio_id: int, threshold: float = DEFAULT_THRESHOLD) -> list[dict]:
+    """Files that sound like ``audio_id``, most similar first."""
+    row = db.get_fingerprints([audio_id]).get(audio_id)
+    if not row:  # not computed yet, or nothing audible
+        return []
+    sig = from_blob(row)
+    candidates = db.fingerprint_candidates(lsh_keys(sig), exclude=audio_id)
+    others = db.get_fingerprints(candidates)
+    hits = [{"audio_id": other, "similarity": round(similarity(sig, from_blob(blob)), 3)}
+            for other, blob in others.items()]
+    return sorted((h for h in hits if h["similarity"] >= threshold),
+                  key=lambda h: h["similarity"], reverse=True)
+
+
+def near_duplicate_groups(db, threshold: float = DEFAULT_THRESHOLD,
+                          max_bucket: int = MAX_BUCKET) -> list[list[int]]:
+    """Groups of audio ids that sound alike (connected pairs above
+    ``threshold``), largest group first."""
+    pairs = np.array(db.fingerprint_candidate_pairs(max_bucket), dtype=np.int64)
+    if not len(pairs):
+        return []
+    ids = np.unique(pairs)
+    blobs = db.get_fingerprints(ids.tolist())
+    sigs = np.stack([from_blob(blobs[i]) for i in ids.tolist()])
+    pos = np.searchsorted(ids, pairs)
+    scores = (sigs[pos[:, 0]] == sigs[pos[:, 1]]).mean(axis=1)
+    parent = {int(i): int(i) for i in ids}
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in pairs[scores >= threshold].tolist():
+        parent[find(a)] = find(b)
+    groups: dict[int, list[int]] = {}
+    for i in parent:
+        groups.setdefault(find(i), []).append(i)
+    return sorted((sorted(g) for g in groups.values() if len(g) > 1),
+                  key=len, reverse=True)
@@ -0,0 +1,447 @@
+"""Local read-only HTTP API over the library (asyncio, stdlib only).
+
+    GET /api/health
+    GET /api/search?q=&tag=&format=&min_duration=&max_duration=&sort=&desc=&limit=&offset=&after=
+    GET /api/segments?q=&limit=&offset=
+    GET /api/audio/<id>
+    GET /api/audio/<id>/transcript
+    GET /api/audio/<id>/peaks?points=
+    GET /audio/<id>                 audio file, honours Range / If-Range
+
+Queries run on a small thread pool over ``ReadOnlyDatabase``; audio bodies
+are sent with ``loop.sendfile`` (os.sendfile where the platform has it), so
+many concurrent streams cost no threads.
+"""
+
+import asyncio
+import base64
+import json
+import mimetypes
+import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from functools import partial
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from src.core.database import Database, ReadOnlyDatabase
+from src.utils import metrics
+
+MAX_HEADER_BYTES = 16 * 1024
+KEEPALIVE_TIMEOUT = 15.0
+MAX_PAGE = 1000
+
+AUDIO_TYPES = {
+    ".mp3": "audio/mpeg", ".wav": "audio/wav", ".m4a": "audio/mp4",
+    ".flac": "audio/flac", ".ogg": "audio/ogg",
+}
+
+REASONS = {
+    200: "OK", 206: "Partial Content", 304: "Not Modified", 400: "Bad Request",
+    404: "Not Found", 405: "Method Not Allowed", 416: "Range Not Satisfiable",
+    431: "Request Header Fields Too Large", 500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str = "", headers: dict | None = None):
+        super().__init__(message or REASONS.get(status, ""))
+        self.status = status
+        self.headers = headers or {}
+
+
+class _Request:
+    __slots__ = ("method", "path", "query", "version", "headers")
+
+    def __init__(self, head: bytes):
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            self.method, target, self.version = lines[0].split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "malformed request line")
+        self.headers = {}
+        for line in lines[1:]:
+            if line:
+                name, sep, value = line.partition(":")
+                if not sep:
+                    raise HttpError(400, "malformed header")
+                self.headers[name.strip().lower()] = value.strip()
+        url = urlsplit(target)
+        self.path = unquote(url.path)
+        self.query = parse_qs(url.query)
+
+    @property
+    def keep_alive(self) -> bool:
+        conn = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return conn == "keep-alive"
+        return conn != "close"
+
+    def arg(self, name: str, default: str = "") -> str:
+        values = self.query.get(name)
+        return values[0] if values else default
+
+    def int_arg(self, name: str, default: int, lo: int = 0, hi: int | None = None) -> int:
+        raw = self.arg(name)
+        if not raw:
+            return default
+        try:
+            value = int(raw)
+        except ValueError:
+            raise HttpError(400, f"{name} must be an integer")
+        value = max(lo, value)
+        return min(hi, value) if hi is not None else value
+
+    def float_arg(self, name: str, default: float = 0) -> float:
+        raw = self.arg(name)
+        if not raw:
+            return default
+        try:
+            return float(raw)
+        except ValueError:
+            raise HttpError(400, f"{name} must be a number")
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """Single ``bytes=`` range as inclusive (start, end); None to send the
+    whole file. Raises HttpError(416) when unsatisfiable."""
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None  # other units and multipart ranges: serve the full body
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            start, end = max(0, size - int(last)), size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        raise HttpError(416, headers={"Content-Range": f"bytes */{size}"})
+    return start, min(end, size - 1)
+
+
+def _downsample(peaks: list[float], points: int) -> list[float]:
+    if points <= 0 or points >= len(peaks):
+        return peaks
+    step = len(peaks) / points
+    return [max(peaks[int(i * step):max(int(i * step) + 1, int((i + 1) * step))])
+            for i in range(points)]
+
+
+def _encode_cursor(cursor: tuple) -> str:
+    raw = json.dumps(list(cursor), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(token: str) -> tuple:
+    try:
+        value, audio_id = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return value, int(audio_id)
+    except (ValueError, TypeError):
+        raise HttpError(400, "invalid cursor") from None
+
+
+class HttpApi:
+    def __init__(self, db_path: str | None = None, host: str = "127.0.0.1",
+                 port: int = 8765, pool_size: int = 8):
+        self.db = ReadOnlyDatabase(db_path, pool_size)
+        self.host = host
+        self.port = port
+        self._executor = ThreadPoolExecutor(max_workers=self.db.pool_size,
+                                            thread_name_prefix="http-db")
+        self._server: asyncio.AbstractServer | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._routes = [
+            (re.compile(r"/api/health"), self._health),
+            (re.compile(r"/api/search"), self._search),
+            (re.compile(r"/api/segments"), self._segments),
+            (re.compile(r"/api/audio/(\d+)"), self._audio_info),
+            (re.compile(r"/api/audio/(\d+)/transcript"), self._transcript),
+            (re.compile(r"/api/audio/(\d+)/peaks"), self._peaks),
+        ]
+        self._stream_route = re.compile(r"/audio/(\d+)")
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> int:
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(
+            self._handle, self.host, self.port,
+            limit=MAX_HEADER_BYTES, backlog=1024,
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self):
+        if self._server is not None:
+            try:
+                own_loop = asyncio.get_running_loop() is self._loop
+            except RuntimeError:
+                own_loop = False
+            if own_loop or self._loop is None or not self._loop.is_running():
+                self._server.close()
+            else:
+                # Called from another thread (serve_in_background).
+                self._loop.call_soon_threadsafe(self._server.close)
+        self._executor.shutdown(wait=False)
+        self.db.close()
+
+    def _query(self, fn, *args, **kwargs):
+        return self._loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    # --- Connection handling ---
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(
+                        reader.readuntil(b"\r\n\r\n"), KEEPALIVE_TIMEOUT
+                    )
+                except asyncio.LimitOverrunError:
+                    await self._send_error(writer, HttpError(431), close=True)
+                    break
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError,
+                        ConnectionError):
+                    break
+                try:
+                    request = _Request(head)
+                except HttpError as e:
+                    await self._send_error(writer, e, close=True)
+                    break
+                metrics.count("http.requests")
+                with metrics.timer("http.request"):
+                    keep_alive = await self._dispatch(request, writer)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    async def _dispatch(self, request: _Request, writer) -> bool:
+        keep_alive = request.keep_alive
+        head_only = request.method == "HEAD"
+        try:
+            if request.method not in ("GET", "HEAD"):
+                raise HttpError(405, headers={"Allow": "GET, HEAD"})
+            if "content-length" in request.headers or "transfer-encoding" in request.headers:
+                keep_alive = False  # request bodies are not read
+            match = self._stream_route.fullmatch(request.path)
+            if match:
+                await self._stream(int(match.group(1)), request, writer, head_only)
+                return keep_alive
+            for pattern, handler in self._routes:
+                match = pattern.fullmatch(request.path)
+                if match:
+                    payload = await handler(request, *map(int, match.groups()))
+                    await self._send_json(writer, 200, payload, keep_alive, head_only)
+                    return keep_alive
+            raise HttpError(404)
+        except HttpError as e:
+            await self._send_error(writer, e, close=not keep_alive, head_only=head_only)
+        except sqlite3.OperationalError as e:
+            await self._send_error(writer, HttpError(503, str(e)),
+                                   close=not keep_alive, head_only=head_only)
+        except ConnectionError:
+            raise
+        except Exception as e:
+            metrics.count("http.errors")
+            await self._send_error(writer, HttpError(500, str(e)), close=True)
+            return False
+        return keep_alive
+
+    def _write_head(self, writer, status: int, headers: dict, keep_alive: bool):
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+                 f"Date: {formatdate(usegmt=True)}",
+                 "Server: audio-library",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines += [f"{k}: {v}" for k, v in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+    async def _send_json(self, writer, status: int, payload, keep_alive: bool,
+                         head_only: bool = False, headers: dict | None = None):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self._write_head(writer, status, {
+            "Content-Type": "application/json; charset=utf-8",
+            "Content-Length": str(len(body)),
+            "Cache-Control": "no-store",
+            **(headers or {}),
+        }, keep_alive)
+        if not head_only:
+            writer.write(body)
+        await writer.drain()
+
+    async def _send_error(self, writer, error: HttpError, close: bool,
+                          head_only: bool = False):
+        await self._send_json(writer, error.status, {"error": str(error)},
+                              not close, head_only, error.headers)
+
+    # --- JSON endpoints ---
+
+    async def _health(self, request):
+        return {"status": "ok", "fts": self.db._fts, "pool_size": self.db.pool_size}
+
+    async def _search(self, request):
+        sort = request.arg("sort", "date_added")
+        if sort not in Database.SORT_COLUMNS:
+            raise HttpError(400, f"sort must be one of {', '.join(Database.SORT_COLUMNS)}")
+        limit = request.int_arg("limit", 50, 1, MAX_PAGE)
+        offset = request.int_arg("offset", 0)
+        filters = {
+            "query": request.arg("q"),
+            "tags": request.query.get("tag") or None,
+            "fmt": request.arg("format"),
+            "min_dur": request.float_arg("min_duration"),
+            "max_dur": request.float_arg("max_duration"),
+        }
+        after = _decode_cursor(request.arg("after")) if request.arg("after") else None
+        rows = await self._query(
+            self.db.search_audio, **filters, sort=sort,
+            descending=request.arg("desc", "1") != "0", limit=limit,
+            offset=0 if after else offset, after=after,
+        )
+        total = await self._query(self.db.count_audio, **filters)
+        next_cursor = (_encode_cursor(Database.page_cursor(rows[-1], sort))
+                       if len(rows) == limit else None)
+        page = {"total": total, "next": next_cursor, "results": rows}
+        if after is None:
+            page["offset"] = offset  # meaningless when paging by cursor
+        return page
+
+    async def _segments(self, request):
+        query = request.arg("q")
+        if not query:
+            raise HttpError(400, "q is required")
+        hits = await self._query(
+            self.db.search_segments, query,
+            limit=request.int_arg("limit", 50, 1, MAX_PAGE),
+            offset=request.int_arg("offset", 0),
+        )
+        return {"query": query, "results": hits}
+
+    async def _audio_info(self, request, audio_id: int):
+        info = await self._query(self.db.get_audio, audio_id)
+        if not info:
+            raise HttpError(404, "audio not found")
+        info["tags"] = await self._query(self.db.get_audio_tags, audio_id)
+        info["stream_url"] = f"/audio/{audio_id}"
+        return info
+
+    async def _transcript(self, request, audio_id: int):
+        trans = await self._query(self.db.get_transcription, audio_id)
+        if not trans:
+            raise HttpError(404, "no transcription")
+        return trans
+
+    async def _peaks(self, request, audio_id: int):
+        peaks = await self._query(self.db.get_waveform, audio_id)
+        if peaks is None:
+            raise HttpError(404, "peaks not computed (run the 'waveform' job)")
+        peaks = _downsample(peaks, request.int_arg("points", 0))
+        return {"audio_id": audio_id, "points": len(peaks), "peaks": peaks}
+
+    # --- Audio streaming ---
+
+    async def _stream(self, audio_id: int, request, writer, head_only: bool):
+        info = await self._query(self.db.get_audio, audio_id)
+        if not info:
+            raise HttpError(404, "audio not found")
+        try:
+            f = await self._loop.run_in_executor(None, open, info["file_path"], "rb")
+        except OSError:
+            raise HttpError(404, "file missing on disk")
+        try:
+            st = os.fstat(f.fileno())
+            size = st.st_size
+            etag = f'"{size:x}-{st.st_mtime_ns:x}"'
+            headers = {
+                "Accept-Ranges": "bytes",
+                "ETag": etag,
+                "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+                "Content-Type": AUDIO_TYPES.get(
+                    os.path.splitext(info["file_path"])[1].lower(),
+                    mimetypes.guess_type(info["file_path"])[0] or "application/octet-stream",
+                ),
+            }
+            keep_alive = request.keep_alive
+            if request.headers.get("if-none-match") == etag:
+                self._write_head(writer, 304, headers, keep_alive)
+                await writer.drain()
+                return
+
+            status, start, length = 200, 0, size
+            range_header = request.headers.get("range")
+            if_range = request.headers.get("if-range")
+            if range_header and (if_range is None or if_range == etag):
+                span = parse_range(range_header, size)
+                if span is not None:
+                    start, end = span
+                    status, length = 206, end - start + 1
+                    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(length)
+
+            self._write_head(writer, status, headers, keep_alive)
+            await writer.drain()
+            if not head_only and length:
+                metrics.count("http.bytes_sent", length)
+                await self._loop.sendfile(writer.transport, f, start, length)
+        finally:
+            f.close()
+
+
+def serve_in_background(db_path: str | None = None, host: str = "127.0.0.1",
+                        port: int = 8765, pool_size: int = 8) -> HttpApi:
+    """Run the API on its own event loop in a daemon thread (GUI use).
+    Raises OSError if the port cannot be bound."""
+    api = HttpApi(db_path, host, port, pool_size)
+    ready = threading.Event()
+    failure: list[BaseException] = []
+
+    def _run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(api.start())
+        except OSError as e:
+            failure.append(e)
+            ready.set()
+            return
+        ready.set()
+        try:
+            loop.run_until_complete(api.serve_forever())
+        except asyncio.CancelledError:
+            pass  # close() stops serve_forever by cancelling it
+        finally:
+            # Let open connections unwind before the loop goes away.
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.close()
+
+    threading.Thread(target=_run, name="http-api", daemon=True).start()
+    ready.wait()
+    if failure:
+        api.close()
+        raise failure[0]
+    return api
@@ -0,0 +1,167 @@
+"""Library integrity pass: find missing or changed files and relink moved ones.
+
+Every row is stat'ed on a thread pool (stat releases the GIL, so on a NAS
+dozens of requests are in flight at once). Files that are gone are looked
+for under caller-supplied roots, which are listed concurrently too. A
+candidate must have the same size and the same content fingerprint
+(``partial_hash``, then ``content_hash`` when that is stored as well). Rows
+without a stored fingerprint fall back to size plus file name, and
+only when exactly one file matches.
+"""
+
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+from src.utils import metrics
+from src.utils.file_utils import full_hash, is_audio_file, partial_hash
+
+CHUNK = 2048
+
+
+def _stat(row: dict) -> tuple[dict, str, tuple | None]:
+    try:
+        st = os.stat(row["file_path"])
+    except FileNotFoundError:
+        return row, "missing", None
+    except OSError:
+        return row, "unreadable", None
+    mtime = datetime.fromtimestamp(st.st_mtime).isoformat()
+    if st.st_size != row["file_size"] or mtime != row["date_modified"]:
+        return row, "changed", (st.st_size, mtime)
+    return row, "ok", None
+
+
+@metrics.timed("integrity.check")
+def check_library(db, workers: int = 32, update_changed: bool = True,
+                  progress=None) -> dict:
+    """Stat every file in the library.
+
+    Returns ids per state (``missing``, ``changed``, ``unreadable``) and the
+    number checked. With ``update_changed`` the size and mtime of changed
+    files are stored and their fingerprints reset.
+    """
+    report = {"checked": 0, "missing": [], "changed": [], "unreadable": []}
+    updates = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        chunk = []
+        for row in db.iter_audio(page_size=CHUNK, sort="date_added"):
+            chunk.append(row)
+            if len(chunk) == CHUNK:
+                _check_chunk(pool, chunk, report, updates)
+                chunk = []
+                if progress is not None:
+                    progress(report["checked"])
+        _check_chunk(pool, chunk, report, updates)
+    if update_changed and updates:
+        db.update_file_stats(updates)
+    return report
+
+
+def _check_chunk(pool, rows: list[dict], report: dict, updates: list):
+    for row, state, stats in pool.map(_stat, rows):
+        report["checked"] += 1
+        if state == "ok":
+            continue
+        report[state].append(row["id"])
+        if stats is not None:
+            updates.append((row["id"], *stats))
+
+
+def _list_dir(path: str) -> tuple[list[tuple[str, int]], list[str]]:
+    files, dirs = [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        dirs.append(entry.path)
+                    elif entry.is_file() and is_audio_file(entry.name):
+                        files.append((entry.path, entry.stat().st_size))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return files, dirs
+
+
+def scan_roots(roots: list[str], pool) -> list[tuple[str, int]]:
+    """(path, size) of every audio file under ``roots``; directories are
+    listed in parallel as they are discovered."""
+    found = []
+    pending = {pool.submit(_list_dir, os.path.abspath(r)) for r in roots}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            files, dirs = future.result()
+            found.extend(files)
+            pending |= {pool.submit(_list_dir, d) for d in dirs}
+    return found
+
+
+def _safe(fn, path: str) -> str | None:
+    try:
+        return fn(path)
+    except OSError:
+        return None
+
+
+@metrics.timed("integrity.relink")
+def relink_missing(db, roots: list[str], audio_ids: list[int] | None = None,
+                   workers: int = 32, dry_run: bool = False) -> dict:
+    """Find moved files under ``roots`` and point their rows at the new
+    paths. ``audio_ids`` defaults to every row whose file is missing."""
+    if audio_ids is None:
+        audio_ids = check_library(db, workers, update_changed=False)["missing"]
+    rows = [r for r in (db.get_audio(i) for i in audio_ids) if r]
+    report = {"relinked": [], "unmatched": [], "ambiguous": []}
+    if not rows:
+        return report
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        by_size: dict[int, list[str]] = {}
+        for path, size in scan_roots(roots, pool):
+            by_size.setdefault(size, []).append(os.path.realpath(path))
+        known = db.existing_paths([p for paths in by_size.values() for p in paths])
+
+        candidates = {r["id"]: [p for p in by_size.get(r["file_size"], []) if p not in known]
+                      for r in rows}
+        # Hash each candidate once, however many rows it could belong to.
+        need_partial = list({p for r in rows if r["partial_hash"]
+                             for p in candidates[r["id"]]})
+        partials = dict(zip(need_partial, pool.map(
+            lambda p: _safe(partial_hash, p), need_partial)))
+        matches = {}
+        for r in rows:
+            cands = candidates[r["id"]]
+            if r["partial_hash"]:
+                cands = [p for p in cands if partials.get(p) == r["partial_hash"]]
+            else:
+                cands = [p for p in cands
+                         if os.path.basename(p) == r["file_name"]]
+            matches[r["id"]] = cands
+
+        need_full = list({p for r in rows if r["content_hash"] and len(matches[r["id"]]) > 1
+                          for p in matches[r["id"]]})
+        fulls = dict(zip(need_full, pool.map(lambda p: _safe(full_hash, p), need_full)))
+        for r in rows:
+            if r["content_hash"] and len(matches[r["id"]]) > 1:
+                matches[r["id"]] = [p for p in matches[r["id"]]
+                                    if fulls.get(p) == r["content_hash"]]
+
+    claimed = set()
+    updates = []
+    for r in rows:
+        cands = [p for p in matches[r["id"]] if p not in claimed]
+        if not cands:
+            report["unmatched"].append(r["id"])
+        elif len(cands) > 1:
+            report["ambiguous"].append({"id": r["id"], "candidates": cands})
+        else:
+            claimed.add(cands[0])
+            updates.append((r["id"], cands[0]))
+            report["relinked"].append({"id": r["id"], "old_path": r["file_path"],
+                                       "new_path": cands[0]})
+    if updates and not dry_run:
+        db.relink_audio(updates)
+    return report
@@ -0,0 +1,468 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+
+from src.core.database import Database
+
+# Per-type concurrency; types not listed may use the whole pool.
+DEFAULT_LIMITS = {
+    "transcribe": 1,
+    "import": 2,
+    "hash_library": 1,
+    "export_library": 1,
+    "import_library": 1,
+    "backup": 1,
+    "export_transcription": 4,
+    "waveform": 2,
+    "fingerprint": 1,
+    "integrity": 1,
+    "sync_folders": 1,
+}
+
+
+# Win32 process checks for owner_alive.
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+ERROR_ACCESS_DENIED = 5
+STILL_ACTIVE = 259
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # Signal 0 is CTRL_C_EVENT on Windows; ask the process table instead.
+        import ctypes
+        from ctypes import wintypes
+
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        kernel32.OpenProcess.restype = wintypes.HANDLE
+        kernel32.OpenProcess.argtypes = (wintypes.DWORD, wintypes.BOOL, wintypes.DWORD)
+        kernel32.GetExitCodeProcess.argtypes = (wintypes.HANDLE,
+                                                ctypes.POINTER(wintypes.DWORD))
+        kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            # Access denied: it exists but runs as another user.
+            return ctypes.get_last_error() == ERROR_ACCESS_DENIED
+        try:
+            code = wintypes.DWORD()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+                return True
+            return code.value == STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:  # exists, owned by another user
+        pass
+    return True
+
+
+def owner_alive(owner: str) -> bool:
+    """Whether the ``host:pid`` that claimed a job may still be running.
+    Processes on other hosts can't be checked; their lease decides."""
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    return _pid_alive(int(pid))
+
+
+class JobScheduler:
+    """Runs jobs persisted in the ``jobs`` table on a bounded pool.
+
+    Works without Qt: the GUI subscribes with ``add_listener`` (callbacks run
+    on worker threads), headless callers use ``run_until_idle``. Jobs are
+    claimed with a conditional UPDATE, so several schedulers can share one
+    database. A claimed job is leased to ``host:pid`` and the lease is
+    renewed while it runs. Workers are daemon threads: a job interrupted by
+    exit stays ``running`` until its owner is found dead or its lease runs
+    out, then any scheduler queues it again.
+    """
+
+    def __init__(self, db: Database, handlers: dict | None = None,
+                 max_workers: int = 4, limits: dict | None = None,
+                 poll_interval: float = 1.0, lease_seconds: float = 60.0):
+        self.db = db
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = max(1.0, lease_seconds)
+        self.handlers = dict(handlers) if handlers is not None else default_handlers(db)
+        self.max_workers = max(1, max_workers)
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.poll_interval = poll_interval
+        self._running: dict[int, str] = {}  # job id -> type
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread: threading.Thread | None = None
+        self._heartbeat_running = False
+        self._last_requeue = 0.0
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """``callback(job: dict)`` after every state change of a job run here."""
+        self._listeners.append(callback)
+
+    def submit(self, job_type: str, payload: dict | None = None,
+               max_attempts: int = 3) -> int:
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        job_id = self.db.add_job(job_type, payload, max_attempts)
+        with self._cond:
+            self._cond.notify_all()
+        return job_id
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a job that has not started yet."""
+        return self.db.cancel_job(job_id)
+
+    @property
+    def running(self) -> dict[int, str]:
+        with self._cond:
+            return dict(self._running)
+
+    # --- Lifecycle ---
+
+    def start(self, resume: bool = True):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if resume:
+            self._requeue_stale()
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._loop, name="job-scheduler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, wait: bool = False, timeout: float | None = None):
+        """Stop dispatching. With ``wait`` also wait for running jobs."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            if wait:
+                self._cond.wait_for(lambda: not self._running, timeout)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run_until_idle(self, resume: bool = True) -> dict:
+        """Run in the calling thread until no queued job this scheduler can
+        handle is left. Returns ``{state: count}`` for the jobs it ran."""
+        if resume:
+            self._requeue_stale()
+        outcome: dict[str, int] = {}
+
+        def _count(job: dict):
+            if job["state"] != "running":
+                state = "retried" if job["state"] == "queued" else job["state"]
+                outcome[state] = outcome.get(state, 0) + 1
+
+        self._listeners.append(_count)
+        self._stopping = False
+        try:
+            while True:
+                self._dispatch()
+                with self._cond:
+                    if not self._running and not self._pending():
+                        break
+                    self._cond.wait(self.poll_interval)
+        finally:
+            self._listeners.remove(_count)
+        return outcome
+
+    # --- Internals ---
+
+    def _requeue_stale(self):
+        self._last_requeue = time.monotonic()
+        self.db.requeue_running_jobs(owner_alive)
+
+    def _heartbeat(self):
+        """Renew the leases of this scheduler's jobs while any is running."""
+        while True:
+            with self._cond:
+                if not self._running:
+                    self._heartbeat_running = False
+                    return
+                ids = list(self._running)
+            try:
+                self.db.renew_job_leases(self.owner, ids, self.lease_seconds)
+            except Exception:
+                traceback.print_exc()
+            time.sleep(self.lease_seconds / 3)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+            try:
+                # Jobs of schedulers that died while this one runs.
+                if time.monotonic() - self._last_requeue >= self.lease_seconds:
+                    self._requeue_stale()
+                self._dispatch()
+            except Exception:
+                traceback.print_exc()
+            with self._cond:
+                if self._stopping:
+                    return
+                self._cond.wait(self.poll_interval)
+
+    def _pending(self) -> list[dict]:
+        return [j for j in self.db.get_jobs(["queued"]) if j["job_type"] in self.handlers]
+
+    def _dispatch(self):
+        with self._cond:
+            if self._stopping:
+                return
+            free = self.max_workers - len(self._running)
+            per_type: dict[str, int] = {}
+            for t in self._running.values():
+                per_type[t] = per_type.get(t, 0) + 1
+        if free <= 0:
+            return
+        for job in self._pending():
+            job_type = job["job_type"]
+            if per_type.get(job_type, 0) >= self.limits.get(job_type, self.max_workers):
+                continue
+            if not self.db.claim_job(job["id"], self.owner, self.lease_seconds):
+                continue  # taken by another scheduler
+            with self._cond:
+                self._running[job["id"]] = job_type
+                if not self._heartbeat_running:
+                    self._heartbeat_running = True
+                    threading.Thread(target=self._heartbeat, name="job-heartbeat",
+                                     daemon=True).start()
+            per_type[job_type] = per_type.get(job_type, 0) + 1
+            threading.Thread(
+                target=self._execute, args=(job["id"], job_type, job["payload"]),
+                name=f"job-{job['id']}", daemon=True,
+            ).start()
+            free -= 1
+            if free <= 0:
+                break
+
+    def _execute(self, job_id: int, job_type: str, payload: dict):
+        try:
+            self._notify(job_id)
+            try:
+                result = self.handlers[job_type](payload)
+            except Exception as e:
+                self._record(self.db.fail_job, job_id, f"{type(e).__name__}: {e}")
+            else:
+                self._record(self.db.finish_job, job_id, result)
+            self._notify(job_id)
+        finally:
+            # Always free the slot: a job left here would keep its lease
+            # renewed forever and block its type.
+            with self._cond:
+                self._running.pop(job_id, None)
+                self._cond.notify_all()
+
+    def _record(self, fn, job_id: int, *args, retries: int = 5):
+        """Store a job's outcome, retrying a busy database. If it still
+        fails the job stays ``running`` and is requeued once its lease,
+        no longer renewed, runs out."""
+        for attempt in range(retries + 1):
+            try:
+                fn(job_id, *args)
+                return
+            except sqlite3.OperationalError as e:
+                busy = "locked" in str(e) or "busy" in str(e)
+                if not busy or attempt == retries:
+                    traceback.print_exc()
+                    return
+                time.sleep(min(1.0, 0.05 * 2 ** attempt))
+            except Exception:
+                traceback.print_exc()
+                return
+
+    def _notify(self, job_id: int):
+        if not self._listeners:
+            return
+        try:
+            job = self.db.get_job(job_id)
+        except Exception:
+            traceback.print_exc()
+            return
+        if job is None:
+            return
+        for callback in list(self._listeners):
+            try:
+                callback(job)
+            except Exception:
+                traceback.print_exc()
+
+
+# --- Built-in job types ---
+
+def default_handlers(db: Database, writer=None) -> dict:
+    """Handlers for the job types the app submits; payloads are plain JSON.
+    With a ``DatabaseWriter`` results are stored through its group commits."""
+    models: dict[tuple, object] = {}
+    models_lock = threading.Lock()
+
+    def write(fn, *args):
+        return writer.call(fn, *args) if writer is not None else fn(*args)
+
+    def run_import(payload: dict) -> dict:
+        from src.core.audio_manager import AudioManager
+        from src.utils.file_utils import scan_folder
+
+        files = []
+        for path in payload.get("paths", []):
+            if os.path.isdir(path):
+                files.extend(scan_folder(path))
+            elif os.path.isfile(path):
+                files.append(path)
+        skipped = []
+        ids = AudioManager(db).import_files(
+            files, workers=payload.get("workers", 8),
+            skip_duplicates=payload.get("skip_duplicates", False), skipped=skipped,
+        )
+        return {"found": len(files), "imported": len(ids), "ids": ids,
+                "skipped": [{"path": p, "duplicate_of": i} for p, i in skipped]}
+
+    def run_hash_library(payload: dict) -> dict:
+        from src.core.audio_manager import AudioManager
+        stats = AudioManager(db).hash_library(workers=payload.get("workers", 8))
+        return {**stats, "duplicate_groups": len(db.get_duplicate_groups())}
+
+    def run_transcribe(payload: dict) -> dict:
+        from src.core.transcriber import load_model, transcribe_file
+
+        info = db.get_audio(payload["audio_id"])
+        if not info:
+            raise LookupError(f"audio {payload['audio_id']} not in library")
+        model_name = payload.get("model", "base")
+        key = (model_name, payload.get("cpu_threads", 0))
+        with models_lock:
+            if key not in models:
+                models[key] = load_model(model_name, cpu_threads=key[1])
+            model = models[key]
+        language = payload.get("language")
+        result = transcribe_file(
+            model, info["file_path"],
+            language=None if language in (None, "", "auto") else language,
+            batched=payload.get("batched", False),
+            batch_size=payload.get("batch_size", 16),
+            word_timestamps=payload.get("word_timestamps", False),
+        )
+        write(
+            db.save_transcription, info["id"], result["full_text"],
+            result["language"], model_name, result["segments"], result.get("words"),
+        )
+        return {"audio_id": info["id"], "segments": len(result["segments"]),
+                "rtf": result["rtf"]}
+
+    def run_export_library(payload: dict) -> dict:
+        from src.core.library_io import detect_format, export_library
+        path = payload["path"]
+        fmt = payload.get("format") or detect_format(path)
+        count = export_library(db, path, fmt)
+        return {"path": path, "format": fmt, "exported": count}
+
+    def run_import_library(payload: dict) -> dict:
+        from src.core.library_io import import_library
+        stats = import_library(db, payload["path"], payload.get("format"))
+        return {"path": payload["path"], **stats}
+
+    def run_backup(payload: dict) -> dict:
+        from src.core.backup import backup_database, backup_rotating
+        verify = payload.get("verify", "quick")
+        if payload.get("dir"):
+            return backup_rotating(db.db_path, payload["dir"], payload.get("keep", 7),
+                                   verify=verify)
+        return backup_database(db.db_path, payload["path"], verify=verify)
+
+    def run_export_transcription(payload: dict) -> dict:
+        from src.core.transcriber import (
+            export_transcription_txt, export_transcription_srt,
+            export_transcription_json,
+        )
+        exporters = {"txt": export_transcription_txt, "srt": export_transcription_srt,
+                     "json": export_transcription_json}
+        trans = db.get_transcription(payload["audio_id"])
+        if not trans:
+            raise LookupError(f"audio {payload['audio_id']} has no transcription")
+        fmt = payload.get("format", "txt")
+        exporters[fmt](trans, payload["path"])
+        return {"audio_id": payload["audio_id"], "path": payload["path"]}
+
+    def run_waveform(payload: dict) -> dict:
+        from src.core.editor import AudioEditor
+
+        ids = payload.get("audio_ids") or db.audio_without_waveform()
+        points = payload.get("points", 800)
+        done, failed = 0, []
+        for audio_id in ids:
+            info = db.get_audio(audio_id)
+            editor = AudioEditor()
+            if not info or not editor.load(info["file_path"]):
+                failed.append(audio_id)
+                continue
+            write(db.save_waveform, audio_id, editor.get_waveform_data(points))
+            done += 1
+        return {"computed": done, "failed": failed}
+
+    def run_fingerprint(payload: dict) -> dict:
+        from concurrent.futures import ThreadPoolExecutor
+        from src.core import fingerprint
+
+        ids = payload.get("audio_ids") or db.audio_without_fingerprint()
+        done, failed = 0, []
+
+        def _compute(audio_id: int):
+            info = db.get_audio(audio_id)
+            try:
+                return audio_id, fingerprint.compute(info["file_path"]) if info else False
+            except Exception:
+                return audio_id, False
+
+        # Decoding runs in ffmpeg subprocesses, so threads overlap well.
+        with ThreadPoolExecutor(max_workers=payload.get("workers", 4)) as pool:
+            for start in range(0, len(ids), 64):
+                items = []
+                for audio_id, sig in pool.map(_compute, ids[start:start + 64]):
+                    if sig is False:
+                        failed.append(audio_id)
+                    elif sig is None:  # nothing audible: stored so it is not retried
+                        items.append((audio_id, b"", []))
+                    else:
+                        items.append((audio_id, fingerprint.to_blob(sig),
+                                      fingerprint.lsh_keys(sig)))
+                if items:
+                    write(db.save_fingerprints, items)
+                    done += len(items)
+        groups = fingerprint.near_duplicate_groups(
+            db, payload.get("threshold", fingerprint.DEFAULT_THRESHOLD))
+        return {"computed": done, "failed": failed, "groups": groups}
+
+    def run_integrity(payload: dict) -> dict:
+        from src.core.integrity import check_library, relink_missing
+        workers = payload.get("workers", 32)
+        report = check_library(db, workers, payload.get("update_changed", True))
+        relinked = {}
+        if payload.get("roots") and report["missing"]:
+            relinked = relink_missing(db, payload["roots"], report["missing"],
+                                      workers, payload.get("dry_run", False))
+        return {**report, **relinked}
+
+    def run_sync_folders(payload: dict) -> dict:
+        from src.core.watcher import apply_changes
+        return apply_changes(db, payload, payload.get("workers", 8),
+                             payload.get("skip_duplicates", False))
+
+    return {
+        "import": run_import,
+        "hash_library": run_hash_library,
+        "transcribe": run_transcribe,
+        "export_library": run_export_library,
+        "import_library": run_import_library,
+        "backup": run_backup,
+        "export_transcription": run_export_transcription,
+        "waveform": run_waveform,
+        "fingerprint": run_fingerprint,
+        "integrity": run_integrity,
+        "sync_folders": run_sync_folders,
+    }
@@ -0,0 +1,373 @@
+"""Streaming export and bulk import of the whole library.
+
+Exports walk ordered cursors over one read snapshot and write records as
+they are produced, so memory stays flat however large the library is.
+Formats, chosen by extension (``.gz``, ``.bz2`` and ``.xz`` add
+compression):
+
+* ``.ndjson`` / ``.jsonl`` - a header line (format version, tags with
+  colours), then one line per file with its tags and transcription
+  (segments and packed word timings). Lossless; ``import_library`` reads it.
+* ``.csv`` - one row per file; ``tags`` is ``;``-separated and
+  ``segments`` a JSON array. Also importable, without word timings.
+* ``.json`` - the original ``{"audio_files": [...], "tags": [...]}``
+  document, written incrementally.
+"""
+
+import bz2
+import csv
+import gzip
+import json
+import lzma
+from datetime import datetime
+from itertools import groupby
+
+from src.utils import metrics
+
+FORMAT_NAME = "audio-library"
+FORMAT_VERSION = 1
+
+_COMPRESSORS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+_FORMATS = {".ndjson": "ndjson", ".jsonl": "ndjson", ".csv": "csv", ".json": "json"}
+
+CSV_EXTRA = ["tags", "language", "model_used", "date_transcribed",
+             "full_text", "segments"]
+
+
+def _open(path: str, mode: str):
+    opener = _COMPRESSORS.get(_suffixes(path)[1], open)
+    return opener(path, mode + "t", encoding="utf-8", newline="")
+
+
+def _suffixes(path: str) -> tuple[str, str]:
+    """(format suffix, compression suffix) of ``path``."""
+    lower = path.lower()
+    for comp in _COMPRESSORS:
+        if lower.endswith(comp):
+            lower = lower[:-len(comp)]
+            break
+    else:
+        comp = ""
+    dot = lower.rfind(".")
+    return (lower[dot:] if dot >= 0 else ""), comp
+
+
+def detect_format(path: str) -> str:
+    return _FORMATS.get(_suffixes(path)[0], "ndjson")
+
+
+class _Groups:
+    """Rows of a cursor ordered by ``audio_id``, taken in step with the walk
+    over ``audio_files``."""
+
+    def __init__(self, rows):
+        self._groups = groupby(rows, key=lambda r: r["audio_id"])
+        self._next = next(self._groups, None)
+
+    def take(self, audio_id: int) -> list:
+        while self._next is not None and self._next[0] < audio_id:
+            self._next = next(self._groups, None)
+        if self._next is None or self._next[0] != audio_id:
+            return []
+        rows = list(self._next[1])
+        self._next = next(self._groups, None)
+        return rows
+
+
+def iter_library(db, cancelled=None):
+    """Yield one dict per audio file, in id order, with ``tags`` (names) and
+    ``transcription`` (or None) attached.
+
+    Tags, transcriptions, segments and words come from separate cursors
+    ordered by audio id and are merged as the walk advances, instead of
+    querying per file. All cursors share one read transaction.
+    """
+    with db._conn(cancelled) as conn:
+        conn.execute("BEGIN")
+        audio = conn.execute("SELECT * FROM audio_files ORDER BY id")
+        tags = _Groups(conn.execute(
+            """SELECT at.audio_id, t.name FROM audio_tags at
+               JOIN tags t ON t.id = at.tag_id ORDER BY at.audio_id, t.name"""
+        ))
+        trans = _Groups(conn.execute("SELECT * FROM transcriptions ORDER BY audio_id"))
+        segs = _Groups(conn.execute(
+            """SELECT t.audio_id, s.start_time, s.end_time, s.text
+               FROM transcriptions t
+               JOIN transcription_segments s ON s.transcription_id = t.id
+               ORDER BY t.audio_id, s.start_time, s.id"""
+        ))
+        words = _Groups(conn.execute(
+            """SELECT t.audio_id, w.starts, w.ends, w.offsets, w.text
+               FROM transcriptions t
+               JOIN transcription_words w ON w.transcription_id = t.id
+               ORDER BY t.audio_id"""
+        ))
+        for row in audio:
+            record = dict(row)
+            audio_id = record["id"]
+            record["tags"] = [r["name"] for r in tags.take(audio_id)]
+            t = trans.take(audio_id)
+            if not t:
+                record["transcription"] = None
+                yield record
+                continue
+            t, w = t[0], words.take(audio_id)
+            record["transcription"] = {
+                "language": t["language"],
+                "model_used": t["model_used"],
+                "date_transcribed": t["date_transcribed"],
+                "full_text": t["full_text"],
+                "segments": [
+                    {"start": s["start_time"], "end": s["end_time"], "text": s["text"]}
+                    for s in segs.take(audio_id)
+                ],
+                "words": _words_to_json(w[0]) if w else None,
+            }
+            yield record
+
+
+def _words_to_json(row) -> dict:
+    from src.core.word_index import WordIndex
+    index = WordIndex.from_row(row)
+    return {"starts": index.starts.tolist(), "ends": index.ends.tolist(),
+            "offsets": index.offsets.tolist(), "text": index.text}
+
+
+@metrics.timed("library_io.export")
+def export_library(db, path: str, fmt: str | None = None, progress=None,
+                   cancelled=None) -> int:
+    """Stream the library to ``path``; returns the number of files written.
+
+    ``progress(count)`` is called every 1000 files.
+    """
+    fmt = fmt or detect_format(path)
+    writer = {"ndjson": _write_ndjson, "csv": _write_csv, "json": _write_json}[fmt]
+    count = 0
+    with _open(path, "w") as f:
+        for count, _ in enumerate(writer(f, db, iter_library(db, cancelled)), 1):
+            if progress is not None and count % 1000 == 0:
+                progress(count)
+    return count
+
+
+def _write_ndjson(f, db, records):
+    header = {"format": FORMAT_NAME, "version": FORMAT_VERSION,
+              "exported_at": datetime.now().isoformat(),
+              "tags": [{"name": t["name"], "color": t["color"]}
+                       for t in db.get_all_tags()]}
+    f.write(json.dumps(header, ensure_ascii=False) + "\n")
+    for record in records:
+        f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        yield record
+
+
+def _write_csv(f, db, records):
+    writer = None
+    for record in records:
+        trans = record.pop("transcription") or {}
+        row = {**record, "tags": ";".join(record["tags"]),
+               "language": trans.get("language", ""),
+               "model_used": trans.get("model_used", ""),
+               "date_transcribed": trans.get("date_transcribed", ""),
+               "full_text": trans.get("full_text", ""),
+               "segments": json.dumps(trans["segments"], ensure_ascii=False)
+               if trans else ""}
+        if writer is None:
+            fields = [k for k in record if k != "tags"] + CSV_EXTRA
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+        writer.writerow(row)
+        yield record
+
+
+def _write_json(f, db, records):
+    f.write('{\n  "audio_files": [')
+    sep = "\n    "
+    for record in records:
+        record.pop("transcription")
+        record.pop("tags")
+        f.write(sep + json.dumps(record, ensure_ascii=False))
+        sep = ",\n    "
+        yield record
+    f.write("\n  ],\n  \"tags\": ")
+    f.write(json.dumps(db.get_all_tags(), ensure_ascii=False))
+    f.write(f',\n  "exported_at": {json.dumps(datetime.now().isoformat())}\n}}\n')
+
+
+# --- Import ---
+
+def _read_ndjson(f):
+    first = f.readline()
+    header = json.loads(first) if first.strip() else {}
+    if header.get("format") != FORMAT_NAME:
+        raise ValueError("not an audio library NDJSON export")
+    if header.get("version", 0) > FORMAT_VERSION:
+        raise ValueError(f"unsupported export version {header['version']}")
+    yield header
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _read_csv(f, nullable=frozenset()):
+    yield {"tags": []}
+    for row in csv.DictReader(f):
+        record = {k: v for k, v in row.items() if k not in CSV_EXTRA}
+        for key in ("id", "file_size", "sample_rate", "channels", "bitrate",
+                    "is_transcribed"):
+            if record.get(key) not in (None, ""):
+                record[key] = int(record[key])
+        if record.get("duration") not in (None, ""):
+            record["duration"] = float(record["duration"])
+        for key in nullable:
+            if record.get(key) == "":
+                record[key] = None
+        record["tags"] = [t for t in (row.get("tags") or "").split(";") if t]
+        record["transcription"] = {
+            "language": row.get("language", ""),
+            "model_used": row.get("model_used", ""),
+            "date_transcribed": row.get("date_transcribed") or None,
+            "full_text": row.get("full_text", ""),
+            "segments": json.loads(row["segments"]),
+            "words": None,
+        } if row.get("segments") else None
+        yield record
+
+
+@metrics.timed("library_io.import")
+def import_library(db, path: str, fmt: str | None = None, batch_size: int = 2000,
+                   progress=None) -> dict:
+    """Bulk-load an export made by ``export_library`` (NDJSON or CSV).
+
+    Files whose path is already in the library are skipped with their tags
+    and transcript. Into an empty database the original ids are kept.
+    Rows are inserted with ``executemany`` in one transaction per batch.
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in ("ndjson", "csv"):
+        raise ValueError(f"cannot import {fmt} exports; use NDJSON or CSV")
+    stats = {"audio": 0, "skipped": 0, "tags": 0, "transcriptions": 0, "segments": 0}
+    with _open(path, "r") as f, db._conn() as conn:
+        conn.execute("PRAGMA synchronous=NORMAL")
+        info = conn.execute("PRAGMA table_info(audio_files)").fetchall()
+        columns = [r[1] for r in info]
+        keep_ids = conn.execute("SELECT 1 FROM audio_files LIMIT 1").fetchone() is None
+        if not keep_ids:
+            columns.remove("id")
+        if fmt == "ndjson":
+            records = _read_ndjson(f)
+        else:
+            # CSV writes NULL as an empty cell. It is read back as NULL
+            # wherever '' is not a value of its own: nullable columns without
+            # a default, and numbers.
+            records = _read_csv(f, frozenset(
+                name for _, name, kind, notnull, default, _ in info
+                if not notnull and (default is None or kind in ("INTEGER", "REAL"))
+            ))
+        header = next(records)
+        tag_ids = _ensure_tags(conn, header.get("tags", []), {})
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                _import_batch(conn, batch, columns, tag_ids, stats)
+                conn.commit()
+                batch = []
+                if progress is not None:
+                    progress(stats["audio"] + stats["skipped"])
+        if batch:
+            _import_batch(conn, batch, columns, tag_ids, stats)
+    return stats
+
+
+def _ensure_tags(conn, tags: list[dict], tag_ids: dict) -> dict:
+    missing = [t for t in tags if t["name"] not in tag_ids]
+    if missing:
+        conn.executemany(
+            "INSERT OR IGNORE INTO tags (name, color) VALUES (?, ?)",
+            [(t["name"], t.get("color") or "#3498db") for t in missing],
+        )
+        names = json.dumps([t["name"] for t in missing])
+        tag_ids.update(conn.execute(
+            "SELECT name, id FROM tags WHERE name IN (SELECT value FROM json_each(?))",
+            (names,),
+        ).fetchall())
+    return tag_ids
+
+
+def _import_batch(conn, batch: list[dict], columns: list[str], tag_ids: dict,
+                  stats: dict):
+    paths = json.dumps([r["file_path"] for r in batch])
+    existing = {row[0] for row in conn.execute(
+        "SELECT file_path FROM audio_files "
+        "WHERE file_path IN (SELECT value FROM json_each(?))", (paths,)
+    )}
+    fresh = [r for r in batch if r["file_path"] not in existing]
+    stats["skipped"] += len(batch) - len(fresh)
+    if not fresh:
+        return
+    conn.executemany(
+        f"INSERT OR IGNORE INTO audio_files ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' * len(columns))})",
+        [tuple(r.get(c) for c in columns) for r in fresh],
+    )
+    ids = dict(conn.execute(
+        "SELECT file_path, id FROM audio_files "
+        "WHERE file_path IN (SELECT value FROM json_each(?))",
+        (json.dumps([r["file_path"] for r in fresh]),),
+    ).fetchall())
+    stats["audio"] += len(fresh)
+
+    _ensure_tags(conn, [{"name": n} for r in fresh for n in r.get("tags") or []], tag_ids)
+    links = [(ids[r["file_path"]], tag_ids[n]) for r in fresh for n in r.get("tags") or []]
+    conn.executemany(
+        "INSERT OR IGNORE INTO audio_tags (audio_id, tag_id) VALUES (?, ?)", links
+    )
+    stats["tags"] += len(links)
+
+    transcribed = [(ids[r["file_path"]], r["transcription"])
+                   for r in fresh if r.get("transcription")]
+    if not transcribed:
+        return
+    conn.executemany(
+        """INSERT INTO transcriptions
+           (audio_id, full_text, language, model_used, date_transcribed)
+           VALUES (?, ?, ?, ?, ?)""",
+        [(aid, t.get("full_text", ""), t.get("language", ""),
+          t.get("model_used", ""), t.get("date_transcribed")) for aid, t in transcribed],
+    )
+    trans_ids = dict(conn.execute(
+        "SELECT audio_id, id FROM transcriptions "
+        "WHERE audio_id IN (SELECT value FROM json_each(?))",
+        (json.dumps([aid for aid, _ in transcribed]),),
+    ).fetchall())
+    segments = [(trans_ids[aid], s["start"], s["end"], s["text"])
+                for aid, t in transcribed for s in t.get("segments") or []]
+    conn.executemany(
+        """INSERT INTO transcription_segments
+           (transcription_id, start_time, end_time, text) VALUES (?, ?, ?, ?)""",
+        segments,
+    )
+    conn.executemany(
+        """INSERT INTO transcription_words
+           (transcription_id, word_count, starts, ends, offsets, text)
+           VALUES (?, ?, ?, ?, ?, ?)""",
+        [_words_row(trans_ids[aid], t["words"])
+         for aid, t in transcribed if t.get("words")],
+    )
+    conn.executemany(
+        "UPDATE audio_files SET is_transcribed = 1 WHERE id = ?",
+        [(aid,) for aid, _ in transcribed],
+    )
+    stats["transcriptions"] += len(transcribed)
+    stats["segments"] += len(segments)
+
+
+def _words_row(trans_id: int, words: dict) -> tuple:
+    from array import array
+    from src.core.word_index import WordIndex
+
+    packed = WordIndex(array("f", words["starts"]), array("f", words["ends"]),
+                       array("I", words["offsets"]), words["text"]).to_row()
+    return (trans_id, packed["word_count"], packed["starts"], packed["ends"],
+            packed["offsets"], packed["text"])
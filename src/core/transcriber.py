@@ -0,0 +1,196 @@
+import bisect
+import json
+import time
+
+
+def load_model(model_name: str = "base", device: str = "cpu",
+               compute_type: str = "int8", cpu_threads: int = 0,
+               num_workers: int = 1, local_files_only: bool = False):
+    from faster_whisper import WhisperModel
+
+    return WhisperModel(
+        model_name,
+        device=device,
+        compute_type=compute_type,
+        cpu_threads=max(0, cpu_threads),
+        num_workers=max(1, num_workers),
+        local_files_only=local_files_only,
+    )
+
+
+def transcribe(model, audio, language: str | None = None, batched: bool = False,
+               batch_size: int = 16, word_timestamps: bool = False):
+    """Run either the batched pipeline (faster-whisper >= 1.1) or the
+    sequential decoder, falling back to the latter when unavailable."""
+    if batched:
+        try:
+            from faster_whisper import BatchedInferencePipeline
+        except ImportError:
+            BatchedInferencePipeline = None
+        if BatchedInferencePipeline is not None:
+            pipeline = BatchedInferencePipeline(model=model)
+            return pipeline.transcribe(
+                audio,
+                language=language,
+                beam_size=5,
+                batch_size=max(1, batch_size),
+                vad_filter=True,
+                word_timestamps=word_timestamps,
+            )
+    return model.transcribe(
+        audio,
+        language=language,
+        beam_size=5,
+        vad_filter=True,
+        word_timestamps=word_timestamps,
+    )
+
+
+def transcribe_file(model, audio, language: str | None = None,
+                    batched: bool = False, batch_size: int = 16,
+                    word_timestamps: bool = False, on_segment=None,
+                    cancelled=None) -> dict | None:
+    """Transcribe ``audio`` to a result dict (full_text, language,
+    segments, words, duration, elapsed, rtf).
+
+    ``on_segment(seg, pct)`` is called for every segment with an estimated
+    progress percentage; returns None if ``cancelled()`` becomes true.
+    """
+    started = time.perf_counter()
+    segments_gen, info = transcribe(
+        model, audio, language=language, batched=batched,
+        batch_size=batch_size, word_timestamps=word_timestamps,
+    )
+
+    total_duration = info.duration
+    segments_list = []
+    words = []
+
+    for seg in segments_gen:
+        if cancelled is not None and cancelled():
+            return None
+        seg_dict = {
+            "start": round(seg.start, 2),
+            "end": round(seg.end, 2),
+            "text": seg.text.strip(),
+        }
+        segments_list.append(seg_dict)
+        if word_timestamps:
+            words.extend(
+                {"start": w.start, "end": w.end, "word": w.word}
+                for w in (getattr(seg, "words", None) or [])
+            )
+        if on_segment is not None:
+            pct = -1
+            if total_duration > 0:
+                pct = min(95, int(15 + (seg.end / total_duration) * 80))
+            on_segment(seg_dict, pct)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "full_text": " ".join(s["text"] for s in segments_list),
+        "language": info.language,
+        "segments": segments_list,
+        "words": words,
+        "duration": total_duration,
+        "elapsed": round(elapsed, 2),
+        "rtf": round(elapsed / total_duration, 3) if total_duration > 0 else 0.0,
+    }
+
+
+def remap_segments(segments: list[dict], edits: list[tuple[str, int, int]],
+                   margin: float = 0.0) -> tuple[list[dict], list[tuple[float, float]]]:
+    """Replay editor edits over transcription segments.
+
+    Returns the segments that survive untouched (with remapped times) and the
+    regions of the edited audio, in seconds, that must be transcribed again.
+    Segments overlapping a region (or within ``margin`` of it) are dropped and
+    the region is widened to cover them, so new and kept text never overlap.
+    """
+    kept = [dict(s) for s in sorted(segments, key=lambda s: s["start"])]
+    dirty: list[tuple[float, float]] = []
+
+    for kind, start_ms, end_ms in edits:
+        if kind not in ("trim", "cut"):
+            continue
+        a, b = start_ms / 1000.0, end_ms / 1000.0
+        if b <= a:
+            continue
+
+        if kind == "trim":
+            def f(t, a=a, b=b):
+                return min(max(t, a), b) - a
+        else:
+            def f(t, a=a, b=b):
+                return t if t < a else (a if t < b else t - (b - a))
+
+        dirty = [(f(s), f(e)) for s, e in dirty if f(e) > f(s)]
+        survivors = []
+        for seg in kept:
+            s, e = seg["start"], seg["end"]
+            untouched = (a <= s and e <= b) if kind == "trim" else (e <= a or s >= b)
+            if untouched:
+                seg["start"], seg["end"] = round(f(s), 2), round(f(e), 2)
+                survivors.append(seg)
+            elif f(e) > f(s):
+                dirty.append((f(s), f(e)))
+        kept = survivors
+
+    if not dirty:
+        return kept, []
+
+    # Merge the edit regions, then drop the kept segments that come within
+    # ``margin`` of one. Each region grows to cover the segments it dropped,
+    # once: growing and matching again would spread over touching segments.
+    dirty.sort()
+    merged: list[list[float]] = []
+    for s, e in dirty:
+        if merged and s <= merged[-1][1] + margin:
+            merged[-1][1] = max(merged[-1][1], e)
+        else:
+            merged.append([s, e])
+    grown = [list(r) for r in merged]
+    starts = [r[0] for r in merged]
+    survivors = []
+    for seg in kept:
+        # Regions are sorted and disjoint: if any region reaches the segment,
+        # the last one starting before its end (plus margin) does.
+        i = bisect.bisect_left(starts, seg["end"] + margin) - 1
+        hit = i if i >= 0 and merged[i][1] + margin > seg["start"] else None
+        if hit is None:
+            survivors.append(seg)
+        else:
+            grown[hit][0] = min(grown[hit][0], seg["start"])
+            grown[hit][1] = max(grown[hit][1], seg["end"])
+    regions: list[tuple[float, float]] = []
+    for s, e in sorted(grown):
+        if regions and s <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], max(regions[-1][1], e))
+        else:
+            regions.append((s, e))
+    return survivors, regions
+
+
+def export_transcription_txt(transcription: dict, output_path: str):
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(transcription.get("full_text", ""))
+
+
+def export_transcription_srt(transcription: dict, output_path: str):
+    def _fmt_time(seconds: float) -> str:
+        h = int(seconds // 3600)
+        m = int((seconds % 3600) // 60)
+        s = int(seconds % 60)
+        ms = int((seconds % 1) * 1000)
+        return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        for i, seg in enumerate(transcription.get("segments", []), 1):
+            f.write(f"{i}\n")
+            f.write(f"{_fmt_time(seg['start'])} --> {_fmt_time(seg['end'])}\n")
+            f.write(f"{seg['text']}\n\n")
+
+
+def export_transcription_json(transcription: dict, output_path: str):
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(transcription, f, indent=2, ensure_ascii=False)
@@ -1,77 +1,220 @@
-import json
-from pathlib import Path
-from datetime import datetime
+import time
 
 from PyQt6.QtCore import QThread, pyqtSignal
 
+from src.utils import metrics
+
+from src.core.transcriber import (  # noqa: F401  (re-exported for the UI)
+    load_model,
+    transcribe,
+    transcribe_file,
+    remap_segments,
+    export_transcription_txt,
+    export_transcription_srt,
+    export_transcription_json,
+)
+
 
 class TranscriptionWorker(QThread):
     progress = pyqtSignal(int)
-    segment_ready = pyqtSignal(dict)
+    segments_ready = pyqtSignal(list)  # batch of segment dicts, in order
     finished_transcription = pyqtSignal(dict)
     error = pyqtSignal(str)
 
     def __init__(self, file_path: str, model_name: str = "base",
                  language: str | None = None, device: str = "cpu",
-                 compute_type: str = "int8"):
+                 compute_type: str = "int8", batched: bool = False,
+                 batch_size: int = 16, cpu_threads: int = 0,
+                 num_workers: int = 1, word_timestamps: bool = False,
+                 signal_interval_ms: int = 100,
+                 local_files_only: bool = False):
         super().__init__()
         self.file_path = file_path
         self.model_name = model_name
         self.language = language if language and language != "auto" else None
         self.device = device
         self.compute_type = compute_type
+        self.batched = batched
+        self.batch_size = max(1, batch_size)
+        self.cpu_threads = max(0, cpu_threads)
+        self.num_workers = max(1, num_workers)
+        self.word_timestamps = word_timestamps
+        self.local_files_only = local_files_only
+        self.signal_interval = max(0, signal_interval_ms) / 1000.0
         self._cancelled = False
+        self._pending: list[dict] = []
+        self._pending_pct = -1
+        self._last_pct = -1
+        self._last_flush = 0.0
+        self.signal_stats = {"updates": 0, "segment_signals": 0,
+                             "progress_signals": 0}
 
     def cancel(self):
         self._cancelled = True
 
+    def _queue(self, seg: dict | None = None, pct: int = -1):
+        """Buffer a segment and/or progress update; emit them together once
+        ``signal_interval`` has elapsed since the last flush."""
+        if seg is not None:
+            self._pending.append(seg)
+            self.signal_stats["updates"] += 1
+        if pct >= 0:
+            self._pending_pct = pct
+            self.signal_stats["updates"] += 1
+        if time.perf_counter() - self._last_flush >= self.signal_interval:
+            self._flush()
+
+    def _flush(self):
+        self._last_flush = time.perf_counter()
+        if self._pending:
+            batch, self._pending = self._pending, []
+            self.segments_ready.emit(batch)
+            self.signal_stats["segment_signals"] += 1
+        if self._pending_pct >= 0 and self._pending_pct != self._last_pct:
+            self._last_pct = self._pending_pct
+            self.progress.emit(self._pending_pct)
+            self.signal_stats["progress_signals"] += 1
+        self._pending_pct = -1
+
+    def signals_saved(self) -> int:
+        st = self.signal_stats
+        return st["updates"] - st["segment_signals"] - st["progress_signals"]
+
     def run(self):
         try:
-            from faster_whisper import WhisperModel
-
             self.progress.emit(5)
-            model = WhisperModel(
-                self.model_name,
-                device=self.device,
-                compute_type=self.compute_type,
-            )
+            model = self._load_model()
             self.progress.emit(15)
 
-            segments_gen, info = model.transcribe(
-                self.file_path,
-                language=self.language,
-                beam_size=5,
-                vad_filter=True,
+            with metrics.timer("whisper.transcribe"):
+                result = transcribe_file(
+                    model, self.file_path, language=self.language,
+                    batched=self.batched, batch_size=self.batch_size,
+                    word_timestamps=self.word_timestamps,
+                    on_segment=self._queue, cancelled=lambda: self._cancelled,
+                )
+            if result is None:
+                metrics.count("whisper.cancelled")
+                self._flush()
+                return
+            metrics.count("whisper.audio_seconds", result["duration"] or 0)
+            metrics.count("whisper.segments", len(result["segments"]))
+            metrics.gauge("whisper.last_rtf", result["rtf"])
+
+            self._queue(pct=100)
+            self._flush()
+            result.pop("duration", None)
+            result["model"] = self.model_name
+            result["signals_saved"] = self.signals_saved()
+            self.finished_transcription.emit(result)
+
+        except ImportError:
+            self.error.emit(
+                "faster-whisper non installato.\n"
+                "Installa con: pip install faster-whisper"
             )
+        except Exception as e:
+            self.error.emit(str(e))
 
-            detected_lang = info.language
-            total_duration = info.duration
-            segments_list = []
-            full_text_parts = []
+    @metrics.timed("whisper.load_model")
+    def _load_model(self):
+        return load_model(
+            self.model_name,
+            device=self.device,
+            compute_type=self.compute_type,
+            cpu_threads=self.cpu_threads,
+            num_workers=self.num_workers,
+            local_files_only=self.local_files_only,
+        )
+
+    def _transcribe(self, model, audio=None):
+        return transcribe(
+            model,
+            self.file_path if audio is None else audio,
+            language=self.language,
+            batched=self.batched,
+            batch_size=self.batch_size,
+            word_timestamps=self.word_timestamps,
+        )
+
+
+class RegionTranscriptionWorker(TranscriptionWorker):
+    """Transcribe only the given regions of an in-memory edited segment and
+    merge the result with the segments that survived the edit."""
+
+    def __init__(self, segment, kept_segments: list[dict],
+                 regions: list[tuple[float, float]], margin: float = 2.0,
+                 **kwargs):
+        # Word timings of kept segments aren't remapped; skip them entirely so
+        # a partial word index is never stored.
+        kwargs["word_timestamps"] = False
+        super().__init__("", **kwargs)
+        self.segment = segment
+        self.kept_segments = kept_segments
+        self.regions = regions
+        self.margin = margin
 
-            for seg in segments_gen:
+    def run(self):
+        try:
+            import numpy as np
+
+            self.progress.emit(5)
+            model = self._load_model() if self.regions else None
+            self.progress.emit(15)
+
+            started = time.perf_counter()
+            total_duration = len(self.segment) / 1000.0
+            processed = 0.0
+            detected_lang = self.language or ""
+            new_segments = []
+
+            for i, (r_start, r_end) in enumerate(self.regions):
                 if self._cancelled:
+                    self._flush()
                     return
-                seg_dict = {
-                    "start": round(seg.start, 2),
-                    "end": round(seg.end, 2),
-                    "text": seg.text.strip(),
-                }
-                segments_list.append(seg_dict)
-                full_text_parts.append(seg.text.strip())
-                self.segment_ready.emit(seg_dict)
-
-                if total_duration > 0:
-                    pct = min(95, int(15 + (seg.end / total_duration) * 80))
-                    self.progress.emit(pct)
-
-            full_text = " ".join(full_text_parts)
-            self.progress.emit(100)
+                clip_start = max(0.0, r_start - self.margin)
+                clip_end = min(total_duration, r_end + self.margin)
+                clip = self.segment[int(clip_start * 1000):int(clip_end * 1000)]
+                clip = clip.set_frame_rate(16000).set_channels(1).set_sample_width(2)
+                audio = np.array(clip.get_array_of_samples(), dtype=np.float32) / 32768.0
+
+                metrics.count("whisper.regions")
+                segments_gen, info = self._transcribe(model, audio)
+                detected_lang = detected_lang or info.language
+                for seg in segments_gen:
+                    if self._cancelled:
+                        self._flush()
+                        return
+                    start = clip_start + seg.start
+                    end = clip_start + seg.end
+                    # Context margin is only decoded, not kept.
+                    if not r_start <= (start + end) / 2 <= r_end:
+                        continue
+                    seg_dict = {
+                        "start": round(start, 2),
+                        "end": round(end, 2),
+                        "text": seg.text.strip(),
+                    }
+                    new_segments.append(seg_dict)
+                    self._queue(seg_dict)
+
+                processed += clip_end - clip_start
+                self._queue(pct=min(95, int(15 + (i + 1) / len(self.regions) * 80)))
+
+            segments_list = sorted(
+                self.kept_segments + new_segments, key=lambda s: s["start"]
+            )
+            elapsed = time.perf_counter() - started
+            self._queue(pct=100)
+            self._flush()
             self.finished_transcription.emit({
-                "full_text": full_text,
+                "full_text": " ".join(s["text"] for s in segments_list),
                 "language": detected_lang,
                 "model": self.model_name,
                 "segments": segments_list,
+                "elapsed": round(elapsed, 2),
+                "rtf": round(elapsed / processed, 3) if processed > 0 else 0.0,
+                "signals_saved": self.signals_saved(),
             })
 
         except ImportError:
@@ -81,28 +224,3 @@ class TranscriptionWorker(QThread):
             )
         except Exception as e:
             self.error.emit(str(e))
-
-
-def export_transcription_txt(transcription: dict, output_path: str):
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(transcription.get("full_text", ""))
-
-
-def export_transcription_srt(transcription: dict, output_path: str):
-    def _fmt_time(seconds: float) -> str:
-        h = int(seconds // 3600)
-        m = int((seconds % 3600) // 60)
-        s = int(seconds % 60)
-        ms = int((seconds % 1) * 1000)
-        return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
-
-    with open(output_path, "w", encoding="utf-8") as f:
-        for i, seg in enumerate(transcription.get("segments", []), 1):
-            f.write(f"{i}\n")
-            f.write(f"{_fmt_time(seg['start'])} --> {_fmt_time(seg['end'])}\n")
-            f.write(f"{seg['text']}\n\n")
-
-
-def export_transcription_json(transcription: dict, output_path: str):
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(transcription, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,469 @@
+"""Keep the library in step with watched folders.
+
+On Linux the folders are watched with inotify (through ctypes, no extra
+dependency). The thread sleeps in ``select`` until the kernel reports
+something, so an idle watch costs no CPU. A file is reported once it has
+been closed after writing and nothing has touched it for ``debounce``
+seconds: a recorder writing one long file produces no events until it
+finishes. Renames inside the watched tree keep their rows (and tags,
+transcripts) by relinking them. Elsewhere, or with ``force_poll``, the
+folders are walked every ``interval`` seconds and a file is reported when
+its size and mtime stay the same across two walks.
+
+Watchers only collect changes. ``apply_changes`` turns a batch into
+imports, metadata refreshes, relinks and removals.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+
+from src.utils import metrics
+from src.utils.file_utils import is_audio_file, scan_folder
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_EXCL_UNLINK)
+_EVENT = struct.Struct("iIII")
+
+# A rename out of the tree has no matching IN_MOVED_TO; it is treated as a
+# deletion once this many seconds pass without one.
+MOVE_PAIR_TIMEOUT = 0.5
+
+
+def inotify_available() -> bool:
+    return sys.platform.startswith("linux") and _libc() is not None
+
+
+_libc_handle = None
+
+
+def _libc():
+    global _libc_handle
+    if _libc_handle is None:
+        try:
+            lib = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            lib.inotify_init1  # noqa: B018 - raises AttributeError without inotify
+        except (OSError, AttributeError):
+            return None
+        lib.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        lib.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        _libc_handle = lib
+    return _libc_handle
+
+
+def empty_changes() -> dict:
+    return {"changed": [], "deleted": [], "moved": [], "rescan": []}
+
+
+class _Pending:
+    """Raw events per path, coalesced until the path has been quiet for
+    ``debounce`` seconds.
+
+    Kinds are ``changed`` (written or appeared), ``deleted`` and ``moved``
+    (entry keyed by the new path, with its source).
+    """
+
+    def __init__(self, debounce: float):
+        self.debounce = debounce
+        self.paths: dict[str, list] = {}  # path -> [kind, last_event, source]
+
+    def touch(self, path: str, kind: str, now: float):
+        prev = self.paths.get(path)
+        if prev is None:
+            self.paths[path] = [kind, now, None]
+        elif kind == "deleted":
+            if prev[0] == "moved":
+                self.paths[prev[2]] = ["deleted", now, None]
+            self.paths[path] = ["deleted", now, None]
+        else:
+            # changed after moved stays a move: applying it also refreshes
+            # the file when its size or mtime differ.
+            prev[0] = "moved" if prev[0] == "moved" else "changed"
+            prev[1] = now
+
+    def move(self, old: str, new: str, now: float):
+        prev = self.paths.pop(old, None)
+        if prev is not None and prev[0] == "changed":
+            self.paths[new] = ["changed", now, None]
+            return
+        source = prev[2] if prev is not None and prev[0] == "moved" else old
+        self.paths[new] = ["moved", now, source]
+
+    def next_due(self) -> float | None:
+        if not self.paths:
+            return None
+        return min(e[1] for e in self.paths.values()) + self.debounce
+
+    def pop_ready(self, now: float) -> dict | None:
+        changes = empty_changes()
+        for path, (kind, last, source) in list(self.paths.items()):
+            if now - last < self.debounce:
+                continue
+            if kind != "deleted":
+                # Written by something that does not close the file, or the
+                # clock of a network share: wait until the mtime settles too.
+                try:
+                    mtime = os.stat(path).st_mtime
+                except OSError:
+                    mtime = 0
+                if 0 <= time.time() - mtime < self.debounce:
+                    self.paths[path][1] = now
+                    continue
+            del self.paths[path]
+            if kind == "moved":
+                changes["moved"].append([source, path])
+            else:
+                changes[kind].append(path)
+        if not any(changes.values()):
+            return None
+        return changes
+
+
+class _BaseWatcher:
+    def __init__(self, roots: list[str], on_changes, debounce: float = 2.0):
+        self.roots = [os.path.realpath(r) for r in roots if os.path.isdir(r)]
+        self.on_changes = on_changes
+        self.debounce = max(0.0, debounce)
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="folder-watcher",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = 5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _emit(self, changes: dict):
+        metrics.count("watcher.batches")
+        try:
+            self.on_changes(changes)
+        except Exception:
+            metrics.count("watcher.callback_errors")
+
+    def _run(self):
+        raise NotImplementedError
+
+
+class InotifyWatcher(_BaseWatcher):
+    def __init__(self, roots: list[str], on_changes, debounce: float = 2.0):
+        super().__init__(roots, on_changes, debounce)
+        self._wds: dict[int, str] = {}
+        self._wake_r, self._wake_w = os.pipe()
+
+    def stop(self, timeout: float | None = 5):
+        self._stop.set()
+        try:
+            os.write(self._wake_w, b"x")
+        except OSError:  # the thread has already exited
+            pass
+        super().stop(timeout)
+
+    def _add_tree(self, fd: int, root: str, pending: _Pending | None = None,
+                  now: float = 0.0):
+        """Watch ``root`` and every directory below it. With ``pending``
+        the files already there are reported: they may have been written
+        before the watch existed."""
+        lib = _libc()
+        for dirpath, dirnames, filenames in os.walk(root):
+            wd = lib.inotify_add_watch(fd, os.fsencode(dirpath), WATCH_MASK)
+            if wd < 0:
+                metrics.count("watcher.watch_errors")
+                dirnames.clear()
+                continue
+            self._wds[wd] = dirpath
+            if pending is not None:
+                for name in filenames:
+                    if is_audio_file(name):
+                        pending.touch(os.path.join(dirpath, name), "changed", now)
+
+    def _forget_tree(self, fd: int, root: str):
+        prefix = os.path.join(root, "")
+        for wd, path in list(self._wds.items()):
+            if path == root or path.startswith(prefix):
+                _libc().inotify_rm_watch(fd, wd)
+                self._wds.pop(wd, None)
+
+    def _rename_tree(self, old: str, new: str):
+        prefix = os.path.join(old, "")
+        for wd, path in self._wds.items():
+            if path == old:
+                self._wds[wd] = new
+            elif path.startswith(prefix):
+                self._wds[wd] = os.path.join(new, path[len(prefix):])
+
+    def _run(self):
+        fd = _libc().inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        pending = _Pending(self.debounce)
+        moves: dict[int, tuple[str, bool, float]] = {}  # cookie -> (path, is_dir, t)
+        try:
+            for root in self.roots:
+                self._add_tree(fd, root)
+            while not self._stop.is_set():
+                now = time.monotonic()
+                deadlines = [d for d in (pending.next_due(),) if d is not None]
+                deadlines += [t + MOVE_PAIR_TIMEOUT for _, _, t in moves.values()]
+                timeout = max(0.0, min(deadlines) - now) if deadlines else None
+                ready, _, _ = select.select([fd, self._wake_r], [], [], timeout)
+                now = time.monotonic()
+                if fd in ready:
+                    self._read(fd, pending, moves, now)
+                for cookie, (path, is_dir, t) in list(moves.items()):
+                    if now - t >= MOVE_PAIR_TIMEOUT:  # moved out of the tree
+                        del moves[cookie]
+                        if is_dir:
+                            self._forget_tree(fd, path)
+                        if is_dir or is_audio_file(path):
+                            pending.touch(path, "deleted", now)
+                changes = pending.pop_ready(now)
+                if changes:
+                    self._emit(changes)
+        finally:
+            os.close(fd)
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+
+    def _read(self, fd: int, pending: _Pending, moves: dict, now: float):
+        try:
+            data = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped: the roots are compared with the library.
+                metrics.count("watcher.overflows")
+                self._emit({**empty_changes(), "rescan": list(self.roots)})
+                continue
+            if mask & IN_IGNORED:
+                self._wds.pop(wd, None)
+                continue
+            parent = self._wds.get(wd)
+            if parent is None or mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                continue
+            path = os.path.join(parent, name)
+            is_dir = bool(mask & IN_ISDIR)
+            if not (is_dir or is_audio_file(name) or mask & (IN_MOVED_FROM | IN_MOVED_TO)):
+                continue
+            self._handle(fd, mask, cookie, path, is_dir, pending, moves, now)
+
+    def _handle(self, fd, mask, cookie, path, is_dir, pending, moves, now):
+        if mask & IN_CREATE:
+            if is_dir:
+                self._add_tree(fd, path, pending, now)
+            # New files are reported on IN_CLOSE_WRITE, once written.
+        elif mask & IN_CLOSE_WRITE:
+            pending.touch(path, "changed", now)
+        elif mask & IN_DELETE:
+            pending.touch(path, "deleted", now)
+        elif mask & IN_MOVED_FROM:
+            moves[cookie] = (path, is_dir, now)
+        elif mask & IN_MOVED_TO:
+            source = moves.pop(cookie, None)
+            if source is None:  # moved in from outside the tree
+                if is_dir:
+                    self._add_tree(fd, path, pending, now)
+                elif is_audio_file(path):
+                    pending.touch(path, "changed", now)
+            elif is_dir:
+                self._rename_tree(source[0], path)
+                pending.move(source[0], path, now)
+            elif not is_audio_file(source[0]):
+                # Recorders often write "take.tmp" and rename it when done.
+                if is_audio_file(path):
+                    pending.touch(path, "changed", now)
+            elif not is_audio_file(path):
+                pending.touch(source[0], "deleted", now)
+            else:
+                pending.move(source[0], path, now)
+
+
+class PollingWatcher(_BaseWatcher):
+    """Fallback for systems without inotify (and for network shares, where
+    the kernel does not see changes made by other machines)."""
+
+    def __init__(self, roots: list[str], on_changes, debounce: float = 2.0,
+                 interval: float = 30.0):
+        super().__init__(roots, on_changes, debounce)
+        self.interval = max(1.0, interval)
+
+    def _snapshot(self) -> dict[str, tuple[int, int]]:
+        found = {}
+        stack = list(self.roots)
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif entry.is_file() and is_audio_file(entry.name):
+                                st = entry.stat()
+                                found[entry.path] = (st.st_size, st.st_mtime_ns)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        return found
+
+    def _run(self):
+        reported = self._snapshot()
+        previous = reported
+        while not self._stop.wait(self.interval):
+            current = self._snapshot()
+            changes = empty_changes()
+            gone = {p: st for p, st in reported.items() if p not in current}
+            by_stat: dict[tuple, list[str]] = {}
+            for path, stat in gone.items():
+                by_stat.setdefault(stat, []).append(path)
+            for path, stat in current.items():
+                if reported.get(path) == stat:
+                    continue
+                # A rename keeps size and mtime, so it is matched at once;
+                # anything else is reported when two walks agree.
+                sources = by_stat.get(stat) if path not in reported else None
+                if sources and len(sources) == 1:
+                    changes["moved"].append([sources.pop(), path])
+                elif previous.get(path) == stat:
+                    changes["changed"].append(path)
+                else:
+                    continue
+                reported[path] = stat
+            for sources in by_stat.values():
+                changes["deleted"].extend(sources)
+            for path in gone:
+                del reported[path]
+            previous = current
+            if any(changes.values()):
+                self._emit(changes)
+
+
+def create_watcher(roots: list[str], on_changes, debounce: float = 2.0,
+                   poll_interval: float = 30.0, force_poll: bool = False):
+    """An InotifyWatcher where the kernel supports it, else a PollingWatcher."""
+    if not force_poll and inotify_available():
+        return InotifyWatcher(roots, on_changes, debounce)
+    return PollingWatcher(roots, on_changes, debounce, poll_interval)
+
+
+@metrics.timed("watcher.apply")
+def apply_changes(db, changes: dict, workers: int = 8,
+                  skip_duplicates: bool = False) -> dict:
+    """Bring the library in line with a batch from a watcher. Returns the
+    imported ids, the updated, relinked and removed counts, the ids a rescan
+    could not find (``missing``) and the roots it skipped (``unavailable``)."""
+    from src.core.audio_manager import AudioManager
+
+    manager = AudioManager(db)
+    stats = {"imported": [], "updated": 0, "relinked": 0, "removed": 0,
+             "missing": [], "unavailable": []}
+    changed = list(changes.get("changed", []))
+
+    # Deletions first, moves in the order they happened; a file deleted
+    # after its folder moved is caught by the existence check below.
+    gone = []
+    for path in changes.get("deleted", []):
+        if os.path.exists(path):  # recreated since
+            changed.append(path)
+            continue
+        gone.extend(r["id"] for r in db.audio_under(path))
+        row = db.audio_by_paths([path]).get(path)
+        if row:
+            gone.append(row["id"])
+
+    relinked: dict[int, str] = {}
+    for old, new in changes.get("moved", []):
+        moved = [(r["id"], new + r["file_path"][len(old):])
+                 for r in db.audio_under(old)]
+        row = db.audio_by_paths([old]).get(old)
+        if row:
+            moved.append((row["id"], new))
+        # A rename onto an existing library file replaces it.
+        replaced = db.audio_by_paths([new]).get(new)
+        if replaced and all(aid != replaced["id"] for aid, _ in moved):
+            stats["removed"] += db.delete_audio_many([replaced["id"]])
+        if moved:
+            db.relink_audio(moved)
+            relinked.update(moved)
+        changed.append(new)  # imported if unknown, refreshed if rewritten
+    stats["relinked"] = len(relinked)
+    gone.extend(aid for aid, path in relinked.items() if not os.path.exists(path))
+    if gone:
+        stats["removed"] += db.delete_audio_many(gone)
+
+    files = []
+    for path in changed:
+        files.extend(scan_folder(path) if os.path.isdir(path) else [path])
+    for root in changes.get("rescan", []):
+        # A rescan never deletes: files it does not find are only reported
+        # as missing, like core.integrity.check_library does. An unmounted
+        # or emptied root is skipped altogether.
+        root = os.path.realpath(root)
+        if not os.path.isdir(root):
+            stats["unavailable"].append(root)
+            continue
+        on_disk = set(scan_folder(root))
+        rows = db.audio_under(root)
+        if not on_disk and rows:
+            stats["unavailable"].append(root)
+            continue
+        stats["missing"].extend(r["id"] for r in rows
+                                if r["file_path"] not in on_disk
+                                and not os.path.exists(r["file_path"]))
+        files.extend(on_disk)
+
+    files = [os.path.realpath(p) for p in dict.fromkeys(files) if os.path.isfile(p)]
+    known = db.audio_by_paths(files)
+    new_files = [p for p in files if p not in known]
+    rewritten = []
+    for path in files:
+        row = known.get(path)
+        if row is None:
+            continue
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        mtime = datetime.fromtimestamp(st.st_mtime).isoformat()
+        if st.st_size != row["file_size"] or mtime != row["date_modified"]:
+            rewritten.append(row["id"])
+    if rewritten:
+        stats["updated"] = len(manager.refresh_files(rewritten, workers))
+    if new_files:
+        stats["imported"] = manager.import_files(
+            new_files, workers=workers, skip_duplicates=skip_duplicates)
+    return stats
@@ -0,0 +1,107 @@
+import sys
+from array import array
+from bisect import bisect_right
+
+
+def _pack(arr: array) -> bytes:
+    if sys.byteorder != "little":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _unpack(typecode: str, blob: bytes) -> array:
+    arr = array(typecode)
+    arr.frombytes(blob or b"")
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+class WordIndex:
+    """Word-level timestamps of one transcription as packed parallel arrays.
+
+    ``text`` is the concatenation of all words; word ``i`` spans
+    ``text[offsets[i]:offsets[i + 1]]`` and ``starts[i]``..``ends[i]`` seconds.
+    """
+
+    def __init__(self, starts: array, ends: array, offsets: array, text: str):
+        self.starts = starts
+        self.ends = ends
+        self.offsets = offsets
+        self.text = text
+        self._lower: str | None = None
+
+    @classmethod
+    def from_words(cls, words: list[dict]) -> "WordIndex":
+        starts, ends, offsets = array("f"), array("f"), array("I", [0])
+        parts = []
+        pos = 0
+        for w in words:
+            starts.append(w["start"])
+            ends.append(w["end"])
+            parts.append(w["word"])
+            pos += len(w["word"])
+            offsets.append(pos)
+        return cls(starts, ends, offsets, "".join(parts))
+
+    @classmethod
+    def from_row(cls, row: dict) -> "WordIndex":
+        return cls(
+            _unpack("f", row["starts"]),
+            _unpack("f", row["ends"]),
+            _unpack("I", row["offsets"]),
+            row["text"],
+        )
+
+    def to_row(self) -> dict:
+        return {
+            "word_count": len(self),
+            "starts": _pack(self.starts),
+            "ends": _pack(self.ends),
+            "offsets": _pack(self.offsets),
+            "text": self.text,
+        }
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def word(self, index: int) -> dict:
+        return {
+            "index": index,
+            "start": round(self.starts[index], 2),
+            "end": round(self.ends[index], 2),
+            "word": self.text[self.offsets[index]:self.offsets[index + 1]].strip(),
+        }
+
+    def index_at_time(self, seconds: float) -> int:
+        """Index of the word being spoken at ``seconds`` (the last word that
+        started at or before it), or -1 before the first word."""
+        return bisect_right(self.starts, seconds) - 1
+
+    def index_at_offset(self, char_offset: int) -> int:
+        """Index of the word containing ``char_offset`` in ``text``."""
+        if not len(self) or char_offset < 0 or char_offset >= len(self.text):
+            return -1
+        return bisect_right(self.offsets, char_offset) - 1
+
+    def word_at_time(self, seconds: float) -> dict | None:
+        i = self.index_at_time(seconds)
+        return self.word(i) if i >= 0 else None
+
+    def find(self, query: str, limit: int = 0) -> list[dict]:
+        """Case-insensitive matches of ``query``, each resolved to the word
+        where the match starts."""
+        if not query or not len(self):
+            return []
+        if self._lower is None:
+            self._lower = self.text.lower()
+        needle = query.lower()
+        hits = []
+        pos = self._lower.find(needle)
+        while pos >= 0:
+            hits.append(self.word(self.index_at_offset(pos)))
+            if limit and len(hits) >= limit:
+                break
+            pos = self._lower.find(needle, pos + 1)
+        return hits
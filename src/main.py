@@ -29,6 +29,22 @@ def _show_error(title: str, message: str):
 def main():
     _setup_path()
 
+    from src.utils import startup_profile
+    if "--profile-startup" in sys.argv:
+        sys.argv.remove("--profile-startup")
+        startup_profile.enable()
+    if "--metrics" in sys.argv:
+        sys.argv.remove("--metrics")
+        from src.utils import metrics
+        metrics.enable()
+    # --stall-watchdog[=MS]: also print every stall report on stderr.
+    stall_echo_ms = 0
+    for arg in list(sys.argv):
+        if arg == "--stall-watchdog" or arg.startswith("--stall-watchdog="):
+            sys.argv.remove(arg)
+            _, _, ms = arg.partition("=")
+            stall_echo_ms = int(ms) if ms.isdigit() else 100
+
     try:
         from PyQt6.QtWidgets import QApplication
     except ImportError:
@@ -39,14 +55,28 @@ def main():
         )
         sys.exit(1)
 
+    startup_profile.mark("qt_imported")
     app = QApplication(sys.argv)
     app.setApplicationName("Audio Library Manager")
     app.setOrganizationName("AudioLibManager")
+    startup_profile.mark("qapplication")
+    startup_profile.install_first_paint_hook(app)
 
     try:
         from src.ui.main_window import MainWindow
+        startup_profile.mark("ui_imported")
         window = MainWindow()
+        startup_profile.mark("window_built")
         window.show()
+        startup_profile.mark("window_shown")
+        threshold = stall_echo_ms or window.config.get("stall_watchdog_ms", 250)
+        if threshold:
+            from src.utils.stall_watchdog import StallWatchdog
+            watchdog = StallWatchdog(
+                threshold, echo=bool(stall_echo_ms),
+                max_log_bytes=window.config.get("stall_log_max_kb", 1024) * 1024,
+            )
+            watchdog.start(app)
     except Exception as e:
         _show_error(
             "Errore all'avvio",
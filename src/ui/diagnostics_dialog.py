@@ -0,0 +1,128 @@
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QCheckBox,
+    QTableWidget, QTableWidgetItem, QHeaderView, QFileDialog, QSpinBox,
+)
+from PyQt6.QtCore import Qt, QTimer
+
+from src.utils import metrics
+from src.utils.config import Config
+
+
+class DiagnosticsDialog(QDialog):
+    COLUMNS = ["Metrica", "Chiamate", "Media ms", "p50 ms", "p95 ms", "Max ms"]
+
+    def __init__(self, config: Config, parent=None):
+        super().__init__(parent)
+        self.config = config
+        self.setWindowTitle("Diagnostica prestazioni")
+        self.setMinimumSize(720, 460)
+        self._build_ui()
+        self._refresh()
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(1000)
+        self._timer.timeout.connect(self._refresh)
+        self._timer.start()
+
+    def _build_ui(self):
+        layout = QVBoxLayout(self)
+
+        top = QHBoxLayout()
+        self.chk_enabled = QCheckBox("Raccogli metriche")
+        self.chk_enabled.setChecked(metrics.is_enabled())
+        self.chk_enabled.toggled.connect(self._on_toggled)
+        top.addWidget(self.chk_enabled)
+        top.addStretch()
+        top.addWidget(QLabel("Endpoint porta:"))
+        self.port_spin = QSpinBox()
+        self.port_spin.setRange(0, 65535)
+        self.port_spin.setSpecialValueText("off")
+        self.port_spin.setValue(self.config.get("metrics_port", 0))
+        top.addWidget(self.port_spin)
+        btn_serve = QPushButton("Avvia")
+        btn_serve.clicked.connect(self._on_serve)
+        top.addWidget(btn_serve)
+        layout.addLayout(top)
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(
+            0, QHeaderView.ResizeMode.Stretch
+        )
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        layout.addWidget(self.table)
+
+        self.lbl_counters = QLabel("")
+        self.lbl_counters.setWordWrap(True)
+        self.lbl_counters.setStyleSheet("color: #a6adc8; font-size: 11px;")
+        layout.addWidget(self.lbl_counters)
+
+        btn_row = QHBoxLayout()
+        btn_reset = QPushButton("Azzera")
+        btn_reset.clicked.connect(self._on_reset)
+        btn_row.addWidget(btn_reset)
+        btn_row.addStretch()
+        btn_json = QPushButton("Esporta JSON...")
+        btn_json.clicked.connect(lambda: self._on_export("json"))
+        btn_row.addWidget(btn_json)
+        btn_prom = QPushButton("Esporta Prometheus...")
+        btn_prom.clicked.connect(lambda: self._on_export("prometheus"))
+        btn_row.addWidget(btn_prom)
+        btn_close = QPushButton("Chiudi")
+        btn_close.clicked.connect(self.accept)
+        btn_row.addWidget(btn_close)
+        layout.addLayout(btn_row)
+
+    def _refresh(self):
+        snap = metrics.snapshot()
+        hists = sorted(snap["histograms"].items(),
+                       key=lambda kv: kv[1]["sum_ms"], reverse=True)
+        self.table.setRowCount(len(hists))
+        for row, (name, h) in enumerate(hists):
+            values = [name, h["count"], h["mean_ms"], h["p50_ms"],
+                      h["p95_ms"], h["max_ms"]]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(
+                    value if isinstance(value, str) else f"{value:g}"
+                )
+                if col:
+                    item.setTextAlignment(
+                        Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+                    )
+                self.table.setItem(row, col, item)
+        extra = {**snap["counters"], **snap["gauges"]}
+        self.lbl_counters.setText(
+            "  ".join(f"{k}: {v:g}" for k, v in sorted(extra.items()))
+            or ("Nessun dato" if snap["enabled"] else "Raccolta disattivata")
+        )
+
+    def _on_toggled(self, checked: bool):
+        metrics.enable(checked)
+        self.config.set("metrics_enabled", checked)
+        self._refresh()
+
+    def _on_reset(self):
+        metrics.reset()
+        self._refresh()
+
+    def _on_serve(self):
+        port = self.port_spin.value()
+        if not port:
+            metrics.stop_server()
+            self.config.set("metrics_port", 0)
+            return
+        try:
+            bound = metrics.serve(port)
+        except OSError as e:
+            self.lbl_counters.setText(f"Endpoint non avviato: {e}")
+            return
+        self.config.set("metrics_port", bound)
+        self.lbl_counters.setText(f"Endpoint: http://127.0.0.1:{bound}/metrics")
+
+    def _on_export(self, fmt: str):
+        filt = "JSON (*.json)" if fmt == "json" else "Prometheus (*.prom *.txt)"
+        path, _ = QFileDialog.getSaveFileName(self, "Esporta metriche", "", filt)
+        if path:
+            metrics.write(path, fmt)
@@ -0,0 +1,169 @@
+import time
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt, QThread, pyqtSignal
+
+from src.utils.file_utils import format_duration, format_file_size
+
+
+class LibraryTableModel(QAbstractTableModel):
+    """Library rows fetched from the database a page at a time.
+
+    Pages are loaded only as the view scrolls to them and stay loaded until
+    the next reload, so memory grows with how far the user has scrolled; only
+    the raw rows are kept, cell text is formatted in ``data()`` when the view
+    paints it. Pages continue from a keyset cursor on the last loaded row, so
+    deep scrolling stays cheap. Sorting is delegated to
+    ``Database.search_audio``; ``sort()`` only records the key and emits
+    ``sort_changed`` so the owner can reload off the GUI thread.
+    """
+
+    sort_changed = pyqtSignal()
+
+    HEADERS = ["Titolo", "Durata", "Formato", "Dim.", "Trascritto"]
+    SORT_KEYS = ["title", "duration", "format", "file_size", "is_transcribed"]
+    PAGE_SIZE = 500
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self._filters: dict = {}
+        self._sort = "date_added"
+        self._descending = True
+        self._rows: list[dict] = []
+        self._total = 0
+
+    @property
+    def total(self) -> int:
+        return self._total
+
+    def set_filters(self, **filters):
+        self._filters = filters
+        self.reload()
+
+    @property
+    def sort_key(self) -> tuple[str, bool]:
+        return self._sort, self._descending
+
+    def reload(self):
+        self.beginResetModel()
+        self._rows = []
+        self._total = self.db.count_audio(**self._filters)
+        self.endResetModel()
+        if self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex())
+
+    def apply_results(self, filters: dict, total: int, first_page: list[dict]):
+        """Install a search computed off the GUI thread (LibrarySearchWorker)."""
+        self.beginResetModel()
+        self._filters = filters
+        self._total = total
+        self._rows = list(first_page)
+        self.endResetModel()
+
+    def audio_id(self, row: int) -> int | None:
+        if 0 <= row < len(self._rows):
+            return self._rows[row]["id"]
+        return None
+
+    # --- QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def canFetchMore(self, parent) -> bool:
+        return not parent.isValid() and len(self._rows) < self._total
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+        after = self.db.page_cursor(self._rows[-1], self._sort) if self._rows else None
+        page = self.db.search_audio(
+            **self._filters, sort=self._sort, descending=self._descending,
+            limit=self.PAGE_SIZE, after=after,
+        )
+        if not page:
+            self._total = len(self._rows)
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self._rows.extend(page)
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        row = self._rows[index.row()]
+        col = index.column()
+        if col == 0:
+            return row["title"]
+        if col == 1:
+            return format_duration(row["duration"])
+        if col == 2:
+            return row["format"].upper()
+        if col == 3:
+            return format_file_size(row["file_size"])
+        if col == 4:
+            return "\u2713" if row.get("is_transcribed") else ""
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if (orientation == Qt.Orientation.Horizontal
+                and role == Qt.ItemDataRole.DisplayRole
+                and 0 <= section < len(self.HEADERS)):
+            return self.HEADERS[section]
+        return None
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        if 0 <= column < len(self.SORT_KEYS):
+            self._sort = self.SORT_KEYS[column]
+            self._descending = order == Qt.SortOrder.DescendingOrder
+        else:
+            self._sort = "date_added"
+            self._descending = True
+        self.sort_changed.emit()
+
+
+class LibrarySearchWorker(QThread):
+    """Runs count + first page of a library search off the GUI thread.
+
+    ``cancel()`` interrupts the SQLite statement in flight; a cancelled
+    worker emits neither ``results_ready`` nor ``error``.
+    """
+
+    results_ready = pyqtSignal(int, dict, int, list, float)  # generation, filters, total, rows, ms
+    error = pyqtSignal(int, str)  # generation, message
+
+    def __init__(self, db, generation: int, filters: dict, sort: str,
+                 descending: bool, page_size: int = LibraryTableModel.PAGE_SIZE):
+        super().__init__()
+        self.db = db
+        self.generation = generation
+        self.filters = filters
+        self.sort = sort
+        self.descending = descending
+        self.page_size = page_size
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        started = time.perf_counter()
+        is_cancelled = lambda: self._cancelled  # noqa: E731
+        try:
+            total = self.db.count_audio(**self.filters, cancelled=is_cancelled)
+            rows = self.db.search_audio(
+                **self.filters, sort=self.sort, descending=self.descending,
+                limit=self.page_size, cancelled=is_cancelled,
+            )
+        except Exception as e:
+            # Never let it escape run(): PyQt aborts the app on it.
+            if not self._cancelled:
+                self.error.emit(self.generation, str(e))
+            return
+        if not self._cancelled:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.results_ready.emit(self.generation, self.filters, total, rows, elapsed)
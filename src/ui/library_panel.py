@@ -1,28 +1,40 @@
 import os
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton,
-    QTableWidget, QTableWidgetItem, QHeaderView, QComboBox,
+    QTableView, QHeaderView, QComboBox,
     QAbstractItemView, QMenu, QFileDialog, QMessageBox, QLabel,
-    QInputDialog,
+    QInputDialog, QToolButton,
 )
-from PyQt6.QtCore import pyqtSignal, Qt, QMimeData
+from PyQt6.QtCore import pyqtSignal, Qt, QMimeData, QTimer
 from PyQt6.QtGui import QAction, QDragEnterEvent, QDropEvent
 
-from src.utils.file_utils import format_duration, format_file_size
+from src.ui.library_model import LibraryTableModel, LibrarySearchWorker
+from src.utils import startup_profile
 
 
 class LibraryPanel(QWidget):
     audio_selected = pyqtSignal(int)  # audio_id
     audio_double_clicked = pyqtSignal(int)  # audio_id
+    import_requested = pyqtSignal(list)  # file and folder paths
 
-    def __init__(self, db, audio_manager, parent=None):
+    SEARCH_DEBOUNCE_MS = 200
+
+    def __init__(self, db, audio_manager, writer=None, parent=None):
         super().__init__(parent)
         self.db = db
         self.audio_manager = audio_manager
-        self._audio_ids: list[int] = []
+        self.writer = writer
+        self._tag_filter: set[str] = set()
+        self.model = LibraryTableModel(db, self)
+        self._search_generation = 0
+        self._search_worker: LibrarySearchWorker | None = None
+        self._search_workers: set[LibrarySearchWorker] = set()
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(self.SEARCH_DEBOUNCE_MS)
+        self._search_timer.timeout.connect(self._on_search)
         self.setAcceptDrops(True)
         self._build_ui()
-        self.refresh()
 
     def _build_ui(self):
         layout = QVBoxLayout(self)
@@ -37,7 +49,7 @@ class LibraryPanel(QWidget):
         search_row = QHBoxLayout()
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Cerca titolo, nome file, trascrizione...")
-        self.search_input.textChanged.connect(self._on_search)
+        self.search_input.textChanged.connect(self._search_timer.start)
         search_row.addWidget(self.search_input)
 
         self.format_filter = QComboBox()
@@ -45,6 +57,14 @@ class LibraryPanel(QWidget):
         self.format_filter.setFixedWidth(80)
         self.format_filter.currentTextChanged.connect(self._on_search)
         search_row.addWidget(self.format_filter)
+
+        self.tag_button = QToolButton()
+        self.tag_button.setText("Tag")
+        self.tag_button.setPopupMode(QToolButton.ToolButtonPopupMode.InstantPopup)
+        self.tag_menu = QMenu(self.tag_button)
+        self.tag_menu.aboutToShow.connect(self._build_tag_menu)
+        self.tag_button.setMenu(self.tag_menu)
+        search_row.addWidget(self.tag_button)
         layout.addLayout(search_row)
 
         # Action buttons
@@ -65,18 +85,21 @@ class LibraryPanel(QWidget):
         layout.addLayout(btn_row)
 
         # Table
-        self.table = QTableWidget()
-        self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels(
-            ["Titolo", "Durata", "Formato", "Dim.", "Trascritto"]
-        )
-        self.table.horizontalHeader().setSectionResizeMode(
-            0, QHeaderView.ResizeMode.Stretch
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        # ResizeToContents would measure every row; keep widths fixed.
+        for col, width in ((1, 70), (2, 70), (3, 80), (4, 80)):
+            header.setSectionResizeMode(col, QHeaderView.ResizeMode.Interactive)
+            self.table.setColumnWidth(col, width)
+        header.setSortIndicator(-1, Qt.SortOrder.DescendingOrder)
+        self.table.setSortingEnabled(True)
+        self.model.sort_changed.connect(self._on_search)
+        self.table.verticalHeader().setSectionResizeMode(
+            QHeaderView.ResizeMode.Fixed
         )
-        for col in range(1, 5):
-            self.table.horizontalHeader().setSectionResizeMode(
-                col, QHeaderView.ResizeMode.ResizeToContents
-            )
+        self.table.verticalHeader().setDefaultSectionSize(28)
         self.table.setSelectionBehavior(
             QAbstractItemView.SelectionBehavior.SelectRows
         )
@@ -87,7 +110,7 @@ class LibraryPanel(QWidget):
         self.table.verticalHeader().setVisible(False)
         self.table.setShowGrid(False)
         self.table.setAlternatingRowColors(True)
-        self.table.itemSelectionChanged.connect(self._on_selection)
+        self.table.selectionModel().selectionChanged.connect(self._on_selection)
         self.table.doubleClicked.connect(self._on_double_click)
         self.table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.table.customContextMenuRequested.connect(self._show_context_menu)
@@ -97,46 +120,124 @@ class LibraryPanel(QWidget):
         self._on_search()
 
     def _on_search(self):
+        self._search_timer.stop()
         query = self.search_input.text().strip()
         fmt = self.format_filter.currentText()
         if fmt == "Tutti":
             fmt = ""
-        results = self.db.search_audio(query=query, fmt=fmt)
-        self._populate_table(results)
-
-    def _populate_table(self, rows: list[dict]):
-        self.table.setRowCount(len(rows))
-        self._audio_ids = []
-        for i, row in enumerate(rows):
-            self._audio_ids.append(row["id"])
-            self.table.setItem(i, 0, QTableWidgetItem(row["title"]))
-            self.table.setItem(
-                i, 1, QTableWidgetItem(format_duration(row["duration"]))
+
+        if self._search_worker is not None:
+            self._search_worker.cancel()
+        self._search_generation += 1
+        sort, descending = self.model.sort_key
+        filters = {"query": query, "fmt": fmt, "tags": sorted(self._tag_filter) or None}
+        worker = LibrarySearchWorker(
+            self.db, self._search_generation, filters, sort, descending,
+        )
+        worker.results_ready.connect(self._on_search_results)
+        worker.error.connect(self._on_search_error)
+        worker.finished.connect(lambda w=worker: self._search_workers.discard(w))
+        self._search_workers.add(worker)
+        self._search_worker = worker
+        worker.start()
+
+    # --- Tag filter ---
+
+    def _build_tag_menu(self):
+        """Rebuilt on every open from the maintained per-tag counts."""
+        self.tag_menu.clear()
+        tags = self.db.get_tag_counts()
+        if not tags:
+            self.tag_menu.addAction("Nessun tag").setEnabled(False)
+            return
+        for tag in tags:
+            act = self.tag_menu.addAction(f"{tag['name']} ({tag['audio_count']})")
+            act.setCheckable(True)
+            act.setChecked(tag["name"] in self._tag_filter)
+            act.toggled.connect(
+                lambda checked, name=tag["name"]: self._toggle_tag_filter(name, checked)
             )
-            self.table.setItem(i, 2, QTableWidgetItem(row["format"].upper()))
-            self.table.setItem(
-                i, 3, QTableWidgetItem(format_file_size(row["file_size"]))
+        self.tag_menu.addSeparator()
+        act_clear = self.tag_menu.addAction("Azzera filtro tag")
+        act_clear.setEnabled(bool(self._tag_filter))
+        act_clear.triggered.connect(self._clear_tag_filter)
+        act_rename = self.tag_menu.addAction("Rinomina tag...")
+        act_rename.triggered.connect(lambda: self._rename_tag(tags))
+
+    def _toggle_tag_filter(self, name: str, checked: bool):
+        if checked:
+            self._tag_filter.add(name)
+        else:
+            self._tag_filter.discard(name)
+        self._update_tag_button()
+        self._on_search()
+
+    def _clear_tag_filter(self):
+        self._tag_filter.clear()
+        self._update_tag_button()
+        self._on_search()
+
+    def _update_tag_button(self):
+        n = len(self._tag_filter)
+        self.tag_button.setText(f"Tag ({n})" if n else "Tag")
+
+    def _rename_tag(self, tags: list[dict]):
+        names = [t["name"] for t in tags]
+        old, ok = QInputDialog.getItem(self, "Rinomina tag", "Tag:", names, 0, False)
+        if not ok:
+            return
+        new, ok = QInputDialog.getText(self, "Rinomina tag", "Nuovo nome:", text=old)
+        new = new.strip()
+        if not ok or not new or new == old:
+            return
+        tag_id = next(t["id"] for t in tags if t["name"] == old)
+        self._write(self.db.rename_tag, tag_id, new)
+        if old in self._tag_filter:
+            self._tag_filter.discard(old)
+            self._tag_filter.add(new)
+        self._on_search()
+
+    def _write(self, fn, *args):
+        return self.writer.call(fn, *args) if self.writer is not None else fn(*args)
+
+    def _on_search_results(self, generation: int, filters: dict, total: int,
+                           rows: list, elapsed_ms: float):
+        if generation != self._search_generation:
+            return  # superseded by a newer query
+        self._search_worker = None
+        self.model.apply_results(filters, total, rows)
+        self.count_label.setText(f"{total} file")
+        startup_profile.mark("first_library_page")
+        status_bar = getattr(self.window(), "statusBar", None)
+        if status_bar is not None:
+            status_bar().showMessage(
+                f"Ricerca: {total} risultati in {elapsed_ms:.0f} ms", 3000
             )
-            icon = "\u2713" if row.get("is_transcribed") else ""
-            self.table.setItem(i, 4, QTableWidgetItem(icon))
 
-        self.count_label.setText(f"{len(rows)} file")
+    def _on_search_error(self, generation: int, message: str):
+        if generation != self._search_generation:
+            return
+        self._search_worker = None
+        status_bar = getattr(self.window(), "statusBar", None)
+        if status_bar is not None:
+            status_bar().showMessage(f"Errore nella ricerca: {message}", 5000)
 
-    def _on_selection(self):
+    def _on_selection(self, *_):
         rows = self.table.selectionModel().selectedRows()
         if rows:
-            idx = rows[0].row()
-            if 0 <= idx < len(self._audio_ids):
-                self.audio_selected.emit(self._audio_ids[idx])
+            aid = self.model.audio_id(rows[0].row())
+            if aid is not None:
+                self.audio_selected.emit(aid)
 
     def _on_double_click(self, index):
-        row = index.row()
-        if 0 <= row < len(self._audio_ids):
-            self.audio_double_clicked.emit(self._audio_ids[row])
+        aid = self.model.audio_id(index.row())
+        if aid is not None:
+            self.audio_double_clicked.emit(aid)
 
     def get_selected_ids(self) -> list[int]:
         rows = self.table.selectionModel().selectedRows()
-        return [self._audio_ids[r.row()] for r in rows if r.row() < len(self._audio_ids)]
+        ids = (self.model.audio_id(r.row()) for r in rows)
+        return [aid for aid in ids if aid is not None]
 
     def _show_context_menu(self, pos):
         menu = QMenu(self)
@@ -156,6 +257,15 @@ class LibraryPanel(QWidget):
         act_tag = menu.addAction("Aggiungi tag")
         act_tag.triggered.connect(lambda: self._add_tag_to_selected(ids))
 
+        tags = self.db.get_tag_counts()
+        if tags:
+            untag_menu = menu.addMenu("Rimuovi tag")
+            for tag in tags:
+                act = untag_menu.addAction(tag["name"])
+                act.triggered.connect(
+                    lambda _, t=tag: self._remove_tag_from_selected(ids, t)
+                )
+
         menu.addSeparator()
 
         act_remove = menu.addAction("Rimuovi dalla libreria")
@@ -166,6 +276,7 @@ class LibraryPanel(QWidget):
 
         menu.exec(self.table.viewport().mapToGlobal(pos))
 
+    # Imports run as scheduler jobs (see MainWindow._queue_import).
     def _import_files(self):
         files, _ = QFileDialog.getOpenFileNames(
             self,
@@ -174,23 +285,12 @@ class LibraryPanel(QWidget):
             "Audio (*.mp3 *.wav *.m4a *.flac *.ogg);;Tutti (*)",
         )
         if files:
-            count = 0
-            for f in files:
-                if self.audio_manager.import_file(f):
-                    count += 1
-            self.refresh()
-            self.window().statusBar().showMessage(
-                f"Importati {count} file", 3000
-            )
+            self.import_requested.emit(files)
 
     def _import_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Seleziona cartella")
         if folder:
-            ids = self.audio_manager.import_folder(folder)
-            self.refresh()
-            self.window().statusBar().showMessage(
-                f"Importati {len(ids)} file da {folder}", 3000
-            )
+            self.import_requested.emit([folder])
 
     def _rename_selected(self, ids: list[int]):
         for aid in ids:
@@ -201,18 +301,30 @@ class LibraryPanel(QWidget):
                 self, "Rinomina", "Nuovo nome:", text=info["title"]
             )
             if ok and new_name.strip():
-                self.audio_manager.rename_file(aid, new_name.strip())
+                try:
+                    self.audio_manager.rename_file(aid, new_name.strip())
+                except (LookupError, OSError) as e:
+                    QMessageBox.warning(self, "Rinomina", f"Impossibile rinominare:\n{e}")
         self.refresh()
 
     def _add_tag_to_selected(self, ids: list[int]):
         tag_name, ok = QInputDialog.getText(self, "Aggiungi tag", "Nome tag:")
         if ok and tag_name.strip():
             tag_id = self.db.add_tag(tag_name.strip())
-            for aid in ids:
-                self.db.tag_audio(aid, tag_id)
+            added = self._write(self.db.tag_audio_many, ids, tag_id)
             self.window().statusBar().showMessage(
-                f"Tag '{tag_name.strip()}' aggiunto", 3000
+                f"Tag '{tag_name.strip()}' aggiunto a {added} file", 3000
             )
+            if self._tag_filter:
+                self._on_search()
+
+    def _remove_tag_from_selected(self, ids: list[int], tag: dict):
+        removed = self._write(self.db.untag_audio_many, ids, tag["id"])
+        self.window().statusBar().showMessage(
+            f"Tag '{tag['name']}' rimosso da {removed} file", 3000
+        )
+        if tag["name"] in self._tag_filter:
+            self._on_search()
 
     def _remove_selected(self, ids: list[int]):
         reply = QMessageBox.question(
@@ -222,7 +334,10 @@ class LibraryPanel(QWidget):
         )
         if reply == QMessageBox.StandardButton.Yes:
             for aid in ids:
-                self.audio_manager.remove_from_library(aid, delete_file=False)
+                try:
+                    self.audio_manager.remove_from_library(aid, delete_file=False)
+                except LookupError:
+                    pass  # already gone
             self.refresh()
 
     def _delete_selected(self, ids: list[int]):
@@ -235,9 +350,20 @@ class LibraryPanel(QWidget):
             QMessageBox.StandardButton.No,
         )
         if reply == QMessageBox.StandardButton.Yes:
+            errors = []
             for aid in ids:
-                self.audio_manager.remove_from_library(aid, delete_file=True)
+                try:
+                    self.audio_manager.remove_from_library(aid, delete_file=True)
+                except LookupError:
+                    pass
+                except OSError as e:
+                    errors.append(str(e))
             self.refresh()
+            if errors:
+                QMessageBox.warning(
+                    self, "Elimina",
+                    f"{len(errors)} file non eliminati:\n" + "\n".join(errors[:10]),
+                )
 
     # Drag & drop
     def dragEnterEvent(self, event: QDragEnterEvent):
@@ -245,18 +371,7 @@ class LibraryPanel(QWidget):
             event.acceptProposedAction()
 
     def dropEvent(self, event: QDropEvent):
-        urls = event.mimeData().urls()
-        count = 0
-        for url in urls:
-            path = url.toLocalFile()
-            if os.path.isfile(path):
-                if self.audio_manager.import_file(path):
-                    count += 1
-            elif os.path.isdir(path):
-                ids = self.audio_manager.import_folder(path)
-                count += len(ids)
-        if count:
-            self.refresh()
-            self.window().statusBar().showMessage(
-                f"Importati {count} file", 3000
-            )
+        paths = [url.toLocalFile() for url in event.mimeData().urls()]
+        paths = [p for p in paths if os.path.isfile(p) or os.path.isdir(p)]
+        if paths:
+            self.import_requested.emit(paths)
@@ -1,27 +1,56 @@
 import os
+import time
 from PyQt6.QtWidgets import (
     QMainWindow, QSplitter, QToolBar, QStatusBar, QFileDialog,
     QMessageBox, QApplication,
 )
-from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtCore import Qt, QSize, QTimer, QObject, pyqtSignal
 from PyQt6.QtGui import QAction, QKeySequence
 
 from src.core.database import Database
 from src.core.audio_manager import AudioManager
+from src.core.db_writer import DatabaseWriter
+from src.core.jobs import JobScheduler, default_handlers
+from src.utils import metrics
 from src.utils.config import Config
+from src.utils.file_utils import get_audio_metadata, partial_hash
 from src.ui.library_panel import LibraryPanel
 from src.ui.player_panel import PlayerPanel
 from src.ui.transcription_panel import TranscriptionPanel
-from src.ui.rename_dialog import BatchRenameDialog
 from src.ui.styles import DARK_THEME, LIGHT_THEME
 
 
+class _JobEvents(QObject):
+    # Emitted from scheduler threads, delivered queued on the GUI thread.
+    job_changed = pyqtSignal(dict)
+
+
 class MainWindow(QMainWindow):
+    _audio_saved = pyqtSignal(int, str)  # audio_id, error; emitted from the writer thread
+
     def __init__(self):
         super().__init__()
         self.config = Config()
+        if self.config.get("metrics_enabled"):
+            metrics.enable()
+        if self.config.get("metrics_port"):
+            try:
+                metrics.serve(self.config.get("metrics_port"))
+            except OSError:
+                pass
         self.db = Database()
         self.audio_manager = AudioManager(self.db)
+        self.writer = DatabaseWriter(self.db)
+        self._audio_saved.connect(self._on_audio_saved)
+        self.jobs = JobScheduler(
+            self.db,
+            default_handlers(self.db, self.writer),
+            max_workers=self.config.get("job_workers", 4),
+            limits=self.config.get("job_limits", {}),
+        )
+        self._job_events = _JobEvents(self)
+        self._job_events.job_changed.connect(self._on_job_changed)
+        self.jobs.add_listener(self._job_events.job_changed.emit)
 
         self.setWindowTitle("Audio Library Manager")
         self.setMinimumSize(1100, 700)
@@ -41,6 +70,19 @@ class MainWindow(QMainWindow):
             except Exception:
                 pass
 
+        # Load the first library page once the window is on screen.
+        QTimer.singleShot(0, self.library_panel.refresh)
+        # Resume jobs left unfinished by the previous session.
+        QTimer.singleShot(0, self.jobs.start)
+        self.http_api = None
+        if self.config.get("http_api_port"):
+            QTimer.singleShot(0, self._start_http_api)
+        if self.config.get("backup_dir"):
+            QTimer.singleShot(0, self._schedule_backup)
+        self.watcher = None
+        if self.config.get("watch_folders"):
+            QTimer.singleShot(0, lambda: self._start_watcher(sync=True))
+
     def _apply_theme(self):
         theme = self.config.get("theme", "dark")
         if theme == "dark":
@@ -64,6 +106,9 @@ class MainWindow(QMainWindow):
         act_folder.triggered.connect(self._import_folder)
         file_menu.addAction(act_folder)
 
+        self.watch_menu = file_menu.addMenu("Cartelle monitorate")
+        self.watch_menu.aboutToShow.connect(self._build_watch_menu)
+
         file_menu.addSeparator()
 
         act_export_lib = QAction("Esporta libreria (JSON)...", self)
@@ -74,6 +119,14 @@ class MainWindow(QMainWindow):
         act_export_csv.triggered.connect(self._export_library_csv)
         file_menu.addAction(act_export_csv)
 
+        act_export_full = QAction("Esporta libreria completa (NDJSON)...", self)
+        act_export_full.triggered.connect(self._export_library_ndjson)
+        file_menu.addAction(act_export_full)
+
+        act_import_lib = QAction("Importa libreria...", self)
+        act_import_lib.triggered.connect(self._import_library)
+        file_menu.addAction(act_import_lib)
+
         file_menu.addSeparator()
 
         act_backup = QAction("Backup database...", self)
@@ -95,6 +148,18 @@ class MainWindow(QMainWindow):
         act_rename_batch.triggered.connect(self._batch_rename)
         edit_menu.addAction(act_rename_batch)
 
+        act_duplicates = QAction("Trova duplicati...", self)
+        act_duplicates.triggered.connect(self._find_duplicates)
+        edit_menu.addAction(act_duplicates)
+
+        act_similar = QAction("Trova registrazioni simili...", self)
+        act_similar.triggered.connect(self._find_similar)
+        edit_menu.addAction(act_similar)
+
+        act_check = QAction("Verifica libreria...", self)
+        act_check.triggered.connect(self._check_library)
+        edit_menu.addAction(act_check)
+
         # View menu
         view_menu = menu_bar.addMenu("&Vista")
 
@@ -111,6 +176,10 @@ class MainWindow(QMainWindow):
         # Help menu
         help_menu = menu_bar.addMenu("&?")
 
+        act_diag = QAction("Diagnostica...", self)
+        act_diag.triggered.connect(self._show_diagnostics)
+        help_menu.addAction(act_diag)
+
         act_about = QAction("Info", self)
         act_about.triggered.connect(self._show_about)
         help_menu.addAction(act_about)
@@ -131,9 +200,9 @@ class MainWindow(QMainWindow):
     def _build_ui(self):
         splitter = QSplitter(Qt.Orientation.Horizontal)
 
-        self.library_panel = LibraryPanel(self.db, self.audio_manager)
+        self.library_panel = LibraryPanel(self.db, self.audio_manager, self.writer)
         self.player_panel = PlayerPanel()
-        self.transcription_panel = TranscriptionPanel(self.db)
+        self.transcription_panel = TranscriptionPanel(self.db, self.config, self.writer)
 
         splitter.addWidget(self.library_panel)
         splitter.addWidget(self.player_panel)
@@ -148,13 +217,21 @@ class MainWindow(QMainWindow):
         # Connections
         self.library_panel.audio_selected.connect(self._on_audio_selected)
         self.library_panel.audio_double_clicked.connect(self._on_audio_play)
+        self.library_panel.import_requested.connect(self._queue_import)
         self.player_panel.edit_applied.connect(self.library_panel.refresh)
+        self.player_panel.file_overwritten.connect(self._on_file_overwritten)
+        self.player_panel.waveform_ready.connect(
+            lambda audio_id, peaks: self.writer.submit(self.db.save_waveform, audio_id, peaks)
+        )
+        self.transcription_panel.seek_requested.connect(self._on_seek_requested)
+        self.player_panel.position_changed.connect(
+            self.transcription_panel.set_playback_position
+        )
 
     def _build_statusbar(self):
         status = QStatusBar()
         self.setStatusBar(status)
-        total = len(self.db.get_all_audio())
-        status.showMessage(f"Pronto | {total} file in libreria")
+        status.showMessage("Pronto")
 
     def _setup_shortcuts(self):
         pass  # shortcuts handled by menu actions
@@ -175,6 +252,43 @@ class MainWindow(QMainWindow):
         self.player_panel.load_file(info["file_path"], audio_id)
         self.transcription_panel.show_audio(audio_id)
 
+    def _on_seek_requested(self, audio_id: int, seconds: float):
+        if self.player_panel.current_audio_id != audio_id:
+            self._on_audio_play(audio_id)
+            if self.player_panel.current_audio_id != audio_id:
+                return
+        self.player_panel.seek_to(seconds)
+
+    def _on_file_overwritten(self, audio_id: int):
+        info = self.db.get_audio(audio_id)
+        if info and os.path.isfile(info["file_path"]):
+            meta = get_audio_metadata(info["file_path"])
+            future = self.writer.submit(
+                self.db.update_audio,
+                audio_id,
+                duration=meta["duration"],
+                file_size=meta["file_size"],
+                date_modified=meta["date_modified"],
+                partial_hash=partial_hash(info["file_path"], meta["file_size"]),
+                content_hash=None,
+            )
+            # The library refreshes once the new metadata is committed.
+            future.add_done_callback(
+                lambda f: self._audio_saved.emit(audio_id, str(f.exception() or ""))
+            )
+        else:
+            self.library_panel.refresh()
+        self.transcription_panel.update_after_edits(
+            audio_id, self.player_panel.editor
+        )
+
+    def _on_audio_saved(self, audio_id: int, error: str):
+        if error:
+            self.statusBar().showMessage(
+                f"Metadati non aggiornati (#{audio_id}): {error}", 5000
+            )
+        self.library_panel.refresh()
+
     def _import_files(self):
         files, _ = QFileDialog.getOpenFileNames(
             self,
@@ -183,12 +297,7 @@ class MainWindow(QMainWindow):
             "Audio (*.mp3 *.wav *.m4a *.flac *.ogg);;Tutti (*)",
         )
         if files:
-            count = 0
-            for f in files:
-                if self.audio_manager.import_file(f):
-                    count += 1
-            self.library_panel.refresh()
-            self.statusBar().showMessage(f"Importati {count} file", 3000)
+            self._queue_import(files)
 
     def _import_folder(self):
         folder = QFileDialog.getExistingDirectory(
@@ -196,11 +305,153 @@ class MainWindow(QMainWindow):
             self.config.get("default_import_path", ""),
         )
         if folder:
-            ids = self.audio_manager.import_folder(folder)
-            self.library_panel.refresh()
+            self._queue_import([folder])
+
+    def _queue_import(self, paths: list[str]):
+        """Import files and folders off the GUI thread; the library is
+        refreshed when the job finishes."""
+        self.jobs.submit("import", {
+            "paths": paths,
+            "skip_duplicates": self.config.get("skip_duplicates", False),
+        })
+        label = paths[0] if len(paths) == 1 else f"{len(paths)} elementi"
+        self.statusBar().showMessage(f"Importazione in coda: {label}", 3000)
+
+    def _start_http_api(self):
+        from src.core.http_api import serve_in_background
+        try:
+            self.http_api = serve_in_background(
+                self.db.db_path, port=self.config.get("http_api_port")
+            )
+        except OSError as e:
+            self.statusBar().showMessage(f"API HTTP non avviata: {e}", 5000)
+
+    def _schedule_backup(self):
+        """Daily rotating backup into ``backup_dir``, taken at startup."""
+        from src.core.backup import latest_backup
+        backup_dir = self.config.get("backup_dir")
+        latest = latest_backup(backup_dir)
+        if latest is None or time.time() - os.path.getmtime(latest) > 24 * 3600:
+            self.jobs.submit("backup", {"dir": backup_dir,
+                                        "keep": self.config.get("backup_keep", 7)})
+
+    def _build_watch_menu(self):
+        self.watch_menu.clear()
+        act_add = self.watch_menu.addAction("Aggiungi cartella...")
+        act_add.triggered.connect(self._add_watch_folder)
+        folders = self.config.get("watch_folders", [])
+        if folders:
+            self.watch_menu.addSeparator()
+        for folder in folders:
+            act = self.watch_menu.addAction(folder)
+            act.setCheckable(True)
+            act.setChecked(True)
+            act.setToolTip("Deseleziona per smettere di monitorare")
+            act.triggered.connect(lambda _, f=folder: self._remove_watch_folder(f))
+
+    def _add_watch_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Cartella da monitorare")
+        if not folder:
+            return
+        folders = self.config.get("watch_folders", [])
+        if folder not in folders:
+            self.config.set("watch_folders", folders + [folder])
+        self._start_watcher(sync=True)
+        self.statusBar().showMessage(f"Cartella monitorata: {folder}", 3000)
+
+    def _remove_watch_folder(self, folder: str):
+        folders = [f for f in self.config.get("watch_folders", []) if f != folder]
+        self.config.set("watch_folders", folders)
+        self._start_watcher()
+
+    def _start_watcher(self, sync: bool = False):
+        """(Re)start watching ``watch_folders``. With ``sync`` files changed
+        while nobody was watching are caught up with first."""
+        from src.core.watcher import create_watcher, empty_changes
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+        folders = [f for f in self.config.get("watch_folders", []) if os.path.isdir(f)]
+        if not folders:
+            return
+        if sync:
+            self._on_folders_changed({**empty_changes(), "rescan": folders})
+        self.watcher = create_watcher(
+            folders, self._on_folders_changed,
+            debounce=self.config.get("watch_debounce_ms", 2000) / 1000.0,
+            poll_interval=self.config.get("watch_poll_interval_s", 30),
+            force_poll=self.config.get("watch_force_poll", False),
+        )
+        self.watcher.start()
+
+    def _on_folders_changed(self, changes: dict):
+        # Called on the watcher thread; the scheduler applies the batch.
+        self.jobs.submit("sync_folders", {
+            **changes, "skip_duplicates": self.config.get("skip_duplicates", False),
+        })
+
+    def _on_job_changed(self, job: dict):
+        state, job_type = job["state"], job["job_type"]
+        if state == "running":
+            self.statusBar().showMessage(f"In esecuzione: {job_type} (#{job['id']})")
+        elif state == "failed":
             self.statusBar().showMessage(
-                f"Importati {len(ids)} file da {folder}", 3000
+                f"Operazione fallita ({job_type}): {job['error']}", 5000
             )
+        elif state == "done":
+            result = job["result"] or {}
+            if job_type == "sync_folders":
+                self._show_folder_sync(result)
+            elif job_type == "import":
+                self.library_panel.refresh()
+                msg = f"Importati {result.get('imported', 0)} file"
+                if result.get("skipped"):
+                    msg += f", {len(result['skipped'])} duplicati saltati"
+                self.statusBar().showMessage(msg, 3000)
+            elif job_type == "hash_library":
+                self._show_duplicates()
+            elif job_type == "fingerprint":
+                self._show_similar(result.get("groups", []))
+            elif job_type == "integrity":
+                self._show_integrity(result)
+            elif job_type == "transcribe":
+                self.library_panel.refresh()
+                self.statusBar().showMessage("Trascrizione completata", 3000)
+            elif job_type == "import_library":
+                self.library_panel.refresh()
+                self.statusBar().showMessage(
+                    f"Libreria importata: {result.get('audio', 0)} file, "
+                    f"{result.get('skipped', 0)} gia' presenti", 3000
+                )
+            elif job_type == "backup":
+                self.statusBar().showMessage(
+                    f"Backup creato: {result.get('path', '')}", 3000
+                )
+            elif job_type == "export_library":
+                self.statusBar().showMessage(
+                    f"Libreria esportata: {result.get('path', '')}", 3000
+                )
+            else:
+                self.statusBar().showMessage("Operazione completata", 3000)
+
+    def _show_folder_sync(self, result: dict):
+        parts = [
+            f"{n} {label}" for n, label in (
+                (len(result.get("imported", [])), "importati"),
+                (result.get("updated", 0), "aggiornati"),
+                (result.get("relinked", 0), "spostati"),
+                (result.get("removed", 0), "rimossi"),
+            ) if n
+        ]
+        if result.get("missing"):
+            parts.append(f"{len(result['missing'])} mancanti (Verifica libreria)")
+        if result.get("unavailable"):
+            parts.append("non raggiungibili: " + ", ".join(result["unavailable"]))
+        if parts:
+            self.library_panel.refresh()
+            self.statusBar().showMessage("Cartelle monitorate: " + ", ".join(parts), 5000)
+        else:
+            self.statusBar().clearMessage()
 
     def _batch_rename(self):
         ids = self.library_panel.get_selected_ids()
@@ -210,11 +461,92 @@ class MainWindow(QMainWindow):
                 "Seleziona uno o piu' file dalla libreria."
             )
             return
+        from src.ui.rename_dialog import BatchRenameDialog
         dlg = BatchRenameDialog(self.db, self.audio_manager, ids, self)
         if dlg.exec():
             self.library_panel.refresh()
             self.statusBar().showMessage("File rinominati", 3000)
 
+    def _find_duplicates(self):
+        # Fingerprint files imported before hashing first; the report is
+        # shown when the job finishes.
+        self.jobs.submit("hash_library", {})
+        self.statusBar().showMessage("Ricerca duplicati in corso...")
+
+    def _show_duplicates(self):
+        from src.utils.file_utils import format_file_size
+        groups = self.db.get_duplicate_groups()
+        if not groups:
+            QMessageBox.information(self, "Duplicati", "Nessun file duplicato.")
+            return
+        wasted = sum(g["file_size"] * (len(g["files"]) - 1) for g in groups)
+        details = "\n\n".join(
+            "\n".join(f["file_path"] for f in g["files"]) for g in groups
+        )
+        box = QMessageBox(self)
+        box.setWindowTitle("Duplicati")
+        box.setText(
+            f"{len(groups)} gruppi di file identici, "
+            f"{format_file_size(wasted)} occupati da copie."
+        )
+        box.setDetailedText(details)
+        box.exec()
+
+    def _find_similar(self):
+        self.jobs.submit("fingerprint", {})
+        self.statusBar().showMessage("Analisi acustica della libreria in corso...")
+
+    def _show_similar(self, groups: list[list[int]]):
+        if not groups:
+            QMessageBox.information(self, "Registrazioni simili",
+                                    "Nessuna registrazione simile trovata.")
+            return
+        details = "\n\n".join(
+            "\n".join(r["file_path"] for r in (self.db.get_audio(i) for i in g) if r)
+            for g in groups
+        )
+        box = QMessageBox(self)
+        box.setWindowTitle("Registrazioni simili")
+        box.setText(f"{len(groups)} gruppi di registrazioni che suonano uguali "
+                    "(copie ricodificate o tagliate).")
+        box.setDetailedText(details)
+        box.exec()
+
+    def _check_library(self):
+        # Moved files are searched for under the chosen folder; cancelling
+        # the dialog only checks the library.
+        folder = QFileDialog.getExistingDirectory(
+            self, "Cartella in cui cercare i file spostati (opzionale)"
+        )
+        self.jobs.submit("integrity", {"roots": [folder] if folder else []})
+        self.statusBar().showMessage("Verifica della libreria in corso...")
+
+    def _show_integrity(self, result: dict):
+        self.library_panel.refresh()
+        relinked = result.get("relinked", [])
+        lost = result.get("unmatched", result.get("missing", []))
+        ambiguous = result.get("ambiguous", [])
+        text = (
+            f"{result.get('checked', 0)} file verificati: "
+            f"{len(result.get('missing', []))} mancanti, "
+            f"{len(result.get('changed', []))} modificati, "
+            f"{len(result.get('unreadable', []))} illeggibili."
+        )
+        if relinked or ambiguous:
+            text += (f"\n{len(relinked)} file spostati ricollegati, "
+                     f"{len(ambiguous)} con piu' candidati.")
+        box = QMessageBox(self)
+        box.setWindowTitle("Verifica libreria")
+        box.setText(text)
+        details = [f"{r['old_path']} -> {r['new_path']}" for r in relinked]
+        details += [f"Non trovato: {r['file_path']}"
+                    for r in (self.db.get_audio(i) for i in lost) if r]
+        details += [f"Ambiguo: {a['id']}: " + ", ".join(a["candidates"])
+                    for a in ambiguous]
+        if details:
+            box.setDetailedText("\n".join(details))
+        box.exec()
+
     def _toggle_theme(self):
         current = self.config.get("theme", "dark")
         new_theme = "light" if current == "dark" else "dark"
@@ -226,24 +558,41 @@ class MainWindow(QMainWindow):
             self, "Esporta libreria", "", "JSON (*.json)"
         )
         if path:
-            self.db.export_library_json(path)
-            self.statusBar().showMessage(f"Libreria esportata: {path}", 3000)
+            self.jobs.submit("export_library", {"path": path, "format": "json"})
 
     def _export_library_csv(self):
         path, _ = QFileDialog.getSaveFileName(
             self, "Esporta libreria", "", "CSV (*.csv)"
         )
         if path:
-            self.db.export_library_csv(path)
-            self.statusBar().showMessage(f"Libreria esportata: {path}", 3000)
+            self.jobs.submit("export_library", {"path": path, "format": "csv"})
+
+    def _export_library_ndjson(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Esporta libreria completa", "",
+            "NDJSON compresso (*.ndjson.gz);;NDJSON (*.ndjson)"
+        )
+        if path:
+            self.jobs.submit("export_library", {"path": path, "format": "ndjson"})
+
+    def _import_library(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Importa libreria", "",
+            "Esportazioni libreria (*.ndjson *.ndjson.gz *.jsonl *.csv *.csv.gz)"
+        )
+        if path:
+            self.jobs.submit("import_library", {"path": path})
 
     def _backup_db(self):
         path, _ = QFileDialog.getSaveFileName(
             self, "Backup database", "", "SQLite (*.db *.sqlite)"
         )
         if path:
-            self.db.backup(path)
-            self.statusBar().showMessage(f"Backup creato: {path}", 3000)
+            self.jobs.submit("backup", {"path": path})
+
+    def _show_diagnostics(self):
+        from src.ui.diagnostics_dialog import DiagnosticsDialog
+        DiagnosticsDialog(self.config, self).exec()
 
     def _show_about(self):
         QMessageBox.about(
@@ -258,4 +607,9 @@ class MainWindow(QMainWindow):
     def closeEvent(self, event):
         geom = self.saveGeometry().toHex().data().decode()
         self.config.set("window_geometry", geom)
+        if self.watcher is not None:
+            self.watcher.stop()
+        # Running jobs are resumed on the next start.
+        self.jobs.stop()
+        self.writer.close(timeout=5)
         event.accept()
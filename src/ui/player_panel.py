@@ -6,7 +6,6 @@ from PyQt6.QtWidgets import (
     QComboBox,
 )
 from PyQt6.QtCore import pyqtSignal, Qt, QTimer, QUrl
-from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
 
 from src.core.editor import AudioEditor
 from src.ui.waveform_widget import WaveformWidget
@@ -15,6 +14,9 @@ from src.utils.file_utils import format_duration
 
 class PlayerPanel(QWidget):
     edit_applied = pyqtSignal()
+    file_overwritten = pyqtSignal(int)  # audio_id
+    position_changed = pyqtSignal(int, float)  # audio_id, seconds
+    waveform_ready = pyqtSignal(int, list)  # audio_id, peaks of the file on disk
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -22,19 +24,16 @@ class PlayerPanel(QWidget):
         self._current_file: str = ""
         self._current_audio_id: int = 0
         self._duration_ms: int = 0
+        self._pending_seek_ms: int = -1
 
-        self._player = QMediaPlayer()
-        self._audio_output = QAudioOutput()
-        self._player.setAudioOutput(self._audio_output)
-        self._audio_output.setVolume(0.7)
+        # QtMultimedia is loaded with the first file (see _ensure_player).
+        self._player = None
+        self._audio_output = None
 
         self._timer = QTimer()
         self._timer.setInterval(50)
         self._timer.timeout.connect(self._update_position)
 
-        self._player.durationChanged.connect(self._on_duration)
-        self._player.mediaStatusChanged.connect(self._on_status)
-
         self._build_ui()
 
     def _build_ui(self):
@@ -102,7 +101,7 @@ class PlayerPanel(QWidget):
         self.vol_slider.setValue(70)
         self.vol_slider.setFixedWidth(100)
         self.vol_slider.valueChanged.connect(
-            lambda v: self._audio_output.setVolume(v / 100)
+            lambda v: self._audio_output and self._audio_output.setVolume(v / 100)
         )
         ctrl_row.addWidget(self.vol_slider)
 
@@ -164,22 +163,46 @@ class PlayerPanel(QWidget):
         layout.addWidget(edit_group)
         layout.addStretch()
 
+    def _ensure_player(self):
+        if self._player is not None:
+            return
+        from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
+        self._player = QMediaPlayer()
+        self._audio_output = QAudioOutput()
+        self._player.setAudioOutput(self._audio_output)
+        self._audio_output.setVolume(self.vol_slider.value() / 100)
+        self._player.durationChanged.connect(self._on_duration)
+        self._player.mediaStatusChanged.connect(self._on_status)
+
+    def _is_playing(self) -> bool:
+        if self._player is None:
+            return False
+        from PyQt6.QtMultimedia import QMediaPlayer
+        return self._player.playbackState() == QMediaPlayer.PlaybackState.PlayingState
+
     def load_file(self, file_path: str, audio_id: int = 0):
         self.stop()
+        self._duration_ms = 0
+        self._pending_seek_ms = -1
         self._current_file = file_path
         self._current_audio_id = audio_id
 
         name = os.path.basename(file_path)
         self.file_label.setText(name)
 
+        self._ensure_player()
         self._player.setSource(QUrl.fromLocalFile(file_path))
         self.editor.load(file_path)
 
         waveform_data = self.editor.get_waveform_data(800)
         self.waveform.set_data(waveform_data)
+        if audio_id and waveform_data:
+            self.waveform_ready.emit(audio_id, waveform_data)
 
     def toggle_play(self):
-        if self._player.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
+        if self._player is None:
+            return
+        if self._is_playing():
             self._player.pause()
             self._timer.stop()
             self.btn_play.setText("\u25B6")
@@ -189,32 +212,54 @@ class PlayerPanel(QWidget):
             self.btn_play.setText("\u23F8")
 
     def stop(self):
-        self._player.stop()
+        if self._player is not None:
+            self._player.stop()
         self._timer.stop()
         self.btn_play.setText("\u25B6")
         self.waveform.set_position(0)
         self.seek_slider.setValue(0)
         self.time_label.setText("0:00")
 
+    @property
+    def current_audio_id(self) -> int:
+        return self._current_audio_id
+
+    def seek_to(self, seconds: float, play: bool = True):
+        if self._player is None:
+            return
+        ms = max(0, int(seconds * 1000))
+        if self._duration_ms > 0:
+            self._player.setPosition(ms)
+            self._update_position()
+        else:
+            self._pending_seek_ms = ms
+        if play and not self._is_playing():
+            self.toggle_play()
+
     def _on_duration(self, ms):
         self._duration_ms = ms
         self.duration_label.setText(format_duration(ms / 1000))
+        if ms > 0 and self._pending_seek_ms >= 0:
+            self._player.setPosition(self._pending_seek_ms)
+            self._pending_seek_ms = -1
 
     def _on_status(self, status):
+        from PyQt6.QtMultimedia import QMediaPlayer
         if status == QMediaPlayer.MediaStatus.EndOfMedia:
             self.stop()
 
     def _update_position(self):
-        if self._duration_ms <= 0:
+        if self._duration_ms <= 0 or self._player is None:
             return
         pos = self._player.position()
         ratio = pos / self._duration_ms
         self.waveform.set_position(ratio)
         self.seek_slider.setValue(int(ratio * 1000))
         self.time_label.setText(format_duration(pos / 1000))
+        self.position_changed.emit(self._current_audio_id, pos / 1000)
 
     def _seek_ratio(self, ratio: float):
-        if self._duration_ms > 0:
+        if self._duration_ms > 0 and self._player is not None:
             self._player.setPosition(int(ratio * self._duration_ms))
 
     def _slider_pressed(self):
@@ -223,7 +268,7 @@ class PlayerPanel(QWidget):
     def _slider_released(self):
         val = self.seek_slider.value() / 1000
         self._seek_ratio(val)
-        if self._player.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
+        if self._is_playing():
             self._timer.start()
 
     def _slider_moved(self, val):
@@ -306,5 +351,8 @@ class PlayerPanel(QWidget):
                 self.window().statusBar().showMessage(
                     f"Esportato: {path}", 3000
                 )
+                if (self._current_audio_id and self._current_file
+                        and os.path.abspath(path) == os.path.abspath(self._current_file)):
+                    self.file_overwritten.emit(self._current_audio_id)
             else:
                 QMessageBox.warning(self, "Errore", "Errore durante l'esportazione")
@@ -1,7 +1,7 @@
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
     QPushButton, QTableWidget, QTableWidgetItem, QHeaderView,
-    QComboBox,
+    QComboBox, QMessageBox,
 )
 from PyQt6.QtCore import Qt
 
@@ -93,6 +93,15 @@ class BatchRenameDialog(QDialog):
             self._previews.append((aid, new_stem))
 
     def _apply(self):
+        errors = []
         for aid, new_stem in self._previews:
-            self.audio_manager.rename_file(aid, new_stem)
+            try:
+                self.audio_manager.rename_file(aid, new_stem)
+            except (LookupError, OSError) as e:
+                errors.append(str(e))
+        if errors:
+            QMessageBox.warning(
+                self, "Rinomina batch",
+                f"{len(errors)} file non rinominati:\n" + "\n".join(errors[:10]),
+            )
         self.accept()
@@ -90,7 +90,7 @@ QComboBox QAbstractItemView {
     border: 1px solid #45475a;
     selection-background-color: #45475a;
 }
-QTableWidget, QTreeWidget, QListWidget {
+QTableView, QTreeWidget, QListView {
     background-color: #1e1e2e;
     color: #cdd6f4;
     border: 1px solid #313244;
@@ -99,10 +99,10 @@ QTableWidget, QTreeWidget, QListWidget {
     selection-background-color: #313244;
     outline: none;
 }
-QTableWidget::item, QTreeWidget::item, QListWidget::item {
+QTableView::item, QTreeWidget::item, QListView::item {
     padding: 4px;
 }
-QTableWidget::item:selected, QTreeWidget::item:selected, QListWidget::item:selected {
+QTableView::item:selected, QTreeWidget::item:selected, QListView::item:selected {
     background-color: #313244;
     color: #cdd6f4;
 }
@@ -314,7 +314,7 @@ QComboBox QAbstractItemView {
     border: 1px solid #ccd0da;
     selection-background-color: #ccd0da;
 }
-QTableWidget, QTreeWidget, QListWidget {
+QTableView, QTreeWidget, QListView {
     background-color: #ffffff;
     color: #4c4f69;
     border: 1px solid #ccd0da;
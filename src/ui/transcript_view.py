@@ -0,0 +1,119 @@
+from array import array
+from bisect import bisect_right
+
+from PyQt6.QtWidgets import QListView, QAbstractItemView
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, Qt, pyqtSignal
+from PyQt6.QtGui import QColor, QFont
+
+
+def _fmt_ts(seconds: float) -> str:
+    m = int(seconds // 60)
+    s = int(seconds % 60)
+    return f"{m:02d}:{s:02d}"
+
+
+class TranscriptModel(QAbstractListModel):
+    """Transcript segments for a QListView; rows are formatted on paint.
+
+    Segment start times are kept in a parallel array so the playing segment
+    is found by binary search, and changing it only repaints two rows.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._segments: list[dict] = []
+        self._starts = array("d")
+        self._current = -1
+        self._bold = QFont()
+        self._bold.setBold(True)
+        self._highlight = QColor(137, 180, 250, 60)
+
+    def set_segments(self, segments: list[dict]):
+        self.beginResetModel()
+        self._segments = list(segments)
+        self._starts = array("d", (s["start"] for s in self._segments))
+        self._current = -1
+        self.endResetModel()
+
+    def append_segments(self, segments: list[dict]):
+        if not segments:
+            return
+        first = len(self._segments)
+        self.beginInsertRows(QModelIndex(), first, first + len(segments) - 1)
+        self._segments.extend(segments)
+        self._starts.extend(s["start"] for s in segments)
+        self.endInsertRows()
+
+    def clear(self):
+        self.set_segments([])
+
+    def segment(self, row: int) -> dict | None:
+        if 0 <= row < len(self._segments):
+            return self._segments[row]
+        return None
+
+    def row_at(self, seconds: float) -> int:
+        """Row of the segment playing at ``seconds``, or -1 before the first."""
+        return bisect_right(self._starts, seconds) - 1
+
+    @property
+    def current_row(self) -> int:
+        return self._current
+
+    def set_current_row(self, row: int) -> bool:
+        if row == self._current:
+            return False
+        old, self._current = self._current, row
+        for r in (old, row):
+            if 0 <= r < len(self._segments):
+                idx = self.index(r)
+                self.dataChanged.emit(idx, idx, [
+                    Qt.ItemDataRole.FontRole, Qt.ItemDataRole.BackgroundRole,
+                ])
+        return True
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._segments)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        seg = self._segments[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"[{_fmt_ts(seg['start'])}] {seg['text']}"
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return seg["text"]
+        if index.row() == self._current:
+            if role == Qt.ItemDataRole.FontRole:
+                return self._bold
+            if role == Qt.ItemDataRole.BackgroundRole:
+                return self._highlight
+        return None
+
+
+class TranscriptView(QListView):
+    segment_clicked = pyqtSignal(float)  # start seconds
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.transcript = TranscriptModel(self)
+        self.setModel(self.transcript)
+        # Uniform rows let the view lay out only what is on screen.
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QListView.LayoutMode.Batched)
+        self.setBatchSize(200)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.setTextElideMode(Qt.TextElideMode.ElideRight)
+        self.follow_playback = True
+        self.clicked.connect(self._on_clicked)
+
+    def set_position(self, seconds: float):
+        row = self.transcript.row_at(seconds)
+        if self.transcript.set_current_row(row) and row >= 0 and self.follow_playback:
+            self.scrollTo(self.transcript.index(row),
+                          QAbstractItemView.ScrollHint.EnsureVisible)
+
+    def _on_clicked(self, index):
+        seg = self.transcript.segment(index.row())
+        if seg is not None:
+            self.segment_clicked.emit(float(seg["start"]))
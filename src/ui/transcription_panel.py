@@ -1,13 +1,19 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
     QComboBox, QTextEdit, QProgressBar, QFileDialog, QGroupBox,
-    QMessageBox, QTabWidget,
+    QMessageBox, QTabWidget, QCheckBox, QLineEdit, QListWidget,
+    QListWidgetItem,
 )
 from PyQt6.QtCore import pyqtSignal, Qt
 
 from src.core.database import Database
+from src.core.db_writer import DatabaseWriter
+from src.utils.config import Config
+from src.ui.transcript_view import TranscriptView
 from src.core.transcription import (
     TranscriptionWorker,
+    RegionTranscriptionWorker,
+    remap_segments,
     export_transcription_txt,
     export_transcription_srt,
     export_transcription_json,
@@ -15,12 +21,27 @@ from src.core.transcription import (
 
 
 class TranscriptionPanel(QWidget):
-    def __init__(self, db: Database, parent=None):
+    seek_requested = pyqtSignal(int, float)  # audio_id, seconds
+    _saved = pyqtSignal(int, str)  # audio_id, error; emitted from the writer thread
+
+    SEARCH_PAGE_SIZE = 50
+
+    def __init__(self, db: Database, config: Config | None = None,
+                 writer: DatabaseWriter | None = None, parent=None):
         super().__init__(parent)
         self.db = db
+        self.config = config
+        self.writer = writer
+        self._saved.connect(self._on_saved)
         self._current_audio_id: int = 0
         self._current_file: str = ""
         self._worker: TranscriptionWorker | None = None
+        self._worker_audio_id: int = 0
+        self._saving = False  # a finished result is waiting for the writer
+        # audio_id -> edit snapshots waiting for the panel to be idle
+        self._pending_edits: dict[int, list[tuple]] = {}
+        self._search_query: str = ""
+        self._search_offset: int = 0
         self._build_ui()
 
     def _build_ui(self):
@@ -53,10 +74,32 @@ class TranscriptionPanel(QWidget):
         details_layout.addStretch()
         self.tabs.addTab(details_widget, "Info")
 
-        # Transcription tab
-        trans_widget = QWidget()
-        trans_layout = QVBoxLayout(trans_widget)
+        # Transcription and search tabs are built the first time they're shown.
+        self._lazy_tabs = {}
+        for name, builder in (("Trascrizione", self._build_transcription_tab),
+                              ("Cerca", self._build_search_tab)):
+            page = QWidget()
+            QVBoxLayout(page)
+            index = self.tabs.addTab(page, name)
+            self._lazy_tabs[index] = builder
+        self._transcription_tab = 1
+        self.tabs.currentChanged.connect(self._ensure_tab)
+
+        layout.addWidget(self.tabs)
+
+    def _ensure_tab(self, index: int):
+        builder = self._lazy_tabs.pop(index, None)
+        if builder is not None:
+            builder(self.tabs.widget(index).layout())
+
+    @property
+    def _transcription_built(self) -> bool:
+        return self._transcription_tab not in self._lazy_tabs
 
+    def _ensure_transcription_tab(self):
+        self._ensure_tab(self._transcription_tab)
+
+    def _build_transcription_tab(self, trans_layout: QVBoxLayout):
         # Model selection
         model_row = QHBoxLayout()
         model_row.addWidget(QLabel("Modello:"))
@@ -72,8 +115,38 @@ class TranscriptionPanel(QWidget):
         ])
         self.lang_combo.setCurrentText("auto")
         model_row.addWidget(self.lang_combo)
+
+        self.batched_check = QCheckBox("Batch")
+        self.batched_check.setToolTip(
+            "Inferenza batch sui segmenti VAD (piu' veloce su CPU)"
+        )
+        model_row.addWidget(self.batched_check)
+
+        self.words_check = QCheckBox("Parole")
+        self.words_check.setToolTip("Salva i tempi di ogni parola")
+        model_row.addWidget(self.words_check)
         trans_layout.addLayout(model_row)
 
+        if self.config is not None:
+            self.model_combo.setCurrentText(self.config.get("whisper_model", "base"))
+            self.lang_combo.setCurrentText(self.config.get("whisper_language", "auto"))
+            self.batched_check.setChecked(bool(self.config.get("whisper_batched", False)))
+            self.model_combo.currentTextChanged.connect(
+                lambda v: self.config.set("whisper_model", v)
+            )
+            self.lang_combo.currentTextChanged.connect(
+                lambda v: self.config.set("whisper_language", v)
+            )
+            self.batched_check.toggled.connect(
+                lambda v: self.config.set("whisper_batched", v)
+            )
+            self.words_check.setChecked(
+                bool(self.config.get("whisper_word_timestamps", False))
+            )
+            self.words_check.toggled.connect(
+                lambda v: self.config.set("whisper_word_timestamps", v)
+            )
+
         # Transcribe button + progress
         action_row = QHBoxLayout()
         self.btn_transcribe = QPushButton("Trascrivi")
@@ -94,13 +167,12 @@ class TranscriptionPanel(QWidget):
         self.status_label = QLabel("")
         trans_layout.addWidget(self.status_label)
 
-        # Transcription text
-        self.trans_text = QTextEdit()
-        self.trans_text.setReadOnly(True)
-        self.trans_text.setPlaceholderText(
-            "La trascrizione apparira' qui..."
+        # Transcription segments (virtualized, follows playback)
+        self.trans_view = TranscriptView()
+        self.trans_view.segment_clicked.connect(
+            lambda sec: self.seek_requested.emit(self._current_audio_id, sec)
         )
-        trans_layout.addWidget(self.trans_text)
+        trans_layout.addWidget(self.trans_view)
 
         # Export buttons
         export_row = QHBoxLayout()
@@ -117,9 +189,32 @@ class TranscriptionPanel(QWidget):
         export_row.addWidget(btn_json)
         trans_layout.addLayout(export_row)
 
-        self.tabs.addTab(trans_widget, "Trascrizione")
+        if self._current_audio_id:
+            self._load_transcription(self._current_audio_id)
 
-        layout.addWidget(self.tabs)
+    def _build_search_tab(self, search_layout: QVBoxLayout):
+        self.segment_search_input = QLineEdit()
+        self.segment_search_input.setPlaceholderText(
+            "Cerca nelle trascrizioni (Invio)..."
+        )
+        self.segment_search_input.returnPressed.connect(self._search_segments)
+        search_layout.addWidget(self.segment_search_input)
+
+        self.segment_results = QListWidget()
+        self.segment_results.setWordWrap(True)
+        self.segment_results.itemActivated.connect(self._on_hit_activated)
+        self.segment_results.itemClicked.connect(self._on_hit_activated)
+        search_layout.addWidget(self.segment_results)
+
+        more_row = QHBoxLayout()
+        self.segment_search_status = QLabel("")
+        more_row.addWidget(self.segment_search_status)
+        more_row.addStretch()
+        self.btn_more_hits = QPushButton("Altri risultati")
+        self.btn_more_hits.setEnabled(False)
+        self.btn_more_hits.clicked.connect(self._load_more_hits)
+        more_row.addWidget(self.btn_more_hits)
+        search_layout.addLayout(more_row)
 
     def show_audio(self, audio_id: int):
         self._current_audio_id = audio_id
@@ -154,7 +249,10 @@ class TranscriptionPanel(QWidget):
         else:
             self.tags_label.setText("Nessun tag")
 
-        # Load transcription if exists
+        if self._transcription_built:
+            self._load_transcription(audio_id)
+
+    def _load_transcription(self, audio_id: int):
         trans = self.db.get_transcription(audio_id)
         if trans:
             self._display_transcription(trans)
@@ -163,19 +261,51 @@ class TranscriptionPanel(QWidget):
                 f"{trans.get('date_transcribed', '')[:10]}"
             )
         else:
-            self.trans_text.clear()
+            self.trans_view.transcript.clear()
             self.status_label.setText("")
 
     def _display_transcription(self, trans: dict):
         segments = trans.get("segments", [])
-        if segments:
-            lines = []
-            for seg in segments:
-                ts = self._fmt_ts(seg["start"])
-                lines.append(f"[{ts}] {seg['text']}")
-            self.trans_text.setText("\n".join(lines))
-        else:
-            self.trans_text.setText(trans.get("full_text", ""))
+        if not segments and trans.get("full_text"):
+            segments = [{"start": 0.0, "end": 0.0, "text": trans["full_text"]}]
+        self.trans_view.transcript.set_segments(segments)
+
+    def set_playback_position(self, audio_id: int, seconds: float):
+        if audio_id == self._current_audio_id and self._transcription_built:
+            self.trans_view.set_position(seconds)
+
+    def _search_segments(self):
+        self._search_query = self.segment_search_input.text().strip()
+        self._search_offset = 0
+        self.segment_results.clear()
+        self._load_more_hits()
+
+    def _load_more_hits(self):
+        if not self._search_query:
+            self.segment_search_status.setText("")
+            self.btn_more_hits.setEnabled(False)
+            return
+        hits = self.db.search_segments(
+            self._search_query, limit=self.SEARCH_PAGE_SIZE,
+            offset=self._search_offset,
+        )
+        for hit in hits:
+            item = QListWidgetItem(
+                f"{hit['title']}  [{self._fmt_ts(hit['start_time'])}]\n"
+                f"{hit['snippet']}"
+            )
+            item.setData(
+                Qt.ItemDataRole.UserRole, (hit["audio_id"], hit["start_time"])
+            )
+            self.segment_results.addItem(item)
+        self._search_offset += len(hits)
+        self.btn_more_hits.setEnabled(len(hits) == self.SEARCH_PAGE_SIZE)
+        self.segment_search_status.setText(f"{self._search_offset} risultati")
+
+    def _on_hit_activated(self, item: QListWidgetItem):
+        data = item.data(Qt.ItemDataRole.UserRole)
+        if data:
+            self.seek_requested.emit(int(data[0]), float(data[1]))
 
     @staticmethod
     def _fmt_ts(seconds: float) -> str:
@@ -183,6 +313,17 @@ class TranscriptionPanel(QWidget):
         s = int(seconds % 60)
         return f"{m:02d}:{s:02d}"
 
+    def _worker_options(self) -> dict:
+        cfg = self.config.get if self.config is not None else (lambda k, d=None: d)
+        return {
+            "batched": self.batched_check.isChecked(),
+            "batch_size": int(cfg("whisper_batch_size", 16)),
+            "cpu_threads": int(cfg("whisper_cpu_threads", 0)),
+            "num_workers": int(cfg("whisper_num_workers", 1)),
+            "word_timestamps": self.words_check.isChecked(),
+            "signal_interval_ms": int(cfg("transcription_signal_interval_ms", 100)),
+        }
+
     def _start_transcription(self):
         if not self._current_file or not self._current_audio_id:
             return
@@ -190,11 +331,78 @@ class TranscriptionPanel(QWidget):
         model = self.model_combo.currentText()
         lang = self.lang_combo.currentText()
 
-        self._worker = TranscriptionWorker(
-            self._current_file, model_name=model, language=lang
+        worker = TranscriptionWorker(
+            self._current_file, model_name=model, language=lang,
+            **self._worker_options(),
+        )
+        self._run_worker(worker, self._current_audio_id)
+        self.trans_view.transcript.clear()
+        self.status_label.setText("Trascrizione in corso...")
+
+    def update_after_edits(self, audio_id: int, editor):
+        """Re-sync a stored transcription after the edited audio replaced the
+        file on disk, transcribing only the regions touched by the edits."""
+        self._ensure_transcription_tab()
+        snapshot = (editor, editor.edit_history, editor.segment)
+        if self._busy:
+            # Applied once the running transcription is saved; the editor
+            # keeps its history until then.
+            queue = self._pending_edits.setdefault(audio_id, [])
+            last = queue[-1] if queue else None
+            if (last is not None and last[0] is editor and last[1] is not None
+                    and snapshot[1] is not None
+                    and snapshot[1][:len(last[1])] == last[1]):
+                queue[-1] = snapshot  # same edits and more: supersedes it
+            else:
+                queue.append(snapshot)
+            return
+        self._remap_transcription(audio_id, *snapshot)
+
+    @property
+    def _busy(self) -> bool:
+        return self._worker is not None or self._saving
+
+    def _apply_pending_edits(self):
+        while self._pending_edits and not self._busy:
+            audio_id = next(iter(self._pending_edits))
+            queue = self._pending_edits[audio_id]
+            snapshot = queue.pop(0)
+            if not queue:
+                del self._pending_edits[audio_id]
+            self._remap_transcription(audio_id, *snapshot)
+
+    def _remap_transcription(self, audio_id: int, editor, history, segment):
+        trans = self.db.get_transcription(audio_id)
+        current = editor.edit_history
+        if history is None:
+            editor.rebase()
+        elif current is not None and current[:len(history)] == history:
+            editor.rebase(len(history))
+        if not trans or segment is None:
+            return
+        if history is None:
+            self.status_label.setText(
+                "Trascrizione non allineata: ripeti la trascrizione"
+            )
+            return
+
+        kept, regions = remap_segments(trans["segments"], history, margin=0.5)
+        worker = RegionTranscriptionWorker(
+            segment, kept, regions, margin=2.0,
+            model_name=trans["model_used"] or self.model_combo.currentText(),
+            language=trans["language"] or self.lang_combo.currentText(),
+            **self._worker_options(),
         )
+        self._run_worker(worker, audio_id)
+        self.status_label.setText(
+            f"Aggiornamento trascrizione ({len(regions)} regioni)..."
+        )
+
+    def _run_worker(self, worker: TranscriptionWorker, audio_id: int):
+        self._worker = worker
+        self._worker_audio_id = audio_id
         self._worker.progress.connect(self._on_progress)
-        self._worker.segment_ready.connect(self._on_segment)
+        self._worker.segments_ready.connect(self._on_segments)
         self._worker.finished_transcription.connect(self._on_finished)
         self._worker.error.connect(self._on_error)
 
@@ -202,8 +410,6 @@ class TranscriptionPanel(QWidget):
         self.btn_cancel.setEnabled(True)
         self.progress.setVisible(True)
         self.progress.setValue(0)
-        self.trans_text.clear()
-        self.status_label.setText("Trascrizione in corso...")
 
         self._worker.start()
 
@@ -212,34 +418,63 @@ class TranscriptionPanel(QWidget):
             self._worker.cancel()
             self._cleanup_worker()
             self.status_label.setText("Trascrizione annullata")
+            self._apply_pending_edits()
 
     def _on_progress(self, pct: int):
         self.progress.setValue(pct)
 
-    def _on_segment(self, seg: dict):
-        ts = self._fmt_ts(seg["start"])
-        self.trans_text.append(f"[{ts}] {seg['text']}")
+    def _on_segments(self, segments: list):
+        if self._worker_audio_id != self._current_audio_id:
+            return
+        self.trans_view.transcript.append_segments(segments)
 
     def _on_finished(self, result: dict):
-        self.db.save_transcription(
-            self._current_audio_id,
+        audio_id = self._worker_audio_id
+        args = (
+            audio_id,
             result["full_text"],
             result["language"],
             result["model"],
             result["segments"],
+            result.get("words"),
         )
         self.status_label.setText(
-            f"Completato | Lingua: {result['language']} | Modello: {result['model']}"
+            f"Completato | Lingua: {result['language']} | Modello: {result['model']} | "
+            f"RTF: {result.get('rtf', 0):.2f}x ({result.get('elapsed', 0):.1f}s)"
         )
+        # Busy until _on_saved: edits remapped before the commit would read
+        # the old segments.
+        self._saving = True
         self._cleanup_worker()
+        if self.writer is None:
+            self.db.save_transcription(*args)
+            self._on_saved(audio_id, "")
+            return
+        # Saved off the GUI thread; the view refreshes once it is committed.
+        future = self.writer.submit(self.db.save_transcription, *args)
+        future.add_done_callback(
+            lambda f: self._saved.emit(audio_id, str(f.exception() or ""))
+        )
+
+    def _on_saved(self, audio_id: int, error: str):
+        self._saving = False
+        self.btn_transcribe.setEnabled(self._worker is None)
+        if error:
+            QMessageBox.warning(self, "Errore salvataggio", error)
+        elif audio_id == self._current_audio_id:
+            trans = self.db.get_transcription(self._current_audio_id)
+            if trans:
+                self._display_transcription(trans)
+        self._apply_pending_edits()
 
     def _on_error(self, msg: str):
         QMessageBox.warning(self, "Errore trascrizione", msg)
         self.status_label.setText("Errore")
         self._cleanup_worker()
+        self._apply_pending_edits()
 
     def _cleanup_worker(self):
-        self.btn_transcribe.setEnabled(True)
+        self.btn_transcribe.setEnabled(not self._saving)
         self.btn_cancel.setEnabled(False)
         self.progress.setVisible(False)
         self._worker = None
@@ -7,8 +7,28 @@ DEFAULT_CONFIG = {
     "theme": "dark",
     "whisper_model": "base",
     "whisper_language": "auto",
+    "whisper_batched": False,
+    "whisper_batch_size": 16,
+    "whisper_cpu_threads": 0,
+    "whisper_num_workers": 1,
+    "whisper_word_timestamps": False,
+    "transcription_signal_interval_ms": 100,
+    "job_workers": 4,
+    "job_limits": {},
+    "metrics_enabled": False,
+    "metrics_port": 0,
+    "stall_watchdog_ms": 250,
+    "stall_log_max_kb": 1024,
+    "http_api_port": 0,
+    "backup_dir": "",
+    "backup_keep": 7,
     "default_import_path": "",
     "default_export_path": "",
+    "skip_duplicates": False,
+    "watch_folders": [],
+    "watch_debounce_ms": 2000,
+    "watch_poll_interval_s": 30,
+    "watch_force_poll": False,
     "supported_formats": ["mp3", "wav", "m4a", "flac", "ogg"],
     "view_mode": "list",
     "window_geometry": None,
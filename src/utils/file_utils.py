@@ -1,11 +1,9 @@
+import hashlib
 import os
 import re
 from pathlib import Path
 from datetime import datetime
 
-from mutagen import File as MutagenFile
-from pydub import AudioSegment
-
 SUPPORTED_EXTENSIONS = {".mp3", ".wav", ".m4a", ".flac", ".ogg"}
 
 
@@ -23,6 +21,34 @@ def scan_folder(folder: str) -> list[str]:
     return sorted(results)
 
 
+HASH_BLOCK = 64 * 1024
+
+
+def partial_hash(path: str, size: int | None = None) -> str:
+    """Cheap fingerprint from the size plus the first and last 64 KiB.
+
+    Equal content always gives equal values; equal values only mean the
+    files are candidates, confirmed with ``full_hash``.
+    """
+    if size is None:
+        size = os.path.getsize(path)
+    h = hashlib.blake2b(size.to_bytes(8, "little"), digest_size=16)
+    with open(path, "rb") as f:
+        h.update(f.read(HASH_BLOCK))
+        if size > 2 * HASH_BLOCK:
+            f.seek(-HASH_BLOCK, os.SEEK_END)
+        h.update(f.read(HASH_BLOCK))
+    return h.hexdigest()
+
+
+def full_hash(path: str) -> str:
+    h = hashlib.blake2b(digest_size=32)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
 def get_audio_metadata(path: str) -> dict:
     p = Path(path)
     stat = p.stat()
@@ -40,6 +66,9 @@ def get_audio_metadata(path: str) -> dict:
         "bitrate": 0,
     }
 
+    # mutagen/pydub are imported on first use to keep application startup fast.
+    from mutagen import File as MutagenFile
+
     try:
         mf = MutagenFile(path)
         if mf is not None:
@@ -50,6 +79,7 @@ def get_audio_metadata(path: str) -> dict:
                 meta["bitrate"] = getattr(mf.info, "bitrate", 0)
     except Exception:
         try:
+            from pydub import AudioSegment
             seg = AudioSegment.from_file(path)
             meta["duration"] = round(len(seg) / 1000.0, 2)
             meta["sample_rate"] = seg.frame_rate
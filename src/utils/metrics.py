@@ -0,0 +1,250 @@
+"""Process-wide counters and latency histograms.
+
+Disabled by default: ``timed`` wrappers then cost one flag check and
+``timer()`` returns a shared no-op context. Enable with ``--metrics``, the
+``AUDIO_LIBRARY_METRICS`` environment variable or the diagnostics dialog.
+"""
+
+import json
+import os
+import threading
+import time
+from functools import wraps
+
+# Upper bounds in milliseconds, Prometheus style (cumulative on export).
+BUCKETS_MS = (0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500,
+              1000, 2500, 5000, 10000, 30000, 60000)
+
+_enabled = bool(os.environ.get("AUDIO_LIBRARY_METRICS"))
+_lock = threading.Lock()
+_counters: dict[str, float] = {}
+_gauges: dict[str, float] = {}
+_histograms: dict[str, "_Histogram"] = {}
+_server = None
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, ms: float):
+        i = 0
+        while i < len(BUCKETS_MS) and ms > BUCKETS_MS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.total += ms
+        self.count += 1
+        if ms > self.max:
+            self.max = ms
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding quantile ``q`` (max for +Inf)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(BUCKETS_MS[i], self.max) if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Timer:
+    __slots__ = ("name", "_t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, (time.perf_counter() - self._t0) * 1000)
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def enable(on: bool = True):
+    global _enabled
+    _enabled = on
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def count(name: str, n: float = 1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def gauge(name: str, value: float):
+    if not _enabled:
+        return
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name: str, ms: float):
+    if not _enabled:
+        return
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = _Histogram()
+        hist.observe(ms)
+
+
+def timer(name: str):
+    """``with metrics.timer("db.query"):`` records the block's latency."""
+    return _Timer(name) if _enabled else _NULL_TIMER
+
+
+def timed(name: str):
+    """Decorator recording call latency (and errors) under ``name``."""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                count(name + ".errors")
+                raise
+            finally:
+                observe(name, (time.perf_counter() - t0) * 1000)
+        return wrapper
+    return decorate
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+
+
+# --- Export ---
+
+def snapshot() -> dict:
+    with _lock:
+        return {
+            "enabled": _enabled,
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "histograms": {
+                name: {
+                    "count": h.count,
+                    "sum_ms": round(h.total, 3),
+                    "mean_ms": round(h.total / h.count, 3) if h.count else 0.0,
+                    "p50_ms": h.quantile(0.5),
+                    "p95_ms": h.quantile(0.95),
+                    "p99_ms": h.quantile(0.99),
+                    "max_ms": round(h.max, 3),
+                    "buckets": dict(zip([*map(str, BUCKETS_MS), "+Inf"], h.counts)),
+                }
+                for name, h in _histograms.items()
+            },
+        }
+
+
+def to_json() -> str:
+    return json.dumps(snapshot(), indent=2)
+
+
+def _prom_name(name: str) -> str:
+    return "audiolib_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def to_prometheus() -> str:
+    with _lock:
+        lines = []
+        for name, value in sorted(_counters.items()):
+            metric = _prom_name(name) + "_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value:g}"]
+        for name, value in sorted(_gauges.items()):
+            metric = _prom_name(name)
+            lines += [f"# TYPE {metric} gauge", f"{metric} {value:g}"]
+        for name, h in sorted(_histograms.items()):
+            metric = _prom_name(name) + "_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, n in zip(BUCKETS_MS, h.counts):
+                cumulative += n
+                lines.append(f'{metric}_bucket{{le="{bound / 1000:g}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {h.count}')
+            lines.append(f"{metric}_sum {h.total / 1000:.6f}")
+            lines.append(f"{metric}_count {h.count}")
+    return "\n".join(lines) + "\n"
+
+
+def write(path: str, fmt: str = ""):
+    """Write a snapshot; ``fmt`` is "json" or "prometheus" (default: by
+    extension, .prom/.txt for Prometheus)."""
+    fmt = fmt or ("prometheus" if path.endswith((".prom", ".txt")) else "json")
+    text = to_prometheus() if fmt == "prometheus" else to_json()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def serve(port: int = 9464, host: str = "127.0.0.1") -> int:
+    """Expose ``/metrics`` (Prometheus) and ``/metrics.json`` over HTTP on a
+    daemon thread. Returns the bound port."""
+    global _server
+    if _server is not None:
+        return _server.server_address[1]
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, ctype = to_prometheus(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, ctype = to_json(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    _server = ThreadingHTTPServer((host, port), _Handler)
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, name="metrics-http",
+                     daemon=True).start()
+    return _server.server_address[1]
+
+
+def stop_server():
+    global _server
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
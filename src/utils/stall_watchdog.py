@@ -0,0 +1,179 @@
+"""Detects Qt event-loop stalls and records where the main thread was.
+
+A QTimer on the GUI thread updates a heartbeat; a daemon thread samples the
+main thread's Python stack while the heartbeat is late. When the loop
+recovers, one JSON line per stall is appended to the stall log; past
+``max_log_bytes`` it is rotated to ``<log>.1``, so at most two files are
+kept. Rank the logged sites with:
+
+    python -m src.utils.stall_watchdog [~/.audio_library_manager/stalls.jsonl]
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from src.utils import metrics
+
+DEFAULT_LOG = Path.home() / ".audio_library_manager" / "stalls.jsonl"
+DEFAULT_MAX_LOG_BYTES = 1024 * 1024
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _site(frame) -> str:
+    """Innermost frame that belongs to the application, as file:line func."""
+    fallback = None
+    while frame is not None:
+        code = frame.f_code
+        label = (f"{os.path.relpath(code.co_filename, os.path.dirname(_SRC_DIR))}"
+                 f":{frame.f_lineno} {code.co_name}")
+        if fallback is None:
+            fallback = label
+        if code.co_filename.startswith(_SRC_DIR) and not code.co_filename.endswith(
+                "stall_watchdog.py"):
+            return label
+        frame = frame.f_back
+    return fallback or "?"
+
+
+class StallWatchdog:
+    def __init__(self, threshold_ms: int = 200, interval_ms: int = 50,
+                 log_path: str | os.PathLike | None = DEFAULT_LOG,
+                 echo: bool = False, max_stall_s: float = 600,
+                 max_log_bytes: int = DEFAULT_MAX_LOG_BYTES):
+        self.threshold = max(threshold_ms, 2 * interval_ms) / 1000.0
+        self.interval_ms = interval_ms
+        self.log_path = Path(log_path) if log_path else None
+        self.max_log_bytes = max_log_bytes
+        self.echo = echo
+        # Longer gaps are treated as system suspend, not a stall.
+        self.max_stall = max_stall_s
+        self.stalls = 0
+        self._main_id = threading.main_thread().ident
+        self._beat = time.monotonic()
+        self._timer = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def start(self, app):
+        from PyQt6.QtCore import QTimer
+
+        self._beat = time.monotonic()
+        self._timer = QTimer(app)
+        self._timer.setInterval(self.interval_ms)
+        self._timer.timeout.connect(self._on_beat)
+        self._timer.start()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._monitor, name="stall-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+
+    def _on_beat(self):
+        self._beat = time.monotonic()
+
+    def _monitor(self):
+        poll = self.interval_ms / 1000.0
+        stall_beat = None
+        sites: Counter = Counter()
+        stacks: dict[str, list[str]] = {}
+        while not self._stop.wait(poll):
+            beat = self._beat
+            if stall_beat is None:
+                if time.monotonic() - beat < self.threshold:
+                    continue
+                stall_beat = beat
+                sites.clear()
+                stacks = {}
+            if beat != stall_beat:
+                # Loop is alive again: the stall lasted from the last beat
+                # before it to the first one after it.
+                duration = beat - stall_beat - poll
+                if self.threshold <= duration <= self.max_stall:
+                    self._report(duration, sites, stacks)
+                stall_beat = None
+                continue
+            frame = sys._current_frames().get(self._main_id)
+            if frame is None:
+                continue
+            site = _site(frame)
+            sites[site] += 1
+            if site not in stacks:
+                stacks[site] = traceback.format_stack(frame)
+            del frame
+
+    def _report(self, duration: float, sites: Counter, stacks: dict[str, list[str]]):
+        self.stalls += 1
+        ms = round(duration * 1000, 1)
+        metrics.count("ui.stalls")
+        metrics.observe("ui.stall", ms)
+        site = sites.most_common(1)[0][0] if sites else "?"
+        stack = stacks.get(site, [])
+        record = {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "duration_ms": ms,
+            "site": site,
+            "sites": dict(sites.most_common(5)),
+            "stack": [line.rstrip() for line in stack],
+        }
+        if self.echo:
+            print(f"UI stall {ms:.0f} ms at {site}\n" + "".join(stack),
+                  file=sys.stderr)
+        if self.log_path is not None:
+            try:
+                self.log_path.parent.mkdir(parents=True, exist_ok=True)
+                self._rotate()
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            except OSError:
+                pass
+
+    def _rotate(self):
+        if self.max_log_bytes <= 0:
+            return
+        try:
+            size = self.log_path.stat().st_size
+        except FileNotFoundError:
+            return
+        if size >= self.max_log_bytes:
+            os.replace(self.log_path, f"{self.log_path}.1")
+
+
+def rank(log_path: str | os.PathLike = DEFAULT_LOG) -> list[dict]:
+    """Stall sites ordered by total blocked time, over the log and its
+    rotated predecessor."""
+    totals: dict[str, dict] = {}
+    paths = [p for p in (f"{log_path}.1", log_path) if os.path.exists(p)]
+    for path in paths or [log_path]:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                entry = totals.setdefault(
+                    rec["site"], {"site": rec["site"], "stalls": 0,
+                                  "total_ms": 0.0, "max_ms": 0.0})
+                entry["stalls"] += 1
+                entry["total_ms"] = round(entry["total_ms"] + rec["duration_ms"], 1)
+                entry["max_ms"] = max(entry["max_ms"], rec["duration_ms"])
+    return sorted(totals.values(), key=lambda e: e["total_ms"], reverse=True)
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_LOG
+    for entry in rank(path):
+        print(f"{entry['total_ms']:>10.0f} ms  {entry['stalls']:>5}x  "
+              f"max {entry['max_ms']:>7.0f} ms  {entry['site']}")
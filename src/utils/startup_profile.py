@@ -0,0 +1,65 @@
+import json
+import sys
+import time
+
+_T0 = time.perf_counter()
+_enabled = False
+_reported = False
+_marks: list[tuple[str, float]] = []
+_watcher = None
+
+# The report is printed once all of these have been reached.
+REQUIRED_MARKS = ("first_paint", "first_library_page")
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def mark(name: str):
+    """Record a startup milestone (first occurrence only); no-op unless
+    --profile-startup was given."""
+    if not _enabled or any(n == name for n, _ in _marks):
+        return
+    _marks.append((name, (time.perf_counter() - _T0) * 1000))
+    reached = {n for n, _ in _marks}
+    if all(r in reached for r in REQUIRED_MARKS):
+        print_report()
+
+
+def report() -> dict:
+    return {name: round(ms, 1) for name, ms in _marks}
+
+
+def print_report():
+    global _reported
+    if _reported:
+        return
+    _reported = True
+    print("startup profile (ms): " + json.dumps(report()), file=sys.stderr)
+
+
+def install_first_paint_hook(app, timeout_ms: int = 10000):
+    """Mark ``first_paint`` on the first Paint event any widget receives.
+    Prints whatever was recorded after ``timeout_ms`` if a milestone never
+    arrives (e.g. an empty library)."""
+    global _watcher
+    if not _enabled:
+        return
+    from PyQt6.QtCore import QObject, QEvent, QTimer
+
+    class _PaintWatcher(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Type.Paint:
+                app.removeEventFilter(self)
+                mark("first_paint")
+            return False
+
+    _watcher = _PaintWatcher(app)
+    app.installEventFilter(_watcher)
+    QTimer.singleShot(timeout_ms, print_report)
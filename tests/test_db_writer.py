@@ -0,0 +1,99 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from src.core.database import Database
+from src.core.db_writer import DatabaseWriter
+
+
+def _tags(db: Database) -> list[str]:
+    return [t["name"] for t in db.get_all_tags()]
+
+
+def _add_then_fail(db: Database, name: str):
+    db.add_tag(name)
+    raise ValueError("rejected")
+
+
+def _hold_write_lock(path: str, seconds: float, locked: threading.Event):
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("BEGIN IMMEDIATE")
+    locked.set()
+    time.sleep(seconds)
+    conn.execute("COMMIT")
+    conn.close()
+
+
+def test_failed_call_is_rolled_back_alone(tmp_path):
+    db = Database(str(tmp_path / "lib.db"))
+    writer = DatabaseWriter(db, max_delay_ms=200)
+    try:
+        first = writer.submit(db.add_tag, "first")
+        failing = writer.submit(_add_then_fail, db, "failing")
+        last = writer.submit(db.add_tag, "last")
+        assert first.result(5) and last.result(5)
+        with pytest.raises(ValueError):
+            failing.result(5)
+    finally:
+        writer.close(5)
+    assert writer.stats["batches"] == 1 and writer.stats["calls"] == 3
+    assert sorted(_tags(db)) == ["first", "last"]
+
+
+def test_sql_error_fails_only_its_call(tmp_path):
+    db = Database(str(tmp_path / "lib.db"))
+    writer = DatabaseWriter(db, max_delay_ms=200)
+    try:
+        ok = writer.submit(db.add_tag, "kept")
+        bad = writer.submit(db.update_audio, 1, no_such_column=1)
+        assert ok.result(5)
+        with pytest.raises(sqlite3.OperationalError):
+            bad.result(5)
+    finally:
+        writer.close(5)
+    assert _tags(db) == ["kept"]
+
+
+def test_busy_database_is_retried(tmp_path):
+    db = Database(str(tmp_path / "lib.db"))
+    locked = threading.Event()
+    holder = threading.Thread(target=_hold_write_lock,
+                              args=(db.db_path, 0.3, locked))
+    holder.start()
+    locked.wait(5)
+    writer = DatabaseWriter(db, busy_timeout_ms=20, busy_retries=8)
+    try:
+        assert writer.call(db.add_tag, "after-lock")
+    finally:
+        holder.join()
+        writer.close(5)
+    assert writer.stats["busy_retries"] > 0
+    assert _tags(db) == ["after-lock"]
+
+
+def test_busy_database_fails_batch_after_retries(tmp_path):
+    db = Database(str(tmp_path / "lib.db"))
+    locked = threading.Event()
+    holder = threading.Thread(target=_hold_write_lock,
+                              args=(db.db_path, 1.0, locked))
+    holder.start()
+    locked.wait(5)
+    writer = DatabaseWriter(db, busy_timeout_ms=20, busy_retries=1)
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            writer.call(db.add_tag, "never")
+    finally:
+        holder.join()
+        writer.close(5)
+    assert writer.stats["busy_retries"] == 1
+    assert _tags(db) == []
+
+
+def test_submit_after_close_fails(tmp_path):
+    db = Database(str(tmp_path / "lib.db"))
+    writer = DatabaseWriter(db)
+    writer.close(5)
+    with pytest.raises(RuntimeError):
+        writer.submit(db.add_tag, "late")
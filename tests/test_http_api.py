@@ -0,0 +1,113 @@
+import http.client
+import json
+
+import pytest
+
+from src.core.database import Database
+from src.core.http_api import serve_in_background
+
+BODY = bytes(range(256)) * 40  # 10240 bytes
+
+
+@pytest.fixture(scope="module")
+def api(tmp_path_factory):
+    root = tmp_path_factory.mktemp("api")
+    audio = root / "song.wav"
+    audio.write_bytes(BODY)
+    db = Database(str(root / "lib.db"))
+    db.add_audio_many([
+        {"file_path": str(audio), "file_name": "song.wav", "title": "song",
+         "format": "wav", "file_size": len(BODY)},
+        *({"file_path": f"/music/{i}.mp3", "file_name": f"{i}.mp3",
+           "title": f"track {i}", "format": "mp3"} for i in range(5)),
+    ])
+    api = serve_in_background(db.db_path, port=0, pool_size=2)
+    yield api
+    api.close()
+
+
+def _get(api, path: str, headers: dict | None = None):
+    conn = http.client.HTTPConnection(api.host, api.port, timeout=5)
+    try:
+        conn.request("GET", path, headers=headers or {})
+        resp = conn.getresponse()
+        return resp.status, dict(resp.getheaders()), resp.read()
+    finally:
+        conn.close()
+
+
+def _etag(api) -> str:
+    return _get(api, "/audio/1")[1]["ETag"]
+
+
+def test_full_body(api):
+    status, headers, body = _get(api, "/audio/1")
+    assert status == 200 and body == BODY
+    assert headers["Accept-Ranges"] == "bytes"
+    assert headers["Content-Length"] == str(len(BODY))
+
+
+@pytest.mark.parametrize("spec, start, end", [
+    ("bytes=0-99", 0, 99),
+    ("bytes=100-", 100, len(BODY) - 1),
+    ("bytes=-500", len(BODY) - 500, len(BODY) - 1),
+    ("bytes=-99999", 0, len(BODY) - 1),  # suffix longer than the file
+    ("bytes=10000-99999", 10000, len(BODY) - 1),  # end past EOF is clamped
+])
+def test_partial_content(api, spec, start, end):
+    status, headers, body = _get(api, "/audio/1", {"Range": spec})
+    assert status == 206
+    assert headers["Content-Range"] == f"bytes {start}-{end}/{len(BODY)}"
+    assert headers["Content-Length"] == str(end - start + 1)
+    assert body == BODY[start:end + 1]
+
+
+@pytest.mark.parametrize("spec", [f"bytes={len(BODY)}-", "bytes=50-10", "bytes=-0"])
+def test_unsatisfiable_range(api, spec):
+    status, headers, _ = _get(api, "/audio/1", {"Range": spec})
+    assert status == 416
+    assert headers["Content-Range"] == f"bytes */{len(BODY)}"
+
+
+@pytest.mark.parametrize("spec", ["items=0-10", "bytes=0-10,20-30", "bytes=abc-"])
+def test_unsupported_range_sends_full_body(api, spec):
+    status, _, body = _get(api, "/audio/1", {"Range": spec})
+    assert status == 200 and body == BODY
+
+
+def test_if_range(api):
+    etag = _etag(api)
+    status, _, body = _get(api, "/audio/1", {"Range": "bytes=0-9", "If-Range": etag})
+    assert status == 206 and body == BODY[:10]
+    status, headers, body = _get(api, "/audio/1",
+                                 {"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert status == 200 and body == BODY
+    assert "Content-Range" not in headers
+
+
+def test_if_none_match(api):
+    status, _, body = _get(api, "/audio/1", {"If-None-Match": _etag(api)})
+    assert status == 304 and body == b""
+
+
+def test_missing_audio(api):
+    assert _get(api, "/audio/999")[0] == 404
+    assert _get(api, "/audio/2")[0] == 404  # row exists, file does not
+
+
+def test_search_pages(api):
+    status, _, body = _get(api, "/api/search?sort=title&desc=0&limit=4&offset=0")
+    first = json.loads(body)
+    assert status == 200 and first["offset"] == 0 and first["total"] == 6
+    assert first["next"]
+
+    _, _, body = _get(api, f"/api/search?sort=title&desc=0&limit=4&after={first['next']}")
+    second = json.loads(body)
+    assert "offset" not in second
+    assert second["next"] is None
+    titles = [r["title"] for r in first["results"] + second["results"]]
+    assert titles == sorted(titles, key=str.lower) and len(titles) == 6
+
+
+def test_bad_cursor(api):
+    assert _get(api, "/api/search?after=not-a-cursor")[0] == 400
@@ -0,0 +1,161 @@
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+from src.core.database import Database
+from src.core.jobs import JobScheduler, owner_alive
+
+
+def _set_running(db: Database, job_id: int, owner: str | None, lease_until: float | None):
+    with db._conn() as conn:
+        conn.execute(
+            "UPDATE jobs SET state = 'running', owner = ?, lease_until = ? WHERE id = ?",
+            (owner, lease_until, job_id),
+        )
+
+
+def _dead_owner() -> str:
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return f"{socket.gethostname()}:{proc.pid}"
+
+
+def test_claim_leases_job_to_one_owner(tmp_path):
+    db = Database(str(tmp_path / "jobs.db"))
+    job_id = db.add_job("import", {"paths": []})
+    before = time.time()
+    assert db.claim_job(job_id, "host:1", lease_seconds=30)
+    assert not db.claim_job(job_id, "host:2", lease_seconds=30)
+    job = db.get_job(job_id)
+    assert job["state"] == "running" and job["attempts"] == 1
+    assert job["owner"] == "host:1"
+    assert before + 29 <= job["lease_until"] <= time.time() + 30
+
+
+def test_owner_alive():
+    host = socket.gethostname()
+    assert owner_alive(f"{host}:{os.getpid()}")
+    assert not owner_alive(_dead_owner())
+    assert owner_alive("other-host:1")  # can't be checked: the lease decides
+    assert owner_alive("")
+
+
+def test_requeue_only_stale_jobs(tmp_path):
+    db = Database(str(tmp_path / "jobs.db"))
+    live = f"{socket.gethostname()}:{os.getpid()}"
+    ids = {name: db.add_job("import", {}) for name in
+           ("live", "expired", "dead", "no_lease", "remote")}
+    future = time.time() + 60
+    _set_running(db, ids["live"], live, future)
+    _set_running(db, ids["expired"], live, time.time() - 1)
+    _set_running(db, ids["dead"], _dead_owner(), future)
+    _set_running(db, ids["no_lease"], None, None)
+    _set_running(db, ids["remote"], "other-host:1", future)
+
+    assert db.requeue_running_jobs(owner_alive) == 3
+    states = {name: db.get_job(i)["state"] for name, i in ids.items()}
+    assert states == {"live": "running", "expired": "queued", "dead": "queued",
+                      "no_lease": "queued", "remote": "running"}
+
+
+def test_start_resumes_interrupted_jobs(tmp_path):
+    db = Database(str(tmp_path / "jobs.db"))
+    job_id = db.add_job("echo", {"n": 1})
+    _set_running(db, job_id, _dead_owner(), time.time() + 60)
+    scheduler = JobScheduler(db, {"echo": lambda p: p}, poll_interval=0.05)
+    assert scheduler.run_until_idle() == {"done": 1}
+    job = db.get_job(job_id)
+    assert job["state"] == "done" and job["result"] == {"n": 1}
+
+
+def test_heartbeat_renews_lease(tmp_path):
+    db = Database(str(tmp_path / "jobs.db"))
+    leases = []
+
+    def slow(payload):
+        leases.append(db.get_jobs(["running"])[0]["lease_until"])
+        time.sleep(0.8)
+        leases.append(db.get_jobs(["running"])[0]["lease_until"])
+
+    scheduler = JobScheduler(db, {"slow": slow}, poll_interval=0.05, lease_seconds=1.0)
+    scheduler.submit("slow", {})
+    assert scheduler.run_until_idle() == {"done": 1}
+    assert leases[1] > leases[0]
+    # The lease still covers the job although it ran past the first one.
+    assert leases[1] > time.time() - 0.5
+
+
+def test_per_type_limits(tmp_path):
+    db = Database(str(tmp_path / "jobs.db"))
+    lock = threading.Lock()
+    active = {"a": 0, "b": 0}
+    peak = {"a": 0, "b": 0}
+
+    def handler(kind):
+        def run(payload):
+            with lock:
+                active[kind] += 1
+                peak[kind] = max(peak[kind], active[kind])
+            time.sleep(0.05)
+            with lock:
+                active[kind] -= 1
+        return run
+
+    scheduler = JobScheduler(db, {"a": handler("a"), "b": handler("b")},
+                             max_workers=4, limits={"a": 1, "b": 2},
+                             poll_interval=0.01)
+    for _ in range(5):
+        scheduler.submit("a", {})
+        scheduler.submit("b", {})
+    assert scheduler.run_until_idle() == {"done": 10}
+    assert peak == {"a": 1, "b": 2}
+
+
+def test_failing_handler_retries_then_fails(tmp_path):
+    db = Database(str(tmp_path / "jobs.db"))
+    calls = []
+
+    def boom(payload):
+        calls.append(payload)
+        raise ValueError("bad input")
+
+    scheduler = JobScheduler(db, {"boom": boom}, poll_interval=0.01)
+    job_id = scheduler.submit("boom", {}, max_attempts=2)
+    assert scheduler.run_until_idle() == {"retried": 1, "failed": 1}
+    job = db.get_job(job_id)
+    assert len(calls) == 2
+    assert job["state"] == "failed" and job["attempts"] == 2
+    assert job["error"] == "ValueError: bad input"
+    assert scheduler.running == {}
+
+
+def test_unrecorded_outcome_frees_slot(tmp_path):
+    db = Database(str(tmp_path / "jobs.db"))
+    scheduler = JobScheduler(db, {"echo": lambda p: p}, poll_interval=0.01)
+    busy = {"left": 2}
+    finish = db.finish_job
+
+    def flaky_finish(*args):
+        if busy["left"]:
+            busy["left"] -= 1
+            raise sqlite3.OperationalError("database is locked")
+        return finish(*args)
+
+    db.finish_job = flaky_finish
+    first = scheduler.submit("echo", {})
+    assert scheduler.run_until_idle() == {"done": 1}
+    assert db.get_job(first)["state"] == "done"
+
+    def broken_finish(*args):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    db.finish_job = broken_finish
+    second = scheduler.submit("echo", {})
+    scheduler.run_until_idle()
+    # The outcome is lost, but the slot is free and the lease is left to expire.
+    assert scheduler.running == {}
+    assert db.get_job(second)["state"] == "running"
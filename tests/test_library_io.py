@@ -0,0 +1,38 @@
+from src.core.database import Database
+from src.core.library_io import export_library, import_library
+
+
+def _rows(db: Database) -> list[dict]:
+    with db._conn() as conn:
+        return [dict(r) for r in conn.execute(
+            "SELECT file_path, duration, date_modified, notes, partial_hash, "
+            "content_hash FROM audio_files ORDER BY file_path")]
+
+
+def test_csv_round_trip_keeps_nulls(tmp_path):
+    src = Database(str(tmp_path / "src.db"))
+    src.add_audio_many([
+        {"file_path": f"/music/{name}.wav", "file_name": f"{name}.wav",
+         "title": name, "format": "wav", "file_size": 10, "duration": 1.5,
+         "date_modified": "2024-01-01T00:00:00", **hashes}
+        for name, hashes in (
+            ("a", {}),
+            ("b", {}),
+            ("c", {"partial_hash": "p", "content_hash": "c"}),
+        )
+    ])
+    with src._conn() as conn:
+        conn.execute("UPDATE audio_files SET date_modified = NULL WHERE title = 'b'")
+    export_library(src, str(tmp_path / "lib.csv"), "csv")
+
+    dst = Database(str(tmp_path / "dst.db"))
+    stats = import_library(dst, str(tmp_path / "lib.csv"))
+    assert stats["audio"] == 3
+    rows = _rows(dst)
+    assert rows == _rows(src)
+    assert rows[0]["partial_hash"] is None and rows[0]["content_hash"] is None
+    assert rows[1]["date_modified"] is None
+    assert rows[0]["notes"] == ""
+    assert [r["file_path"] for r in dst.audio_without_hash()] == ["/music/a.wav",
+                                                                 "/music/b.wav"]
+    assert dst.get_duplicate_groups() == []
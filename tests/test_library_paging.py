@@ -0,0 +1,80 @@
+import pytest
+
+from src.core.database import Database
+
+# Ties in every sort key, NULLs next to real zeros and titles that only
+# differ in case.
+FILES = [
+    ("Beta", "mp3", 12.0, 100, 1, "2024-01-02"),
+    ("beta", "wav", None, 0, None, "2024-01-02"),
+    ("alpha", "mp3", 0.0, None, 0, "2024-01-01"),
+    ("ALPHA", "flac", 12.0, 100, 1, "2024-01-03"),
+    ("Gamma", "wav", 3.5, 50, 0, "2024-01-01"),
+    ("delta", "mp3", None, 50, None, "2024-01-03"),
+    ("Delta", "ogg", 3.5, None, 1, "2024-01-02"),
+    ("epsilon", "wav", 0.0, 100, 0, "2024-01-01"),
+]
+
+
+@pytest.fixture(scope="module")
+def db(tmp_path_factory) -> Database:
+    db = Database(str(tmp_path_factory.mktemp("paging") / "lib.db"))
+    ids = db.add_audio_many([
+        {"file_path": f"/music/{i}.{fmt}", "file_name": f"{i}.{fmt}", "title": title,
+         "format": fmt, "date_added": added}
+        for i, (title, fmt, _, _, _, added) in enumerate(FILES)
+    ])
+    with db._conn() as conn:
+        for audio_id, (_, _, duration, size, transcribed, _) in zip(ids, FILES):
+            conn.execute(
+                "UPDATE audio_files SET duration = ?, file_size = ?, is_transcribed = ? "
+                "WHERE id = ?", (duration, size, transcribed, audio_id),
+            )
+    return db
+
+
+def _pages(db: Database, page_size: int, **kwargs) -> list[dict]:
+    paged, after = [], None
+    for _ in range(len(FILES) + 1):  # a cursor that doesn't advance must not hang
+        page = db.search_audio(**kwargs, limit=page_size, after=after)
+        if not page:
+            return paged
+        paged.extend(page)
+        after = Database.page_cursor(page[-1], kwargs["sort"])
+    pytest.fail("pagination did not terminate")
+
+
+def _expected(rows: list[dict], sort: str, descending: bool) -> list[int]:
+    def key(row):
+        value = row[sort]
+        if sort == "title":
+            value = value.lower()
+        elif sort in Database._NULLABLE_SORTS and value is None:
+            value = 0
+        return value, row["id"]
+    return [r["id"] for r in sorted(rows, key=key, reverse=descending)]
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("sort", list(Database.SORT_COLUMNS))
+@pytest.mark.parametrize("page_size", [1, 2, 3])
+def test_keyset_pages_match_full_order(db, sort, descending, page_size):
+    everything = db.search_audio(sort=sort, descending=descending)
+    assert [r["id"] for r in everything] == _expected(everything, sort, descending)
+
+    paged = _pages(db, page_size, sort=sort, descending=descending)
+    assert [r["id"] for r in paged] == [r["id"] for r in everything]
+
+
+def test_keyset_pages_with_filter(db):
+    everything = db.search_audio(fmt="mp3", sort="title", descending=False)
+    paged = _pages(db, 1, fmt="mp3", sort="title", descending=False)
+    assert [r["id"] for r in paged] == [r["id"] for r in everything]
+    assert {r["format"] for r in paged} == {"mp3"}
+
+
+def test_unknown_sort_falls_back_to_date_added(db):
+    rows = db.search_audio(sort="nonsense", descending=True)
+    assert [r["id"] for r in rows] == _expected(rows, "date_added", True)
+    assert Database.page_cursor(rows[0], "nonsense") == (rows[0]["date_added"],
+                                                         rows[0]["id"])
@@ -0,0 +1,37 @@
+import random
+
+from src.core.database import Database
+
+
+def _library(tmp_path, files: int = 30, segments: int = 200) -> Database:
+    db = Database(str(tmp_path / "lib.db"))
+    rng = random.Random(7)
+    words = ["meeting", "budget", "report", "coffee", "project", "deadline"]
+    ids = db.add_audio_many([
+        {"file_path": f"/rec/{i}.wav", "file_name": f"{i}.wav", "title": f"rec {i}",
+         "format": "wav"} for i in range(files)
+    ])
+    for audio_id in ids:
+        segs = [{"start": j * 2.0, "end": j * 2.0 + 2.0,
+                 "text": " ".join(rng.choice(words) for _ in range(rng.randint(3, 12)))}
+                for j in range(segments)]
+        db.save_transcription(audio_id, " ".join(s["text"] for s in segs), "it",
+                              "base", segs)
+    return db
+
+
+def _key(hit: dict) -> tuple:
+    return hit["audio_id"], hit["start_time"]
+
+
+def test_segment_pages_follow_one_ranking(tmp_path):
+    db = _library(tmp_path)
+    everything = db.search_segments("budget", limit=100_000)
+    assert len(everything) > 2500
+    pages = []
+    for offset in range(0, len(everything), 250):
+        pages.extend(db.search_segments("budget", limit=250, offset=offset))
+    assert [_key(h) for h in pages] == [_key(h) for h in everything]
+    assert len(set(_key(h) for h in pages)) == len(pages)
+    scores = [h["score"] for h in everything]
+    assert scores == sorted(scores)
@@ -0,0 +1,31 @@
+from collections import Counter
+
+from src.utils.stall_watchdog import StallWatchdog, rank
+
+
+def _stall(watchdog: StallWatchdog, site: str, ms: float):
+    watchdog._report(ms / 1000, Counter({site: 1}), {site: [f"  {site}\n"]})
+
+
+def test_log_is_rotated_past_the_cap(tmp_path):
+    log = tmp_path / "stalls.jsonl"
+    watchdog = StallWatchdog(log_path=log, max_log_bytes=2000)
+    for i in range(200):
+        _stall(watchdog, f"src/ui/panel.py:{i % 3} slow", 300)
+    rotated = tmp_path / "stalls.jsonl.1"
+    assert watchdog.stalls == 200
+    assert log.stat().st_size < 2000 + 1000
+    assert rotated.stat().st_size < 2000 + 1000
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["stalls.jsonl",
+                                                          "stalls.jsonl.1"]
+
+
+def test_rank_reads_rotated_log(tmp_path):
+    log = tmp_path / "stalls.jsonl"
+    watchdog = StallWatchdog(log_path=log, max_log_bytes=1)
+    _stall(watchdog, "a.py:1 f", 400)  # dropped: only one rotation is kept
+    _stall(watchdog, "a.py:1 f", 300)  # in stalls.jsonl.1
+    _stall(watchdog, "b.py:2 g", 250)
+    ranked = rank(log)
+    assert [(e["site"], e["stalls"], e["total_ms"]) for e in ranked] == [
+        ("a.py:1 f", 1, 300.0), ("b.py:2 g", 1, 250.0)]
@@ -0,0 +1,42 @@
+from src.core.transcriber import remap_segments
+
+
+def _contiguous(count: int, length: float = 1.0) -> list[dict]:
+    return [{"start": i * length, "end": (i + 1) * length, "text": str(i)}
+            for i in range(count)]
+
+
+def test_cut_in_contiguous_segments_stays_local():
+    segments = _contiguous(10800)  # 3 h of back-to-back 1 s segments
+    kept, regions = remap_segments(segments, [("cut", 5_000_250, 5_001_250)], margin=0.5)
+    assert len(regions) == 1
+    start, end = regions[0]
+    assert 4998.0 <= start and end <= 5002.0
+    assert len(kept) >= len(segments) - 5
+    # Kept text never overlaps the region that is transcribed again.
+    assert all(s["end"] <= start or s["start"] >= end for s in kept)
+
+
+def test_small_gaps_do_not_spread():
+    segments = [{"start": i * 1.2, "end": i * 1.2 + 1.0, "text": str(i)}
+                for i in range(9000)]
+    kept, regions = remap_segments(segments, [("cut", 600_500, 601_500)], margin=0.5)
+    assert len(regions) == 1
+    assert regions[0][1] - regions[0][0] < 5
+    assert len(kept) >= len(segments) - 5
+
+
+def test_segments_after_cut_are_shifted():
+    segments = _contiguous(10)
+    kept, regions = remap_segments(segments, [("cut", 2_000, 4_000)])
+    assert regions == []
+    assert [s["text"] for s in kept] == ["0", "1", "4", "5", "6", "7", "8", "9"]
+    assert kept[2]["start"] == 2.0 and kept[-1]["end"] == 8.0
+
+
+def test_trim_keeps_inner_segments():
+    segments = _contiguous(10)
+    kept, regions = remap_segments(segments, [("trim", 2_500, 6_000)], margin=0.0)
+    assert [s["text"] for s in kept] == ["3", "4", "5"]
+    assert kept[0]["start"] == 0.5
+    assert regions == [(0.0, 0.5)]